@@ -5,7 +5,7 @@ from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
-from .models import db, User
+from .models import db
 from config import Config
 import logging
 from logging.handlers import RotatingFileHandler
@@ -21,18 +21,60 @@ csrf = CSRFProtect()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cached snapshot rather than a users row fetch on every authenticated request
+    from .services.identity_cache import identity_cache
+    return identity_cache.get(int(user_id))
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    _configure_pool(app)
     db.init_app(app)
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    from .utils import limiter_storage  # noqa: F401 - registers the sqlite:// limiter storage
     limiter.init_app(app)
     csrf.init_app(app)
 
+    from .services.vehicle_state import vehicle_state
+    from .services.vehicle_service import available_index
+    from .services.live_feed import broker
+    from .services.trip_service import tracking_writer
+    from .services.admin_service import admin_stats
+    from .services.analytics_service import bucket_cache
+    from .services.identity_cache import identity_cache
+    from .services.device_token_service import DeviceTokenService
+    from .utils.pool_monitor import pool_monitor
+    from .utils.query_inspector import query_inspector
+    with app.app_context():
+        pool_monitor.attach(db.engine)
+        query_inspector.init_app(app, db.engine)
+    from . import metrics
+    metrics.init_app(app)
+    vehicle_state.init_app(app)
+    identity_cache.init_app(app)
+    DeviceTokenService.init_app(app)
+    available_index.clear()
+    broker.init_app(app)
+    admin_stats.init_app(app, ttl=app.config.get('ADMIN_STATS_TTL'))
+    bucket_cache.maxsize = app.config.get('ANALYTICS_CACHE_SIZE', bucket_cache.maxsize)
+    bucket_cache.ttl = app.config.get('ANALYTICS_CACHE_TTL', bucket_cache.ttl)
+    bucket_cache.clear()
+
+    write_behind = app.config.get('TRACKING_WRITE_BEHIND', False)
+    if write_behind and not app.config.get('VEHICLE_STATE_CACHE_SIZE'):
+        app.logger.warning('TRACKING_WRITE_BEHIND needs VEHICLE_STATE_CACHE_SIZE > 0; writing synchronously')
+        write_behind = False
+    tracking_writer.init_app(
+        app, enabled=write_behind,
+        maxsize=app.config.get('TRACKING_WRITE_QUEUE_SIZE'),
+        flush_size=app.config.get('TRACKING_FLUSH_SIZE'),
+        flush_interval=app.config.get('TRACKING_FLUSH_INTERVAL'),
+        max_retries=app.config.get('TRACKING_WRITE_RETRIES'),
+        retry_delay=app.config.get('TRACKING_RETRY_DELAY'),
+    )
+
     # Logging Configuration
     if not app.debug:
         if not os.path.exists('logs'):
@@ -76,12 +118,18 @@ def create_app(config_class=Config):
     from .routes.tracking import tracking
     from .routes.admin import admin
     from .routes.trip import trip
+    from .routes.internal import internal, scrape
 
     app.register_blueprint(auth)
     app.register_blueprint(vehicle)
     app.register_blueprint(tracking)
     app.register_blueprint(admin)
     app.register_blueprint(trip)
+    app.register_blueprint(internal)
+    app.register_blueprint(scrape)
+
+    from .commands import register_commands
+    register_commands(app)
 
     # Health Check
     @app.route('/health')
@@ -111,3 +159,17 @@ def create_app(config_class=Config):
         return render_template('500.html'), 500
 
     return app
+
+
+def _configure_pool(app):
+    """Apply the DB_POOL_* settings to the engine (SQLite keeps its own pooling)."""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    from .utils.pool_monitor import InstrumentedQueuePool
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', app.config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', app.config['DB_POOL_PRE_PING'])
@@ -0,0 +1,143 @@
+"""
+Flask CLI maintenance commands.
+
+Run with the app on the path, e.g.:
+    flask --app run backfill-latest-positions
+    flask --app run archive-trips --older-than-days 30
+    flask --app run rebuild-user-stats
+    flask --app run loadgen --vehicles 200 --duration 60 --output results.json
+"""
+import json
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, update
+
+from app import db
+from app.models import Vehicle, VehicleTracking, BatteryStatus
+
+
+@click.command('backfill-latest-positions')
+@click.option('--batch-size', default=500, show_default=True, help='Vehicles updated per transaction.')
+@with_appcontext
+def backfill_latest_positions(batch_size):
+    """Populate the vehicles' latest-position columns from vehicle_tracking."""
+    vehicle_ids = [row.id for row in db.session.query(Vehicle.id).order_by(Vehicle.id)]
+    updated = 0
+
+    for start in range(0, len(vehicle_ids), batch_size):
+        chunk = vehicle_ids[start:start + batch_size]
+        latest = (
+            db.session.query(
+                VehicleTracking.vehicle_id, func.max(VehicleTracking.recorded_at).label('recorded_at')
+            )
+            .filter(VehicleTracking.vehicle_id.in_(chunk))
+            .group_by(VehicleTracking.vehicle_id)
+            .subquery()
+        )
+        # Ties on recorded_at resolve to the last inserted row
+        points = {}
+        for point in db.session.query(
+            VehicleTracking.vehicle_id, VehicleTracking.latitude, VehicleTracking.longitude,
+            VehicleTracking.speed, VehicleTracking.recorded_at
+        ).join(latest, (VehicleTracking.vehicle_id == latest.c.vehicle_id)
+                       & (VehicleTracking.recorded_at == latest.c.recorded_at)
+               ).order_by(VehicleTracking.id):
+            points[point.vehicle_id] = point
+        batteries = dict(
+            db.session.query(BatteryStatus.vehicle_id, BatteryStatus.current_percentage)
+            .filter(BatteryStatus.vehicle_id.in_(chunk))
+        )
+
+        rows = []
+        for point in points.values():
+            row = {
+                'id': point.vehicle_id,
+                'current_lat': point.latitude,
+                'current_lng': point.longitude,
+                'current_speed': point.speed or 0.0,
+                'last_seen_at': point.recorded_at,
+            }
+            if batteries.get(point.vehicle_id) is not None:
+                row['battery_level'] = float(batteries[point.vehicle_id])
+            rows.append(row)
+
+        if rows:
+            db.session.execute(update(Vehicle), rows)
+        db.session.commit()
+        updated += len(rows)
+
+    click.echo(f"Backfilled latest position for {updated} of {len(vehicle_ids)} vehicles.")
+
+
+@click.command('archive-trips')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive trips completed more than this many days ago [default: TRIP_ARCHIVE_AFTER_DAYS].')
+@click.option('--limit', type=int, default=None, help='Archive at most this many trips in this run.')
+@with_appcontext
+def archive_trips(older_than_days, limit):
+    """Move completed trips' tracking points out of vehicle_tracking into the archive."""
+    from app.services.archive_service import ArchiveService
+
+    if older_than_days is None:
+        older_than_days = current_app.config['TRIP_ARCHIVE_AFTER_DAYS']
+    report = ArchiveService.archive_completed_trips(older_than_days, limit=limit)
+    click.echo(
+        f"Archived {report['trips']} trips: {report['rows_moved']} rows moved, "
+        f"{report['archive_bytes']} bytes written, ~{report['bytes_saved']} bytes saved."
+    )
+
+
+@click.command('rebuild-user-stats')
+@with_appcontext
+def rebuild_user_stats():
+    """Recompute the user_stats rollup from vehicles and completed trips."""
+    from app.services.user_service import UserService
+
+    users, changed = UserService.rebuild_statistics()
+    click.echo(f"Rebuilt statistics for {users} users ({changed} rows corrected).")
+
+
+@click.command('loadgen')
+@click.option('--vehicles', default=50, show_default=True, help='Simulated vehicles, each on an active trip.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds of streaming.')
+@click.option('--rate', default=1.0, show_default=True, help='Fixes per vehicle per second.')
+@click.option('--batch', default=1, show_default=True,
+              help='Fixes per request; above 1 posts to /api/update_location/batch.')
+@click.option('--workers', default=4, show_default=True, help='Concurrent client threads.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help="Write the JSON report to this file ('-' for stdout).")
+@with_appcontext
+def loadgen(vehicles, duration, rate, batch, workers, output):
+    """Drive simulated vehicles through the ingest path and report throughput and latency."""
+    from app.utils.loadgen import LoadGenerator
+
+    if vehicles < 1 or duration <= 0 or rate <= 0 or batch < 1 or workers < 1:
+        raise click.BadParameter('vehicles, duration, rate, batch and workers must be positive')
+    report = LoadGenerator(vehicles, duration, rate, batch, workers).run()
+
+    if output == '-':
+        click.echo(json.dumps(report, indent=2))
+        return
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    ingest = report['latency']['update_location' if batch == 1 else 'update_location_batch']
+    click.echo(
+        f"{report['fixes_accepted']} fixes in {report['elapsed_s']:.1f}s: {report['fixes_per_s']} fixes/s "
+        f"(offered {report['offered_fixes_per_s']}), {report['requests_per_s']} requests/s, "
+        f"status codes {report['status_codes']}."
+    )
+    if ingest['count']:
+        click.echo(f"Ingest latency p50 {ingest['p50_ms']} ms, p95 {ingest['p95_ms']} ms, p99 {ingest['p99_ms']} ms.")
+    growth = report['db_growth']
+    click.echo(f"Database grew by {growth['trips']} trips, {growth['tracking_points']} tracking points"
+               + (f", {growth['bytes']} bytes." if growth['bytes'] is not None else "."))
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_latest_positions)
+    app.cli.add_command(archive_trips)
+    app.cli.add_command(rebuild_user_stats)
+    app.cli.add_command(loadgen)
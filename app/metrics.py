@@ -0,0 +1,145 @@
+"""
+Application metrics, served in Prometheus text format at /metrics.
+
+Request hooks record latency, status codes, in-flight requests and the
+number and time of database queries per request, labelled by endpoint
+(e.g. tracking.update_location). Services bump the domain counters
+defined here. Everything is per process.
+"""
+import threading
+import time
+
+from flask import request
+
+from app import db
+from app.utils import query_events
+from app.utils.prometheus import Counter, Gauge, Histogram, Registry
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+registry = Registry()
+
+# The per-request metrics share one lock so each hook is a single critical section
+_request_lock = threading.Lock()
+http_requests = registry.register(Counter(
+    'http_requests_total', 'HTTP responses by endpoint, method and status code.',
+    ('endpoint', 'method', 'status'), lock=_request_lock))
+http_latency = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce the response, by endpoint.', ('endpoint',),
+    lock=_request_lock))
+http_in_flight = registry.register(Gauge(
+    'http_requests_in_flight', 'Requests currently being handled.', lock=_request_lock))
+request_queries = registry.register(Histogram(
+    'http_request_db_queries', 'Database queries issued per request, by endpoint.', ('endpoint',),
+    buckets=QUERY_COUNT_BUCKETS, lock=_request_lock))
+request_db_time = registry.register(Histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request, by endpoint.', ('endpoint',),
+    lock=_request_lock))
+db_queries = registry.register(Counter(
+    'db_queries_total', 'Database queries executed, including background threads.'))
+db_query_time = registry.register(Counter(
+    'db_query_seconds_total', 'Time spent executing database queries.'))
+
+points_ingested = registry.register(Counter(
+    'ev_points_ingested_total', 'GPS fixes accepted from vehicles.'))
+trips_started = registry.register(Counter(
+    'ev_trips_started_total', 'Trips started.'))
+trips_finished = registry.register(Counter(
+    'ev_trips_finished_total', 'Trips finalised.'))
+low_battery_alerts = registry.register(Counter(
+    'ev_low_battery_alerts_total', 'Vehicles whose battery crossed below the low-battery threshold.'))
+
+
+def _pool_in_use():
+    from app.utils.pool_monitor import pool_monitor
+    return pool_monitor.in_use
+
+
+def _write_queue_depth():
+    from app.services.trip_service import tracking_writer
+    return len(tracking_writer)
+
+
+def _identity_cache():
+    from app.services.identity_cache import identity_cache
+    return identity_cache
+
+
+registry.register(Gauge('db_pool_connections_in_use', 'Pooled database connections checked out.',
+                        function=_pool_in_use))
+registry.register(Gauge('tracking_write_queue_depth', 'Fixes waiting in the write-behind queue.',
+                        function=_write_queue_depth))
+registry.register(Counter('identity_cache_hits_total', 'Logged-in user lookups served from the cache.',
+                          function=lambda: _identity_cache().hits))
+registry.register(Counter('identity_cache_misses_total', 'Logged-in user lookups that read the database.',
+                          function=lambda: _identity_cache().misses))
+
+# Per-thread bookkeeping of the request being handled (Waitress runs one request per thread)
+_state = threading.local()
+_track_queries = False
+
+
+def init_app(app):
+    """
+    Install the request hooks and, unless METRICS_DB_QUERIES is false,
+    subscribe to the shared query timing (app.utils.query_events). Engine
+    events cost SQLAlchemy a fixed amount per query (see
+    tests/benchmarks/bench_metrics.py), hence the separate switch.
+    METRICS_ENABLED=false skips everything.
+    """
+    global _track_queries
+    registry.clear()
+    _track_queries = False
+    query_events.unsubscribe(_record_query)
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    # Ahead of the other hooks, so requests they reject (e.g. 429s) are timed and counted too
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+    app.after_request(_record_response)
+    app.teardown_request(_end_request)
+    if not app.config.get('METRICS_DB_QUERIES', True):
+        return
+    _track_queries = True
+    with app.app_context():
+        query_events.subscribe(db.engine, _record_query)
+
+
+def _start_request():
+    _state.started = time.perf_counter()
+    _state.queries = 0
+    _state.db_seconds = 0.0
+    with _request_lock:
+        http_in_flight._inc((), 1)
+
+
+def _record_response(response):
+    started = _state.started
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    _state.started = None
+    endpoint = request.endpoint or 'unmatched'
+    key = (endpoint,)
+    with _request_lock:
+        http_in_flight._inc((), -1)
+        http_latency._observe(elapsed, key)
+        http_requests._inc((endpoint, request.method, response.status_code))
+        if _track_queries:
+            request_queries._observe(_state.queries, key)
+            request_db_time._observe(_state.db_seconds, key)
+    return response
+
+
+def _end_request(exc=None):
+    # A request whose response was never finalised (after_request skipped) still leaves in-flight
+    if getattr(_state, 'started', None) is not None:
+        _state.started = None
+        http_in_flight.dec()
+
+
+def _record_query(statement, elapsed):
+    db_queries.inc()
+    db_query_time.inc(amount=elapsed)
+    if getattr(_state, 'started', None) is not None:
+        _state.queries += 1
+        _state.db_seconds += elapsed
@@ -1,6 +1,7 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import validates
 
 db = SQLAlchemy()
@@ -41,18 +42,25 @@ class Vehicle(db.Model):
     license_plate = db.Column(db.String(20), nullable=False, unique=True)
     model = db.Column(db.String(50))
     battery_capacity_kwh = db.Column(db.Float(5, 2), default=75.0)
-    status = db.Column(db.Enum('available', 'busy'), default='available')
+    status = db.Column(db.Enum('available', 'busy'), default='available', index=True)
     campus_id = db.Column(db.Integer, db.ForeignKey('campuses.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     battery_level = db.Column(db.Float, default=100.0)
 
+    # Latest telemetry, upserted by every location update (no scan of vehicle_tracking needed)
+    current_lat = db.Column(db.Float(10, 8))
+    current_lng = db.Column(db.Float(11, 8))
+    current_speed = db.Column(db.Float(5, 2))
+    last_seen_at = db.Column(db.DateTime)
+
     battery = db.relationship('BatteryStatus', backref='vehicle', uselist=False)
     tracking = db.relationship('VehicleTracking', backref='vehicle', lazy=True)
     trips = db.relationship('Trip', backref='vehicle', lazy=True)
 
     @property
     def active_trip(self):
-        return next((t for t in self.trips if t.status == 'active'), None)
+        # Targeted lookup; iterating self.trips would load the vehicle's whole history
+        return Trip.query.filter_by(vehicle_id=self.id, status='active').first()
 
     @validates('battery_capacity_kwh')
     def validate_capacity(self, key, value):
@@ -65,6 +73,8 @@ class Vehicle(db.Model):
 
 class VehicleTracking(db.Model):
     __tablename__ = 'vehicle_tracking'
+    # The latest fix of a trip by device time (TripService.ingest_batch) without scanning the trip
+    __table_args__ = (db.Index('idx_tracking_trip_time', 'trip_id', 'recorded_at'),)
     id = db.Column(db.Integer, primary_key=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id'), nullable=False, index=True)
     trip_id = db.Column(db.Integer, db.ForeignKey('trips.id'), nullable=True, index=True)
@@ -97,6 +107,13 @@ class BatteryStatus(db.Model):
 
 class Trip(db.Model):
     __tablename__ = 'trips'
+    __table_args__ = (
+        # Serves the keyset-paginated history: WHERE vehicle_id ORDER BY start_time, id
+        db.Index('idx_trips_vehicle_start', 'vehicle_id', 'start_time', 'id'),
+        # Covers the bucketed analytics GROUP BY without touching the table rows
+        db.Index('idx_trips_analytics', 'vehicle_id', 'status', 'start_time', 'total_distance_km',
+                 'average_speed_kmph', 'driving_score', 'energy_consumed_kwh'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id'), nullable=False, index=True)
@@ -123,10 +140,17 @@ class Trip(db.Model):
     harsh_braking_count = db.Column(db.Integer, default=0)
     overspeed_count = db.Column(db.Integer, default=0)
 
+    # Running analysis state, folded in point by point during live ingest
+    running_distance_km = db.Column(db.Double, default=0.0)
+    energy_consumed_kwh = db.Column(db.Double, default=0.0)
+    last_speed_kmph = db.Column(db.Double, default=0.0)
+
     driving_score = db.Column(db.Integer)
     driver_rating = db.Column(db.String(2))
 
     status = db.Column(db.Enum('active', 'completed'), default='active', index=True)
+    # Set once the trip's tracking points have been moved to cold storage
+    archived_at = db.Column(db.DateTime)
 
     @validates('driving_score')
     def validate_score(self, key, value):
@@ -137,6 +161,71 @@ class Trip(db.Model):
     def __repr__(self):
         return f"Trip(id={self.id}, vehicle={self.vehicle_id}, status='{self.status}')"
 
+class TripRoute(db.Model):
+    """Simplified route of a completed trip at one distance tolerance (level of detail)."""
+    __tablename__ = 'trip_routes'
+    __table_args__ = (db.UniqueConstraint('trip_id', 'tolerance_m', name='uq_trip_routes_level'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id', ondelete='CASCADE'), nullable=False, index=True)
+    tolerance_m = db.Column(db.Integer, nullable=False)
+    polyline = db.Column(db.Text, nullable=False)       # encoded polyline of the kept vertices
+    timeline = db.Column(db.Text, nullable=False)       # encoded seconds since start of each vertex
+    start_epoch = db.Column(db.BigInteger)
+    point_count = db.Column(db.Integer, nullable=False)
+    source_point_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"TripRoute(trip={self.trip_id}, tolerance={self.tolerance_m}m, points={self.point_count})"
+
+class UserStats(db.Model):
+    """Lifetime totals of a user's fleet, kept current as trips complete."""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_distance_km = db.Column(db.Double, nullable=False, default=0.0)
+    trip_count = db.Column(db.Integer, nullable=False, default=0)
+    # AVG(driving_score) = score_sum / scored_trip_count; unscored trips are left out as in SQL
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    scored_trip_count = db.Column(db.Integer, nullable=False, default=0)
+    vehicle_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"UserStats(user={self.user_id}, trips={self.trip_count})"
+
+class DeviceTokenRevocation(db.Model):
+    """
+    Deny-list entry for vehicle API tokens: one token (token_id set), or every
+    token of the vehicle issued before revoked_at (token_id NULL).
+    """
+    __tablename__ = 'device_token_revocations'
+    __table_args__ = (db.UniqueConstraint('vehicle_id', 'token_id', name='uq_device_token_revocations_token'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id', ondelete='CASCADE'), nullable=False, index=True)
+    token_id = db.Column(db.String(32))
+    # Millisecond precision: a token issued just after a revoke-all must stay valid
+    revoked_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=3), 'mysql'),
+                           nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"DeviceTokenRevocation(vehicle={self.vehicle_id}, token={self.token_id or '*'})"
+
+# Revision of the tables defined here; bump it with every model / schema.sql change
+SCHEMA_VERSION = 4
+
+class SchemaVersion(db.Model):
+    """Schema revisions applied to this database; the highest is current."""
+    __tablename__ = 'schema_version'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"SchemaVersion({self.version})"
+
 class RideRequest(db.Model):
     __tablename__ = 'ride_requests'
     id = db.Column(db.Integer, primary_key=True)
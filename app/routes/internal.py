@@ -0,0 +1,49 @@
+import logging
+from flask import Blueprint, Response, request, current_app, abort
+from app.metrics import registry
+from app.services.identity_cache import identity_cache
+from app.services.trip_service import tracking_writer
+from app.utils.pool_monitor import pool_monitor
+from app.utils.responses import success_response
+from app import limiter
+
+logger = logging.getLogger(__name__)
+
+internal = Blueprint('internal', __name__, url_prefix='/internal')
+# Prometheus scrapes the conventional /metrics path, outside the /internal prefix
+scrape = Blueprint('scrape', __name__)
+# Scraped by monitoring, so kept out of the per-client rate limits
+limiter.exempt(internal)
+limiter.exempt(scrape)
+
+
+@internal.before_request
+@scrape.before_request
+def restrict_to_operators():
+    """Operational endpoints are only served to INTERNAL_ALLOWED_IPS."""
+    if request.remote_addr not in current_app.config['INTERNAL_ALLOWED_IPS']:
+        abort(404)
+
+
+@internal.route('/ingest')
+def ingest_stats():
+    """Write-behind queue depth, throughput and flush latency."""
+    return success_response(data=tracking_writer.stats())
+
+
+@internal.route('/pool')
+def pool_stats():
+    """Database pool usage: connections in use, checkout waits, overflow and invalidations."""
+    return success_response(data=pool_monitor.stats())
+
+
+@internal.route('/identity')
+def identity_stats():
+    """Logged-in user cache size and hit rate."""
+    return success_response(data=identity_cache.stats())
+
+
+@scrape.route('/metrics')
+def prometheus_metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
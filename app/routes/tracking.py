@@ -1,16 +1,33 @@
+import json
 import logging
-from flask import Blueprint, request, render_template, current_app
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import Blueprint, Response, request, render_template, current_app, stream_with_context
 from flask_login import login_required, current_user
-from app.models import Vehicle, VehicleTracking, Trip
-from app.services.trip_service import TripService
+from app.models import Vehicle, Trip
+from app.services.trip_service import TripService, tracking_writer
+from app.services.route_service import RouteService, tolerance_for_zoom
+from app.services.vehicle_state import vehicle_state
+from app.services.device_token_service import DeviceTokenService, device_limiter
+from app.services.live_feed import broker, trip_topic, fleet_topic
+from app.utils.broker import BrokerFull
+from app.utils.write_behind import WriteBehindFull
 from app.utils.responses import success_response, error_response
-from app.utils.schemas import battery_update, trip_summary
-from app import limiter
+from app.utils.schemas import (battery_update, live_position, trip_summary, trip_route, trip_list_item,
+                               tracking_point)
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, page_size
+from app import csrf, db, limiter
 
 logger = logging.getLogger(__name__)
 
 tracking = Blueprint('tracking', __name__)
 
+# Default and maximum page sizes of the paginated listings
+TRIP_PAGE_SIZE, TRIP_PAGE_MAX = 25, 200
+POINT_PAGE_SIZE, POINT_PAGE_MAX = 1000, 5000
+
 # --------------- Page routes ---------------
 
 @tracking.route('/track/<int:trip_id>')
@@ -19,10 +36,12 @@ def live_track(trip_id):
     trip = Trip.query.filter_by(id=trip_id, status='active').first_or_404()
     vehicle = trip.vehicle
     
-    if vehicle.user_id != current_user.id:
+    # Admins may watch any trip; only the owner drives the simulation
+    observer = vehicle.user_id != current_user.id
+    if observer and current_user.role != 'admin':
         return render_template('403.html'), 403
         
-    return render_template('tracking.html', target_vehicle=vehicle, trip=trip)
+    return render_template('tracking.html', target_vehicle=vehicle, trip=trip, observer=observer)
 
 @tracking.route('/view_map/<int:trip_id>')
 @login_required
@@ -37,10 +56,38 @@ def view_map(trip_id):
         return render_template('tracking.html', target_vehicle=vehicle, trip=trip,
                                error="This trip is still active or incomplete.")
 
-    points = VehicleTracking.query.filter_by(trip_id=trip.id) \
-                 .order_by(VehicleTracking.recorded_at).all()
-    coordinates = [[p.latitude, p.longitude] for p in points]
-    return render_template("map.html", vehicle=vehicle, coordinates=coordinates)
+    # The route itself is fetched by the page from get_trip_route
+    return render_template("map.html", vehicle=vehicle, trip=trip)
+
+@tracking.route('/api/trips/<int:trip_id>/route')
+@login_required
+def get_trip_route(trip_id):
+    """
+    Simplified route of a completed trip for a map zoom level.
+
+    Query: zoom (Leaflet zoom, picks the level of detail) and optional
+    step (replay seconds per frame).
+    """
+    trip = Trip.query.get(trip_id)
+    if not trip or trip.vehicle.user_id != current_user.id:
+        return error_response("Trip not found", status_code=404)
+    if trip.status != 'completed':
+        return error_response("Trip is still active", status_code=409)
+
+    zoom = request.args.get('zoom', type=int)
+    step = request.args.get('step', type=int)
+    try:
+        route = RouteService.get_route(trip_id, tolerance_for_zoom(zoom))
+        step_s, frames = RouteService.replay_frames(route, step)
+    except Exception:
+        logger.exception("trip_route failed for trip %s", trip_id)
+        return error_response("Could not load route", status_code=500)
+
+    response, status = success_response(data=trip_route(route, step_s, frames))
+    # A completed trip's route never changes
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response, status
+
 
 @tracking.route('/trips/<int:vehicle_id>')
 @login_required
@@ -48,18 +95,74 @@ def trip_history(vehicle_id):
     vehicle = Vehicle.query.get_or_404(vehicle_id)
     if vehicle.user_id != current_user.id:
         return render_template('403.html'), 403
-    trips = Trip.query.filter_by(vehicle_id=vehicle_id) \
-                .order_by(Trip.start_time.desc()).all()
-    return render_template('trip_history.html', vehicle=vehicle, trips=trips)
+    # Rows are loaded page by page from vehicle_trips as the user scrolls
+    return render_template('trip_history.html', vehicle=vehicle)
+
+# --------------- Device authentication ---------------
+
+# The request's verified DeviceIdentity (or None), memoised in the WSGI environ
+_DEVICE_KEY = 'ev_tracking.device'
+
+
+def _bearer_token():
+    """The token of an `Authorization: Bearer` header; None without one or for another scheme."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else None
+
+
+def _device_identity():
+    """The verified vehicle token of this request, if it carries one."""
+    environ = request.environ
+    if _DEVICE_KEY not in environ:
+        token = _bearer_token()
+        environ[_DEVICE_KEY] = DeviceTokenService.verify(token) if token else None
+    return environ[_DEVICE_KEY]
+
+
+def device_or_login_required(view):
+    """
+    Accept either a vehicle API token (Authorization: Bearer) or the login
+    session. Token calls skip the session, CSRF and per-IP limits and are
+    limited per vehicle instead; session calls keep CSRF protection. Other
+    Authorization schemes (e.g. Basic added by a proxy) are left to the session.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if _bearer_token() is not None:
+            device = _device_identity()
+            if device is None:
+                return error_response("Invalid or revoked device token", status_code=401)
+            allowed, retry_after = device_limiter.consume(device.vehicle_id)
+            if not allowed:
+                response, status = error_response("Rate limit exceeded for this vehicle", status_code=429)
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, status
+            return view(*args, **kwargs)
+        if current_app.config.get('WTF_CSRF_ENABLED', True):
+            csrf.protect()
+        return login_required(view)(*args, **kwargs)
+    return csrf.exempt(wrapped)
+
+
+def _may_drive(vehicle_id, owner_id):
+    """Whether the caller (vehicle token or logged-in owner) may act for this vehicle."""
+    device = request.environ.get(_DEVICE_KEY)
+    if device is not None:
+        # A vehicle that changed hands invalidates the tokens its previous owner issued
+        return device.vehicle_id == vehicle_id and device.owner_id == owner_id
+    return current_user.id == owner_id
+
 
 # --------------- API routes ---------------
 
 @tracking.route('/api/update_location', methods=['POST'])
-@login_required
-@limiter.limit("60 per minute")
+@limiter.limit("60 per minute", exempt_when=_device_identity)
+@device_or_login_required
 def update_location():
     data = request.get_json(silent=True) or {}
-    vehicle_id = data.get('vehicle_id')
+    # A vehicle token implies the vehicle
+    device = request.environ.get(_DEVICE_KEY)
+    vehicle_id = data.get('vehicle_id') or (device.vehicle_id if device else None)
     lat = data.get('lat')
     lng = data.get('lng')
 
@@ -67,30 +170,50 @@ def update_location():
         return error_response("Missing required fields: vehicle_id, lat, lng",
                               status_code=400)
 
-    vehicle = Vehicle.query.get(vehicle_id)
-    if not vehicle or vehicle.user_id != current_user.id:
+    try:
+        vehicle_id = int(vehicle_id)
+    except (TypeError, ValueError):
+        return error_response("Invalid vehicle_id", status_code=400)
+    try:
+        lat, lng = _parse_coordinates(lat, lng)
+    except (TypeError, ValueError):
+        return error_response("lat and lng must be a valid position", status_code=400)
+
+    owner_id = vehicle_state.owner_id(vehicle_id)
+    if owner_id is None or not _may_drive(vehicle_id, owner_id):
         return error_response("Unauthorized", status_code=403)
 
     try:
-        battery = TripService.update_location(vehicle_id, lat, lng)
-        return success_response(data=battery_update(battery))
+        battery_pct = TripService.update_location(vehicle_id, lat, lng)
+        return success_response(data=battery_update(battery_pct))
+    except WriteBehindFull:
+        logger.warning("Tracking write queue full, rejecting fix for vehicle %s", vehicle_id)
+        response, status = error_response("Server busy, retry shortly", status_code=503)
+        response.headers['Retry-After'] = str(max(1, math.ceil(tracking_writer.flush_interval)))
+        return response, status
     except Exception as e:
         logger.exception("update_location failed for vehicle %s", vehicle_id)
         return error_response("Location update failed", status_code=500)
 
 
 @tracking.route('/api/trip/end', methods=['POST'])
-@login_required
-@limiter.limit("10 per minute")
+@limiter.limit("10 per minute", exempt_when=_device_identity)
+@device_or_login_required
 def end_trip():
     data = request.get_json(silent=True) or {}
-    vehicle_id = data.get('vehicle_id')
+    device = request.environ.get(_DEVICE_KEY)
+    vehicle_id = data.get('vehicle_id') or (device.vehicle_id if device else None)
 
     if not vehicle_id:
         return error_response("Missing vehicle_id", status_code=400)
 
-    vehicle = Vehicle.query.get(vehicle_id)
-    if not vehicle or vehicle.user_id != current_user.id:
+    try:
+        vehicle_id = int(vehicle_id)
+    except (TypeError, ValueError):
+        return error_response("Invalid vehicle_id", status_code=400)
+
+    owner_id = vehicle_state.owner_id(vehicle_id)
+    if owner_id is None or not _may_drive(vehicle_id, owner_id):
         return error_response("Unauthorized", status_code=403)
 
     try:
@@ -101,3 +224,246 @@ def end_trip():
     except Exception as e:
         logger.exception("end_trip failed for vehicle %s", vehicle_id)
         return error_response("Could not end trip", status_code=500)
+
+
+@tracking.route('/api/update_location/batch', methods=['POST'])
+@login_required
+@limiter.limit("30 per minute")
+def update_location_batch():
+    """
+    Ingest a buffered array of fixes for one or many vehicles in one request.
+
+    Body: {"points": [{"vehicle_id", "lat", "lng", "speed", "recorded_at"}, ...]}
+    where recorded_at is the device timestamp (ISO 8601 or epoch seconds), at
+    most TRACKING_MAX_CLOCK_SKEW seconds ahead of the server clock.
+    """
+    data = request.get_json(silent=True) or {}
+    raw_points = data.get('points')
+
+    if not isinstance(raw_points, list) or not raw_points:
+        return error_response("Missing required field: points", status_code=400)
+
+    max_points = current_app.config['TRACKING_BATCH_MAX_POINTS']
+    if len(raw_points) > max_points:
+        return error_response(f"Batch too large: at most {max_points} points allowed",
+                              status_code=413)
+
+    try:
+        points = [_parse_point(p) for p in raw_points]
+    except (AttributeError, TypeError, ValueError, KeyError, OverflowError, OSError):
+        # OverflowError / OSError: epoch timestamps outside what the platform can convert
+        return error_response("Each point needs vehicle_id, lat, lng and a valid recorded_at",
+                              status_code=400)
+
+    vehicle_ids = {p['vehicle_id'] for p in points}
+    owned = Vehicle.query.with_entities(Vehicle.id).filter(
+        Vehicle.id.in_(vehicle_ids), Vehicle.user_id == current_user.id
+    ).count()
+    if owned != len(vehicle_ids):
+        return error_response("Unauthorized", status_code=403)
+
+    try:
+        batteries = TripService.ingest_batch(points)
+        return success_response(data={
+            "accepted": len(points),
+            "vehicles": [
+                {"vehicle_id": vehicle_id, **battery_update(battery_pct)}
+                for vehicle_id, battery_pct in batteries.items()
+            ],
+        })
+    except Exception:
+        logger.exception("update_location_batch failed for vehicles %s", sorted(vehicle_ids))
+        return error_response("Batch location update failed", status_code=500)
+
+
+@tracking.route('/api/stream/trip/<int:trip_id>')
+@login_required
+@limiter.limit("20 per minute")
+def stream_trip(trip_id):
+    """Server-Sent Events feed of an active trip's positions and battery alerts."""
+    trip = Trip.query.filter_by(id=trip_id, status='active').first()
+    if not trip:
+        return error_response("Trip not found or not active", status_code=404)
+    if trip.vehicle.user_id != current_user.id and current_user.role != 'admin':
+        return error_response("Unauthorized", status_code=403)
+    return _open_stream(trip_topic(trip_id))
+
+
+@tracking.route('/api/stream/fleet')
+@login_required
+@limiter.limit("20 per minute")
+def stream_fleet():
+    """Server-Sent Events feed of every vehicle's positions (admins) or the user's own."""
+    if current_user.role == 'admin':
+        return _open_stream(fleet_topic())
+    return _open_stream(fleet_topic(current_user.id))
+
+
+@tracking.route('/api/trips/<int:trip_id>/position')
+@login_required
+@limiter.limit("30 per minute")
+def trip_position(trip_id):
+    """Latest stored position of a trip's vehicle, polled by pages when live streams are off."""
+    trip = Trip.query.get(trip_id)
+    if not trip:
+        return error_response("Trip not found", status_code=404)
+    vehicle = trip.vehicle
+    if vehicle.user_id != current_user.id and current_user.role != 'admin':
+        return error_response("Unauthorized", status_code=403)
+
+    position = None
+    if vehicle.current_lat is not None:
+        position = live_position(vehicle.id, trip.id,
+                                 [(vehicle.current_lat, vehicle.current_lng, vehicle.last_seen_at)],
+                                 vehicle.current_speed, vehicle.battery_level)
+    return success_response(data={"status": trip.status, "position": position})
+
+
+@tracking.route('/api/vehicles/<int:vehicle_id>/trips')
+@login_required
+def vehicle_trips(vehicle_id):
+    """Trip history of one vehicle, newest first (keyset-paginated)."""
+    vehicle = Vehicle.query.get(vehicle_id)
+    if not vehicle or vehicle.user_id != current_user.id:
+        return error_response("Vehicle not found", status_code=404)
+    return _paginate(
+        'trips:desc',
+        lambda after, limit: TripService.get_trip_page([vehicle_id], after, limit),
+        trip_list_item, TRIP_PAGE_SIZE, TRIP_PAGE_MAX,
+    )
+
+
+@tracking.route('/api/trips')
+@login_required
+def user_trips():
+    """Completed trips across the user's vehicles; ?order=oldest|newest (default newest)."""
+    vehicle_ids = [row.id for row in Vehicle.query.with_entities(Vehicle.id).filter_by(user_id=current_user.id)]
+    newest_first = request.args.get('order', 'newest') != 'oldest'
+    return _paginate(
+        'trips:desc' if newest_first else 'trips:asc',
+        lambda after, limit: TripService.get_trip_page(vehicle_ids, after, limit, newest_first, status='completed'),
+        trip_list_item, TRIP_PAGE_SIZE, TRIP_PAGE_MAX,
+    )
+
+
+@tracking.route('/api/trips/<int:trip_id>/points')
+@login_required
+def trip_points(trip_id):
+    """Stored GPS fixes of a trip in recording order (keyset-paginated)."""
+    trip = Trip.query.get(trip_id)
+    if not trip or trip.vehicle.user_id != current_user.id:
+        return error_response("Trip not found", status_code=404)
+    return _paginate(
+        'points',
+        lambda after, limit: TripService.get_point_page(trip, after, limit),
+        tracking_point, POINT_PAGE_SIZE, POINT_PAGE_MAX,
+    )
+
+
+def _paginate(scope, fetch_page, serialize, default_size, max_size):
+    """
+    Serve a keyset-paginated listing.
+
+    fetch_page(after, limit) returns (rows, next key or None). By default
+    one page of ?limit= rows (capped at max_size) is returned with an opaque
+    next_cursor; with ?format=ndjson everything after ?cursor= is streamed as
+    newline-delimited JSON, fetched max_size rows at a time.
+    """
+    try:
+        after = decode_cursor(scope, request.args.get('cursor'))
+    except InvalidCursor:
+        return error_response("Invalid cursor", status_code=400)
+
+    if request.args.get('format') == 'ndjson':
+        def generate(after):
+            while True:
+                rows, after = fetch_page(after, max_size)
+                for row in rows:
+                    yield json.dumps(serialize(row)) + "\n"
+                if after is None:
+                    return
+        return Response(stream_with_context(generate(after)), mimetype='application/x-ndjson')
+
+    rows, next_key = fetch_page(after, page_size(request.args.get('limit'), default_size, max_size))
+    return success_response(data={
+        "items": [serialize(row) for row in rows],
+        "next_cursor": encode_cursor(scope, *next_key) if next_key else None,
+    })
+
+
+def _open_stream(topic):
+    if broker.max_subscribers <= 0:
+        # Turned off, e.g. with several worker processes (see wsgi.worker_config)
+        return error_response("Live streams are disabled on this server", status_code=503)
+    try:
+        subscription = broker.subscribe(topic)
+    except BrokerFull:
+        response, status = error_response("Too many live viewers, try again shortly", status_code=503)
+        response.headers['Retry-After'] = '30'
+        return response, status
+
+    heartbeat = current_app.config['LIVE_STREAM_HEARTBEAT']
+    max_duration = current_app.config['LIVE_STREAM_MAX_DURATION']
+    # The stream outlives the request context on purpose: give the pooled
+    # connection back now instead of holding it for the life of the stream
+    db.session.remove()
+
+    return Response(_event_stream(subscription, heartbeat, max_duration),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def _event_stream(subscription, heartbeat, max_duration):
+    deadline = time.monotonic() + max_duration
+    try:
+        yield "retry: 3000\n\n"
+        while not subscription.dropped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = subscription.get(timeout=min(heartbeat, remaining))
+            if message is None:
+                # Comment line: keeps proxies from idling the connection out and
+                # surfaces a disconnected client as a failed write
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event, data = message
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        subscription.close()
+
+
+def _parse_coordinates(lat, lng):
+    """lat/lng as floats; raises TypeError/ValueError unless they are a real position."""
+    lat, lng = float(lat), float(lng)
+    # Also rejects NaN, which fails every comparison
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"Coordinates out of range: {lat}, {lng}")
+    return lat, lng
+
+
+def _parse_point(raw):
+    """Validate one batch entry and normalise it for TripService.ingest_batch."""
+    recorded_at = raw.get('recorded_at')
+    if recorded_at is None:
+        recorded_at = datetime.utcnow()
+    elif isinstance(recorded_at, (int, float)):
+        recorded_at = datetime.fromtimestamp(recorded_at, tz=timezone.utc).replace(tzinfo=None)
+    else:
+        recorded_at = datetime.fromisoformat(str(recorded_at).replace('Z', '+00:00'))
+        if recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+    # A fix from the future would stay "latest" and stop every real fix from being folded
+    skew = timedelta(seconds=current_app.config['TRACKING_MAX_CLOCK_SKEW'])
+    if recorded_at > datetime.utcnow() + skew:
+        raise ValueError(f"recorded_at is in the future: {recorded_at}")
+
+    lat, lng = _parse_coordinates(raw['lat'], raw['lng'])
+
+    return {
+        'vehicle_id': int(raw['vehicle_id']),
+        'lat': lat,
+        'lng': lng,
+        'speed': float(raw.get('speed') or 0.0),
+        'recorded_at': recorded_at,
+    }
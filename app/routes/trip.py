@@ -4,7 +4,9 @@ from flask_login import login_required, current_user
 from app.models import Trip, Vehicle, Campus, db
 from app.forms import TripRequestForm
 from app.services.trip_service import TripService
-from datetime import datetime
+from app.services.analytics_service import AnalyticsService
+from app.utils.responses import success_response, error_response
+from datetime import datetime, timedelta
 
 
 logger = logging.getLogger(__name__)
@@ -65,25 +67,33 @@ def request_trip():
 @trip.route('/analytics')
 @login_required
 def analytics():
-    try:
-        trips = Trip.query.join(Vehicle).filter(
-            Vehicle.user_id == current_user.id,
-            Trip.status == 'completed'
-        ).order_by(Trip.start_time).all()
-
-        if not trips:
-            return render_template("analytics.html", trips=None)
+    # Charts come from trip.analytics_buckets; the trip log is paged from tracking.user_trips
+    return render_template("analytics.html")
 
-        labels = [f"Trip {i+1}" for i in range(len(trips))]
-        distances = [float(t.total_distance_km or 0) for t in trips]
-        speeds = [float(t.average_speed_kmph or 0) for t in trips]
+@trip.route('/api/analytics')
+@login_required
+def analytics_buckets():
+    """
+    Completed-trip totals per ?bucket=day|week|month between ?from= and ?to=
+    (ISO dates, UTC; default the last 30 days).
+    """
+    try:
+        last_day = _parse_day(request.args.get('to')) or datetime.utcnow().date()
+        first_day = _parse_day(request.args.get('from')) or last_day - timedelta(days=29)
+        bucket = request.args.get('bucket', 'day')
+        buckets = AnalyticsService.get_buckets(current_user.id, first_day, last_day, bucket)
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception:
+        logger.exception("Failed to aggregate analytics for user %s", current_user.id)
+        return error_response("Could not load analytics", status_code=500)
+    return success_response(data={"bucket": bucket, "buckets": buckets})
 
-        return render_template("analytics.html",
-                               trips=trips,
-                               labels=labels,
-                               distances=distances,
-                               speeds=speeds)
-    except Exception as e:
-        logger.exception("Failed to load analytics for user %s", current_user.id)
-        return render_template("analytics.html", trips=None)
 
+def _parse_day(raw):
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{raw}', expected YYYY-MM-DD")
@@ -1,8 +1,11 @@
 import logging
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import current_user, login_required
+from app.models import DeviceTokenRevocation, Vehicle
 from app.services.vehicle_service import VehicleService
+from app.services.device_token_service import DeviceTokenService
 from app.forms import VehicleForm
+from app.utils.responses import success_response, error_response
 from app import limiter
 
 logger = logging.getLogger(__name__)
@@ -13,7 +16,7 @@ vehicle = Blueprint('vehicle', __name__)
 @login_required
 def dashboard():
     try:
-        vehicles = VehicleService.get_user_vehicles(current_user.id)
+        vehicles = VehicleService.get_dashboard_vehicles(current_user.id)
     except Exception:
         logger.exception("Failed to load dashboard for user %s", current_user.id)
         flash('Could not load your vehicles. Please try again.', 'danger')
@@ -42,3 +45,34 @@ def add_vehicle():
 
     return render_template('add_vehicle.html', form=form)
 
+
+@vehicle.route('/api/vehicles/<int:vehicle_id>/tokens', methods=['POST'])
+@login_required
+@limiter.limit("10 per minute")
+def issue_device_token(vehicle_id):
+    """Issue an API token the vehicle uses for update_location / trip end. Shown once."""
+    vehicle = Vehicle.query.get(vehicle_id)
+    if not vehicle or vehicle.user_id != current_user.id:
+        return error_response("Unauthorized", status_code=403)
+    token, token_id = DeviceTokenService.issue(vehicle_id)
+    return success_response("Device token issued",
+                            {"vehicle_id": vehicle_id, "token_id": token_id, "token": token}, status_code=201)
+
+
+@vehicle.route('/api/vehicles/<int:vehicle_id>/tokens/revoke', methods=['POST'])
+@login_required
+@limiter.limit("10 per minute")
+def revoke_device_tokens(vehicle_id):
+    """Revoke one token ({"token_id": ...}) or, without a token_id, all of the vehicle's tokens."""
+    vehicle = Vehicle.query.get(vehicle_id)
+    if not vehicle or vehicle.user_id != current_user.id:
+        return error_response("Unauthorized", status_code=403)
+    token_id = (request.get_json(silent=True) or {}).get('token_id')
+    max_length = DeviceTokenRevocation.token_id.type.length
+    if token_id is not None and not (isinstance(token_id, str) and 0 < len(token_id) <= max_length):
+        return error_response(f"token_id must be a string of at most {max_length} characters", status_code=400)
+    try:
+        DeviceTokenService.revoke(vehicle_id, token_id)
+    except Exception:
+        return error_response("Could not revoke the token", status_code=500)
+    return success_response("Device token revoked" if token_id else "All device tokens revoked")
@@ -1,6 +1,7 @@
 import logging
 from app import db
 from app.models import User, Vehicle, Trip
+from app.utils.aggregate_cache import AggregateCache
 from sqlalchemy import func, desc
 
 logger = logging.getLogger(__name__)
@@ -11,42 +12,22 @@ class AdminService:
     def get_dashboard_stats():
         """
         Aggregate global system statistics for the admin dashboard.
+
+        Served from admin_stats: counts are kept current by the record_*
+        hooks and the full aggregation reruns in the background once stale.
         """
         try:
-            total_users = User.query.count()
-            total_vehicles = Vehicle.query.count()
-            total_trips = Trip.query.count()
-
-            # Aggregate system-wide distance and average score
-            stats = db.session.query(
-                func.sum(Trip.total_distance_km),
-                func.avg(Trip.driving_score)
-            ).first()
-
-            # Find the top-rated user based on average driving score
-            # Requires joining User -> Vehicle -> Trip
-            top_user = (
-                db.session.query(
-                    User.username,
-                    func.avg(Trip.driving_score).label('avg_score')
-                )
-                .select_from(User)
-                .join(Vehicle, Vehicle.user_id == User.id)
-                .join(Trip, Trip.vehicle_id == Vehicle.id)
-                .group_by(User.id)
-                .order_by(desc('avg_score'))
-                .first()
-            )
-
+            stats = admin_stats.get()
+            scored = stats["score_count"]
             return {
                 "success": True,
                 "data": {
-                    "total_users": total_users,
-                    "total_vehicles": total_vehicles,
-                    "total_trips": total_trips,
-                    "total_distance": round(float(stats[0] or 0), 2),
-                    "avg_score": round(float(stats[1] or 0), 2),
-                    "top_user": top_user
+                    "total_users": stats["total_users"],
+                    "total_vehicles": stats["total_vehicles"],
+                    "total_trips": stats["total_trips"],
+                    "total_distance": round(stats["total_distance"], 2),
+                    "avg_score": round(stats["score_sum"] / scored, 2) if scored else 0,
+                    "top_user": stats["top_user"]
                 }
             }
         except Exception:
@@ -56,3 +37,74 @@ class AdminService:
                 "error": "Could not load dashboard statistics."
             }
 
+    @staticmethod
+    def compute_dashboard_stats():
+        """Run the full aggregation over users, vehicles and trips."""
+        total_users = User.query.count()
+        total_vehicles = Vehicle.query.count()
+        total_trips = Trip.query.count()
+
+        # Aggregate system-wide distance and the parts of the average score
+        stats = db.session.query(
+            func.sum(Trip.total_distance_km),
+            func.sum(Trip.driving_score),
+            func.count(Trip.driving_score)
+        ).first()
+
+        # Find the top-rated user based on average driving score
+        # Requires joining User -> Vehicle -> Trip
+        top_user = (
+            db.session.query(
+                User.username,
+                func.avg(Trip.driving_score).label('avg_score')
+            )
+            .select_from(User)
+            .join(Vehicle, Vehicle.user_id == User.id)
+            .join(Trip, Trip.vehicle_id == Vehicle.id)
+            .group_by(User.id)
+            .order_by(desc('avg_score'))
+            .first()
+        )
+
+        return {
+            "total_users": total_users,
+            "total_vehicles": total_vehicles,
+            "total_trips": total_trips,
+            "total_distance": float(stats[0] or 0),
+            "score_sum": int(stats[1] or 0),
+            "score_count": int(stats[2] or 0),
+            "top_user": (top_user[0], float(top_user[1] or 0)) if top_user else None
+        }
+
+    # Event hooks, called after the triggering change has been committed
+
+    @staticmethod
+    def record_user_registered():
+        AdminService._bump(total_users=1)
+
+    @staticmethod
+    def record_vehicle_added():
+        AdminService._bump(total_vehicles=1)
+
+    @staticmethod
+    def record_trip_started():
+        AdminService._bump(total_trips=1)
+
+    @staticmethod
+    def record_trip_completed(trip):
+        score = trip.driving_score
+        AdminService._bump(
+            total_distance=float(trip.total_distance_km or 0),
+            score_sum=score or 0,
+            score_count=0 if score is None else 1,
+        )
+        # The top user can change with any score; recompute it in the background
+        admin_stats.invalidate()
+
+    @staticmethod
+    def _bump(**deltas):
+        admin_stats.apply(lambda stats: stats.update({k: stats[k] + v for k, v in deltas.items()}))
+
+
+# Global dashboard aggregates; the TTL is set from ADMIN_STATS_TTL in create_app
+admin_stats = AggregateCache(AdminService.compute_dashboard_stats, name='admin-stats')
@@ -0,0 +1,144 @@
+import logging
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from app import db
+from app.models import Trip, Vehicle
+from app.utils.lru_cache import LRUCache
+from app.utils.schemas import analytics_bucket
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ('day', 'week', 'month')
+# Upper bound on buckets per request, so a response never grows with the range
+MAX_BUCKETS = 400
+
+
+class BucketTotals(namedtuple('BucketTotals', 'trips distance_km speed_sum score_sum scored energy_kwh')):
+    """Additive sums of one bucket; averages are derived when presenting it."""
+    __slots__ = ()
+
+    def plus(self, other):
+        return BucketTotals(*(a + b for a, b in zip(self, other)))
+
+
+EMPTY_BUCKET = BucketTotals(0, 0.0, 0.0, 0, 0, 0.0)
+
+# Totals of closed buckets keyed by (user_id, bucket, bucket_start). They only change
+# when a trip started in them completes late; the TTL bounds how long another
+# process (which did not see that completion) serves the old totals
+bucket_cache = LRUCache(maxsize=20000, ttl=3600)
+
+
+def bucket_start(day, bucket):
+    """First day of the day/week (ISO, Monday)/month bucket containing day."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, bucket):
+    """First day of the bucket following the one starting at start."""
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+class AnalyticsService:
+    @staticmethod
+    def get_buckets(user_id, first_day, last_day, bucket='day'):
+        """
+        Completed-trip aggregates of a user's fleet per day, week or month.
+
+        The range [first_day, last_day] is widened to whole buckets and every
+        bucket is returned, empty ones included. Buckets that ended before
+        today (UTC) come from bucket_cache once computed; only the span of
+        uncached buckets is aggregated in the database.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        if first_day > last_day:
+            raise ValueError("The range must not end before it starts")
+
+        starts = []
+        start = bucket_start(first_day, bucket)
+        while start <= last_day:
+            starts.append(start)
+            if len(starts) > MAX_BUCKETS:
+                raise ValueError(f"At most {MAX_BUCKETS} buckets per request")
+            start = next_bucket(start, bucket)
+
+        today = datetime.utcnow().date()
+        totals = {}
+        missing = []
+        for start in starts:
+            cached = bucket_cache.get((user_id, bucket, start)) if next_bucket(start, bucket) <= today else None
+            if cached is None:
+                missing.append(start)
+            else:
+                totals[start] = cached
+
+        if missing:
+            # A completion invalidating these buckets while we read them bumps the generation
+            generation = bucket_cache.generation
+            fresh = dict.fromkeys(missing, EMPTY_BUCKET)
+            daily = AnalyticsService._daily_totals(user_id, missing[0], next_bucket(missing[-1], bucket))
+            for day, day_totals in daily.items():
+                start = bucket_start(day, bucket)
+                if start in fresh:
+                    fresh[start] = fresh[start].plus(day_totals)
+            for start, bucket_totals in fresh.items():
+                totals[start] = bucket_totals
+                if next_bucket(start, bucket) <= today:
+                    bucket_cache.put((user_id, bucket, start), bucket_totals, generation)
+
+        return [analytics_bucket(start, totals[start]) for start in starts]
+
+    @staticmethod
+    def record_trip_completed(user_id, trip):
+        """Drop cached buckets a late-finishing trip falls into (it may have started days ago)."""
+        if trip.start_time is None:
+            return
+        day = trip.start_time.date()
+        for bucket in BUCKETS:
+            bucket_cache.pop((user_id, bucket, bucket_start(day, bucket)))
+
+    @staticmethod
+    def _daily_totals(user_id, first_day, end_day):
+        """
+        Per-day sums of completed trips started in [first_day, end_day).
+        One GROUP BY served by idx_trips_analytics; week and month buckets are
+        rolled up from these rows in Python so the SQL stays portable.
+        """
+        day = func.date(Trip.start_time).label('day')
+        rows = db.session.execute(
+            select(
+                day,
+                func.count(Trip.id),
+                func.sum(Trip.total_distance_km),
+                func.sum(Trip.average_speed_kmph),
+                func.sum(Trip.driving_score),
+                func.count(Trip.driving_score),
+                func.sum(Trip.energy_consumed_kwh),
+            )
+            .where(
+                Trip.vehicle_id.in_(select(Vehicle.id).where(Vehicle.user_id == user_id)),
+                Trip.status == 'completed',
+                Trip.start_time >= datetime.combine(first_day, datetime.min.time()),
+                Trip.start_time < datetime.combine(end_day, datetime.min.time()),
+            )
+            .group_by(day)
+        )
+        daily = {}
+        for row_day, trips, distance, speed_sum, score_sum, scored, energy in rows:
+            # SQLite returns DATE() as text, MySQL as a date
+            row_day = date.fromisoformat(row_day) if isinstance(row_day, str) else row_day
+            daily[row_day] = BucketTotals(
+                trips, float(distance or 0), float(speed_sum or 0),
+                int(score_sum or 0), scored, float(energy or 0),
+            )
+        return daily
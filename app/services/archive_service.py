@@ -0,0 +1,128 @@
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, type_coerce
+
+from app import db
+from app.models import Trip, VehicleTracking
+from app.utils.lazy import lazy_import
+from app.utils.trip_archive import encode_track, decode_track
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+# Rough InnoDB footprint of one vehicle_tracking row, counting the clustered
+# record and its three secondary indexes; used to estimate the space freed
+HOT_ROW_BYTES = 110
+
+ArchivedPoint = namedtuple('ArchivedPoint', 'latitude longitude speed recorded_at')
+
+
+class ArchiveService:
+    """
+    Cold storage for the tracking points of completed trips.
+
+    Each archived trip's points live in one compressed file under
+    TRIP_ARCHIVE_DIR and the trip is stamped with archived_at. The file is
+    written atomically before the hot rows are deleted, and the delete and
+    the stamp share one transaction, so an interrupted run is simply
+    picked up again by the next one.
+    """
+
+    @staticmethod
+    def archive_completed_trips(older_than_days, limit=None):
+        """
+        Move the points of trips completed more than older_than_days ago into
+        the archive. Returns a report of trips archived, rows moved and bytes.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        query = db.session.query(Trip.id).filter(
+            Trip.status == 'completed', Trip.archived_at.is_(None), Trip.end_time < cutoff
+        ).order_by(Trip.id)
+        if limit:
+            query = query.limit(limit)
+        trip_ids = [row.id for row in query]
+
+        report = {'trips': 0, 'rows_moved': 0, 'archive_bytes': 0}
+        for trip_id in trip_ids:
+            rows, size = ArchiveService.archive_trip(trip_id)
+            report['trips'] += 1
+            report['rows_moved'] += rows
+            report['archive_bytes'] += size
+
+        report['hot_bytes_estimate'] = report['rows_moved'] * HOT_ROW_BYTES
+        report['bytes_saved'] = report['hot_bytes_estimate'] - report['archive_bytes']
+        return report
+
+    @staticmethod
+    def archive_trip(trip_id):
+        """Archive one trip's points. Returns (rows moved, archive file size)."""
+        try:
+            rows = db.session.execute(
+                select(
+                    type_coerce(VehicleTracking.latitude, db.Double),
+                    type_coerce(VehicleTracking.longitude, db.Double),
+                    type_coerce(VehicleTracking.speed, db.Double),
+                    VehicleTracking.recorded_at,
+                ).where(VehicleTracking.trip_id == trip_id)
+                .order_by(VehicleTracking.recorded_at, VehicleTracking.id)
+            ).all()
+
+            size = 0
+            if rows:
+                lats, lngs, speeds, times = zip(*rows)
+                times_us = np.array(times, dtype='datetime64[us]').astype(np.int64)
+                blob = encode_track(lats, lngs, [s or 0.0 for s in speeds], times_us)
+                ArchiveService._write_atomic(ArchiveService.archive_path(trip_id), blob)
+                size = len(blob)
+
+                db.session.execute(delete(VehicleTracking).where(VehicleTracking.trip_id == trip_id))
+            db.session.query(Trip).filter(Trip.id == trip_id).update({'archived_at': datetime.utcnow()})
+            db.session.commit()
+            return len(rows), size
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to archive trip %s", trip_id)
+            raise
+
+    @staticmethod
+    def read_track(trip_id):
+        """The archived Track of a trip, or None if it has not been archived."""
+        try:
+            with open(ArchiveService.archive_path(trip_id), 'rb') as f:
+                return decode_track(f.read())
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def load_points(trip_id):
+        """Archived points as VehicleTracking-like tuples, in recording order."""
+        track = ArchiveService.read_track(trip_id)
+        if track is None:
+            return []
+        times = track.times_us.astype('datetime64[us]').tolist()
+        return [
+            ArchivedPoint(lat, lng, speed, recorded_at)
+            for lat, lng, speed, recorded_at in zip(track.lats.tolist(), track.lngs.tolist(),
+                                                    track.speeds.tolist(), times)
+        ]
+
+    @staticmethod
+    def archive_path(trip_id):
+        # Shard by thousands so no directory grows unbounded
+        return os.path.join(current_app.config['TRIP_ARCHIVE_DIR'], f"{trip_id // 1000:06d}",
+                            f"trip-{trip_id}.evta")
+
+    @staticmethod
+    def _write_atomic(path, blob):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -1,7 +1,9 @@
 import logging
 from app import db, bcrypt
 from app.models import User
-from flask_login import login_user, logout_user
+from app.services.admin_service import AdminService
+from app.services.identity_cache import identity_cache
+from flask_login import current_user, login_user, logout_user
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,7 @@ class AuthService:
             )
             db.session.add(user)
             db.session.commit()
+            AdminService.record_user_registered()
             return user
         except Exception:
             db.session.rollback()
@@ -43,5 +46,7 @@ class AuthService:
         """
         Handle user logout business logic.
         """
+        if current_user.is_authenticated:
+            identity_cache.invalidate(current_user.id)
         logout_user()
 
@@ -0,0 +1,128 @@
+import calendar
+import logging
+import secrets
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import DeviceTokenRevocation, Vehicle
+from app.utils.aggregate_cache import AggregateCache
+from app.utils.token_bucket import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
+
+# The vehicle a token speaks for; issued_at is in epoch milliseconds
+DeviceIdentity = namedtuple('DeviceIdentity', 'vehicle_id owner_id token_id issued_at')
+
+_SALT = 'device-token'
+
+
+def _epoch_ms(moment):
+    return calendar.timegm(moment.utctimetuple()) * 1000 + moment.microsecond // 1000
+
+
+class DeviceTokenService:
+    """
+    Stateless API tokens that authenticate a vehicle's telemetry calls.
+
+    A token is an HMAC-signed {vehicle, owner, token id, issued at} payload,
+    so verifying one needs no database round trip. Revocations are kept in
+    device_token_revocations and read through the `revocations` cache: the
+    process that revokes applies it at once, other processes within
+    DEVICE_TOKEN_DENYLIST_TTL seconds.
+    """
+    _serializer = None
+
+    @staticmethod
+    def init_app(app):
+        secret = app.config.get('DEVICE_TOKEN_SECRET') or app.config['SECRET_KEY']
+        DeviceTokenService._serializer = URLSafeSerializer(secret, salt=_SALT)
+        revocations.init_app(app, ttl=app.config.get('DEVICE_TOKEN_DENYLIST_TTL'))
+        device_limiter.init_app(app, rate=app.config.get('DEVICE_RATE_PER_SECOND'),
+                                burst=app.config.get('DEVICE_RATE_BURST'))
+
+    @staticmethod
+    def issue(vehicle_id):
+        """(token, token_id) for the vehicle, bound to its current owner; None if there is no such vehicle."""
+        owner_id = db.session.query(Vehicle.user_id).filter(Vehicle.id == vehicle_id).scalar()
+        if owner_id is None:
+            return None
+        token_id = secrets.token_hex(8)
+        issued_at = int(time.time() * 1000)
+        token = DeviceTokenService._serializer.dumps([vehicle_id, owner_id, token_id, issued_at])
+        logger.info("Issued device token %s for vehicle %s", token_id, vehicle_id)
+        return token, token_id
+
+    @staticmethod
+    def verify(token):
+        """
+        The DeviceIdentity of a valid, unrevoked token, else None.
+
+        Only the signature and the in-memory deny-list are checked: no
+        database round trip. Whether the vehicle still exists and still
+        belongs to identity.owner_id is up to the caller, which looks the
+        vehicle up anyway (see tracking._may_drive).
+        """
+        try:
+            identity = DeviceIdentity(*DeviceTokenService._serializer.loads(token))
+        except (BadSignature, TypeError, ValueError):
+            return None
+        denied = revocations.get()
+        if (identity.vehicle_id, identity.token_id) in denied['tokens']:
+            return None
+        revoked_before = denied['vehicles'].get(identity.vehicle_id)
+        if revoked_before is not None and identity.issued_at < revoked_before:
+            return None
+        return identity
+
+    @staticmethod
+    def revoke(vehicle_id, token_id=None):
+        """
+        Deny one token of the vehicle, or every token issued so far when
+        token_id is None. Revoking a token that is already revoked is a no-op.
+        """
+        # Truncated to the column's milliseconds, so this process and those
+        # reading the row back agree (MySQL would round)
+        now = datetime.utcnow()
+        revoked_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        entry = DeviceTokenRevocation(vehicle_id=vehicle_id, token_id=token_id, revoked_at=revoked_at)
+        try:
+            db.session.add(entry)
+            db.session.commit()
+        except IntegrityError:
+            # uq_device_token_revocations_token: this token is already denied
+            db.session.rollback()
+            logger.info("Device token %s of vehicle %s was already revoked", token_id, vehicle_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to revoke device token %s of vehicle %s", token_id or '*', vehicle_id)
+            raise
+        revoked_before = _epoch_ms(revoked_at)
+
+        def deny(value):
+            if token_id is not None:
+                value['tokens'] = value['tokens'] | {(vehicle_id, token_id)}
+            else:
+                value['vehicles'] = {**value['vehicles'], vehicle_id: revoked_before}
+        revocations.apply(deny)
+        logger.info("Revoked device token %s of vehicle %s", token_id or '(all)', vehicle_id)
+
+    @staticmethod
+    def load_revocations():
+        """{'tokens': {(vehicle_id, token_id)}, 'vehicles': {vehicle_id: revoked before, epoch ms}}"""
+        tokens, vehicles = set(), {}
+        for vehicle_id, token_id, revoked_at in db.session.query(
+                DeviceTokenRevocation.vehicle_id, DeviceTokenRevocation.token_id, DeviceTokenRevocation.revoked_at):
+            if token_id is not None:
+                tokens.add((vehicle_id, token_id))
+            else:
+                vehicles[vehicle_id] = max(vehicles.get(vehicle_id, 0), _epoch_ms(revoked_at))
+        return {'tokens': frozenset(tokens), 'vehicles': vehicles}
+
+
+revocations = AggregateCache(DeviceTokenService.load_revocations, ttl=30.0, name='device-token-denylist')
+device_limiter = TokenBucketLimiter()
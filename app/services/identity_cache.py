@@ -0,0 +1,115 @@
+import logging
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import User
+from app.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedUser(UserMixin):
+    """
+    Read-only snapshot of the users row fields requests read from current_user.
+    Not bound to a session; code that needs to modify the user loads the User.
+    """
+
+    def __init__(self, id, username, email, role, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.created_at = created_at
+
+    def __repr__(self):
+        return f"CachedUser(id={self.id}, username='{self.username}', role='{self.role}')"
+
+
+class IdentityCache:
+    """
+    Bounded, TTL-limited cache of CachedUser by user id, used by the login
+    manager's user_loader so authenticated requests skip the users lookup.
+
+    Entries are dropped when the User row is updated or deleted through the
+    ORM (at flush and again at commit), and on logout. Changes made outside the application are picked up
+    within the TTL, which therefore bounds how long a removed or demoted
+    user keeps their access. A maxsize of 0 disables caching.
+    """
+
+    def __init__(self, maxsize=4096, ttl=30):
+        self._entries = LRUCache(maxsize, ttl=ttl)
+
+    def init_app(self, app):
+        self._entries.maxsize = app.config.get('IDENTITY_CACHE_SIZE', self._entries.maxsize)
+        self._entries.ttl = app.config.get('IDENTITY_CACHE_TTL', self._entries.ttl)
+        self.clear()
+
+    def get(self, user_id):
+        """The user's snapshot, loaded from the database on a miss; None if there is no such user."""
+        user = self._entries.get(user_id)
+        if user is not None:
+            return user
+        # An invalidation landing while we read the row bumps the generation
+        generation = self._entries.generation
+        row = db.session.query(User.id, User.username, User.email, User.role, User.created_at) \
+            .filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        self._entries.put(user_id, user, generation)
+        return user
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hits(self):
+        return self._entries.hits
+
+    @property
+    def misses(self):
+        return self._entries.misses
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self._entries.maxsize,
+            'ttl_s': self._entries.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+identity_cache = IdentityCache()
+
+# Users changed in a session's open transaction, invalidated again once it commits
+_CHANGED_USERS = 'ev_tracking.changed_users'
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _users_committed(session):
+    # These events fire at flush: a miss before the commit may have cached the old row again
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _users_rolled_back(session):
+    session.info.pop(_CHANGED_USERS, None)
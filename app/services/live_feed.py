@@ -0,0 +1,55 @@
+import logging
+from app.metrics import low_battery_alerts
+from app.utils.broker import Broker
+from app.utils.schemas import live_position, battery_update, trip_summary
+
+logger = logging.getLogger(__name__)
+
+broker = Broker()
+
+
+def trip_topic(trip_id):
+    return f"trip:{trip_id}"
+
+
+def fleet_topic(owner_id=None):
+    """Fleet-wide topic, or the slice of it owned by one user."""
+    return "fleet" if owner_id is None else f"fleet:{owner_id}"
+
+
+def publish_position(vehicle_id, owner_id, trip_id, points, speed, battery_pct, previous_pct=None):
+    """
+    Push a committed position update to the trip and fleet streams.
+
+    points is the list of (lat, lng, recorded_at) fixes that were just
+    stored, oldest first. A battery_alert event is also sent when this
+    update takes the battery below the low-battery threshold. Publishing
+    never raises: a failure here must not fail the ingest that triggered it.
+    """
+    try:
+        payload = live_position(vehicle_id, trip_id, points, speed, battery_pct)
+        topics = [fleet_topic(), fleet_topic(owner_id)]
+        if trip_id is not None:
+            topics.append(trip_topic(trip_id))
+
+        crossed = payload['low_battery_alert'] and (
+            previous_pct is None or not battery_update(previous_pct)['low_battery_alert']
+        )
+        if crossed:
+            low_battery_alerts.inc()
+        for topic in topics:
+            broker.publish(topic, 'position', payload)
+            if crossed:
+                broker.publish(topic, 'battery_alert', {
+                    'vehicle_id': vehicle_id, 'trip_id': trip_id, 'battery': payload['battery'],
+                })
+    except Exception:
+        logger.exception("Failed to publish live position for vehicle %s", vehicle_id)
+
+
+def publish_trip_ended(trip):
+    """Tell the trip's observers that it has been completed."""
+    try:
+        broker.publish(trip_topic(trip.id), 'trip_ended', trip_summary(trip))
+    except Exception:
+        logger.exception("Failed to publish end of trip %s", trip.id)
@@ -0,0 +1,97 @@
+import logging
+import math
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import TripRoute
+from app.services.trip_service import TripService
+from app.utils import polyline
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+# Distance tolerances of the cached levels of detail, finest first
+ROUTE_TOLERANCES_M = (5, 20, 100)
+REPLAY_MAX_FRAMES = 600
+
+
+def tolerance_for_zoom(zoom):
+    """Coarsest cached tolerance that is still below a pixel or two at this map zoom."""
+    if zoom is None or zoom >= 16:
+        return ROUTE_TOLERANCES_M[0]
+    if zoom >= 13:
+        return ROUTE_TOLERANCES_M[1]
+    return ROUTE_TOLERANCES_M[2]
+
+
+class RouteService:
+    @staticmethod
+    def build_routes(trip_id):
+        """
+        Simplify a trip's full track at every cached tolerance and store the
+        results, replacing any previous ones. The caller commits.
+        """
+        lats, lngs, times = TripService.get_trip_columns(trip_id)
+        TripRoute.query.filter_by(trip_id=trip_id).delete()
+
+        start = int(times[0]) if times.size else None
+        offsets = np.rint(times - times[0]).astype(np.int64) if times.size else times
+        routes = []
+        for tolerance in ROUTE_TOLERANCES_M:
+            kept = polyline.simplify(lats, lngs, tolerance)
+            routes.append(TripRoute(
+                trip_id=trip_id,
+                tolerance_m=tolerance,
+                polyline=polyline.encode(lats[kept], lngs[kept]),
+                timeline=polyline.encode_values(offsets[kept]),
+                start_epoch=start,
+                point_count=int(kept.size),
+                source_point_count=int(lats.size),
+            ))
+        db.session.add_all(routes)
+        return routes
+
+    @staticmethod
+    def get_route(trip_id, tolerance_m):
+        """
+        Cached route at one tolerance, building every level on first use
+        (the first view of a trip, rather than finalise_trip, pays for it).
+        """
+        route = TripRoute.query.filter_by(trip_id=trip_id, tolerance_m=tolerance_m).first()
+        if route is not None:
+            return route
+        try:
+            routes = RouteService.build_routes(trip_id)
+            db.session.commit()
+        except IntegrityError:
+            # Another request stored the levels first (uq_trip_routes_level): use its rows
+            db.session.rollback()
+            route = TripRoute.query.filter_by(trip_id=trip_id, tolerance_m=tolerance_m).first()
+            if route is None:
+                logger.exception("Failed to build routes for trip %s", trip_id)
+                raise
+            return route
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to build routes for trip %s", trip_id)
+            raise
+        return next(r for r in routes if r.tolerance_m == tolerance_m)
+
+    @staticmethod
+    def replay_frames(route, step_s=None):
+        """
+        Resample a cached route to fixed time steps for replay.
+
+        Defaults to the smallest whole-second step that keeps the replay
+        within REPLAY_MAX_FRAMES frames. Returns (step_s, encoded polyline).
+        """
+        lats, lngs = polyline.decode(route.polyline)
+        offsets = polyline.decode_values(route.timeline)
+        duration = int(offsets[-1]) if offsets.size else 0
+        min_step = max(1, math.ceil(duration / REPLAY_MAX_FRAMES))
+        step_s = max(min_step, int(step_s or 0))
+        _, frame_lats, frame_lngs = polyline.resample(offsets, lats, lngs, step_s)
+        return step_s, polyline.encode(frame_lats, frame_lngs)
@@ -1,11 +1,38 @@
+import json
 import logging
-from app import db
+import os
+from flask import current_app
+from app import db, metrics
 from app.models import Trip, VehicleTracking, BatteryStatus, Vehicle
-from app.utils.simulation import haversine_distance, calculate_battery_drain
+from app.utils.simulation import calculate_battery_drain
+from app.utils.trip_analysis import TripStats, analyze_points, fold_arrays, fold_points
 from datetime import datetime
+from app.services.vehicle_state import vehicle_state
+from app.services.vehicle_service import available_index
+from app.services.admin_service import AdminService
+from app.services.analytics_service import AnalyticsService
+from app.services.user_service import UserService
+from app.services.live_feed import publish_position, publish_trip_ended
+from app.services.archive_service import ArchiveService
+from app.utils.write_behind import WriteBehindQueue
+from sqlalchemy import and_, func, insert, or_, select, type_coerce, update
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
 
 logger = logging.getLogger(__name__)
 
+# Matches the DECIMAL(10, 8) / DECIMAL(11, 8) coordinate columns
+COORD_DECIMALS = 8
+
+# Everything trip_list_item needs, fetched without hydrating Trip objects
+TRIP_LIST_COLUMNS = (
+    Trip.id, Trip.vehicle_id, Trip.status, Trip.start_time, Trip.end_time,
+    Trip.total_distance_km, Trip.average_speed_kmph, Trip.battery_consumed_percent,
+    Trip.driving_score, Trip.driver_rating,
+    Trip.start_lat, Trip.start_longitude, Trip.end_lat, Trip.end_longitude,
+)
+
 
 class TripService:
     @staticmethod
@@ -43,6 +70,10 @@ class TripService:
             )
             db.session.add(new_trip)
             db.session.commit()
+            metrics.trips_started.inc()
+            AdminService.record_trip_started()
+            vehicle_state.invalidate(vehicle_id)
+            available_index.remove(vehicle_id)
             return new_trip, None
         except Exception as e:
             db.session.rollback()
@@ -56,58 +87,393 @@ class TripService:
         """
         from app.services.vehicle_service import VehicleService
         
-        vehicle, distance = VehicleService.get_nearest_available_vehicle(start_lat, start_lng)
-        if not vehicle:
+        candidates = VehicleService.get_nearest_available_vehicles(start_lat, start_lng, k=3)
+        if not candidates:
             return None, "No available vehicles nearby"
-            
-        return TripService.start_trip(vehicle.id, source_id, dest_id, start_lat, start_lng, end_lat, end_lng)
+
+        # Another request may claim the nearest vehicle first; fall through to the next one
+        error = None
+        for vehicle, distance in candidates:
+            trip, error = TripService.start_trip(vehicle.id, source_id, dest_id, start_lat, start_lng, end_lat, end_lng)
+            if trip:
+                return trip, None
+        return None, error
 
     @staticmethod
-    def update_location(vehicle_id, lat, lng):
+    def update_location(vehicle_id, lat, lng, speed=0.0, recorded_at=None):
         """
         Update vehicle location and active trip stats.
+
+        Trip id, battery and the previous point come from the in-process
+        vehicle state store, so a warm ping costs one INSERT plus the
+        trip, battery and latest-position UPDATEs. Distance, energy and driving events are folded
+        into the trip's running state as each point arrives. Returns the
+        current battery percentage (None when the vehicle has no battery record).
+
+        With write-behind enabled the fix is folded into the in-memory state
+        and queued for the background writer instead; raises WriteBehindFull
+        when the queue is at capacity. A queued fix is accepted, not yet
+        stored: it reaches the live streams once its batch commits, and if the
+        batch keeps failing it ends up in the dead-letter file instead.
         """
+        lat, lng, recorded_at = TripService._normalise_fix(lat, lng, recorded_at)
+        # Concurrent pings of one vehicle are folded one after the other
+        with vehicle_state.lock(vehicle_id):
+            state, fix, queued = TripService._fold_fix(vehicle_id, lat, lng, speed, recorded_at)
+
+        if state.trip_id is None:
+            available_index.upsert(vehicle_id, lat, lng)
+        if not queued:
+            # A queued fix is published by the writer once its batch commits
+            TripService._publish_fixes([fix])
+        return fix['battery_pct']
+
+    @staticmethod
+    def _fold_fix(vehicle_id, lat, lng, speed, recorded_at):
+        """
+        update_location's read-compute-write step, run under the vehicle's lock:
+        fold the fix into the cached state and write (or queue) it.
+        Returns (state, fix, whether the fix was queued for write-behind).
+        """
+        write_behind = tracking_writer.enabled
+        if write_behind and vehicle_id not in vehicle_state and tracking_writer.has_pending(vehicle_id):
+            # The stored state is behind the queue until its fixes are written
+            tracking_writer.flush()
+
+        state = vehicle_state.get(vehicle_id)
+        if state is None:
+            raise ValueError(f"Vehicle {vehicle_id} not found")
+
+        fix = {
+            'vehicle_id': vehicle_id, 'trip_id': state.trip_id, 'lat': lat, 'lng': lng,
+            'speed': speed or 0.0, 'recorded_at': recorded_at,
+            'delta': None, 'battery_pct': state.battery_pct, 'capacity': state.capacity,
+            'owner_id': state.owner_id, 'previous_pct': state.battery_pct,
+        }
+        if state.trip_id and state.has_last_point:
+            delta = TripStats(prev_speed=state.last_speed)
+            dist = delta.add(state.last_lat, state.last_lng, state.last_recorded_at, lat, lng, recorded_at)
+            fix['delta'] = delta
+            if state.battery_pct is not None:
+                fix['battery_pct'] = max(0.0, state.battery_pct - TripService._drain_pct(dist, state.capacity))
+
+        if write_behind:
+            tracking_writer.submit(fix)
+        else:
+            TripService._write_fixes([fix])
+        metrics.points_ingested.inc()
+
+        state.battery_pct = fix['battery_pct']
+        if fix['delta'] is not None:
+            state.last_speed = fix['delta'].prev_speed
+        state.last_lat, state.last_lng, state.last_recorded_at = lat, lng, recorded_at
+        fix['live_speed'] = speed or state.last_speed
+        return state, fix, write_behind
+
+    @staticmethod
+    def _write_fixes(fixes):
+        """
+        Persist fixes prepared by update_location in one transaction.
+
+        Tracking rows go out as a single bulk INSERT; per vehicle the trip
+        deltas are merged into one trip UPDATE, and the battery and latest
+        position are written once from its newest fix.
+        """
+        by_vehicle = {}
+        for fix in fixes:
+            by_vehicle.setdefault(fix['vehicle_id'], []).append(fix)
+
         try:
-            new_track = VehicleTracking(vehicle_id=vehicle_id, latitude=lat, longitude=lng)
-            db.session.add(new_track)
-
-            active_trip = Trip.query.filter_by(vehicle_id=vehicle_id, status='active').first()
-            battery = BatteryStatus.query.filter_by(vehicle_id=vehicle_id).first()
-
-            if active_trip:
-                # Assign trip_id to tracking point
-                new_track.trip_id = active_trip.id
-
-                # Use ID-based sorting for stable "previous" point retrieval
-                prev_track = VehicleTracking.query.filter_by(
-                    vehicle_id=vehicle_id
-                ).order_by(VehicleTracking.id.desc()).offset(1).first()
-
-                if prev_track:
-                    dist = haversine_distance(prev_track.latitude, prev_track.longitude, lat, lng)
-                    active_trip.total_distance_km = float(active_trip.total_distance_km or 0) + dist
-
-                    if battery:
-                        vehicle = Vehicle.query.get(vehicle_id)
-                        capacity = float(vehicle.battery_capacity_kwh or 75.0)
-                        drain_kwh = calculate_battery_drain(dist)
-                        drain_pct = (drain_kwh / capacity) * 100 if capacity > 0 else 0
-                        
-                        battery.current_percentage = max(0, float(battery.current_percentage or 100) - drain_pct)
-                        active_trip.battery_consumed_percent = float(active_trip.battery_consumed_percent or 0) + drain_pct
+            db.session.execute(insert(VehicleTracking), [{
+                'vehicle_id': fix['vehicle_id'], 'trip_id': fix['trip_id'],
+                'latitude': fix['lat'], 'longitude': fix['lng'],
+                'speed': fix['speed'], 'recorded_at': fix['recorded_at'],
+            } for fix in fixes])
 
+            for vehicle_id, vehicle_fixes in by_vehicle.items():
+                deltas = {}
+                for fix in vehicle_fixes:
+                    if fix['delta'] is not None:
+                        deltas.setdefault(fix['trip_id'], TripStats()).merge(fix['delta'])
+                for trip_id, delta in deltas.items():
+                    TripService._fold_into_trip(trip_id, delta, vehicle_fixes[-1]['capacity'])
+
+                last = vehicle_fixes[-1]
+                if deltas and last['battery_pct'] is not None:
+                    db.session.execute(
+                        update(BatteryStatus).where(BatteryStatus.vehicle_id == vehicle_id).values(
+                            current_percentage=last['battery_pct'], last_updated=last['recorded_at']
+                        )
+                    )
+                TripService._upsert_latest_position(
+                    vehicle_id, last['lat'], last['lng'], last['speed'], last['recorded_at'], last['battery_pct']
+                )
             db.session.commit()
-            return battery
         except Exception:
             db.session.rollback()
-            logger.exception("Failed to update location for vehicle %s", vehicle_id)
+            for vehicle_id in by_vehicle:
+                vehicle_state.invalidate(vehicle_id)
+            logger.exception("Failed to write %d location fixes for vehicles %s", len(fixes), sorted(by_vehicle))
             raise
 
     @staticmethod
-    def finalise_trip(vehicle_id):
+    def _write_queued_fixes(fixes):
+        """Write-behind handler: write a batch, then publish it once committed."""
+        TripService._write_fixes(fixes)
+        TripService._publish_fixes(fixes)
+
+    @staticmethod
+    def _publish_fixes(fixes):
+        """Push committed update_location fixes to the live streams, one event per vehicle."""
+        by_vehicle = {}
+        for fix in fixes:
+            by_vehicle.setdefault(fix['vehicle_id'], []).append(fix)
+        for vehicle_id, vehicle_fixes in by_vehicle.items():
+            last = vehicle_fixes[-1]
+            publish_position(
+                vehicle_id, last['owner_id'], last['trip_id'],
+                [(f['lat'], f['lng'], f['recorded_at']) for f in vehicle_fixes],
+                last['live_speed'], last['battery_pct'], vehicle_fixes[0]['previous_pct'],
+            )
+
+    @staticmethod
+    def _dead_letter_fixes(fixes):
+        """
+        Append fixes the write-behind queue gave up on to TRACKING_DEAD_LETTER_PATH,
+        one JSON object per line in the batch endpoint's point format, for replay.
+        """
+        path = current_app.config.get('TRACKING_DEAD_LETTER_PATH')
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as out:
+            for fix in fixes:
+                out.write(json.dumps({
+                    'vehicle_id': fix['vehicle_id'], 'trip_id': fix['trip_id'], 'lat': fix['lat'],
+                    'lng': fix['lng'], 'speed': fix['speed'], 'recorded_at': fix['recorded_at'].isoformat(),
+                }) + '\n')
+        logger.error("Dead-lettered %d location fixes to %s", len(fixes), path)
+
+    @staticmethod
+    def ingest_batch(points):
+        """
+        Persist an ordered batch of telemetry points for one or many vehicles.
+
+        Each point is a dict with vehicle_id, lat, lng, speed and recorded_at.
+        Tracking rows are bulk-inserted and every vehicle's points are folded
+        into its active trip's running state and battery status, all in a
+        single transaction. Returns a dict of vehicle_id -> battery percentage.
+
+        Points are folded in recorded_at order, continuing from the trip's
+        latest stored fix by device time. Points older than that fix (a device
+        replaying a buffer that overlaps what it already sent) are stored but
+        not folded: the running state cannot go back in time. A full
+        recompute_trip_stats() includes them.
+        """
+        by_vehicle = {}
+        for point in points:
+            lat, lng, recorded_at = TripService._normalise_fix(point['lat'], point['lng'], point['recorded_at'])
+            by_vehicle.setdefault(point['vehicle_id'], []).append(
+                dict(point, lat=lat, lng=lng, recorded_at=recorded_at)
+            )
+        # Devices replaying an offline buffer may send fixes out of order
+        for vehicle_points in by_vehicle.values():
+            vehicle_points.sort(key=lambda p: p['recorded_at'])
+
+        vehicle_ids = list(by_vehicle)
+        # Held until the cached states are invalidated, so a concurrent ping cannot
+        # fold from a state loaded before this batch committed
+        with vehicle_state.lock_all(vehicle_ids):
+            # Reads below must see every fix accepted before this batch
+            if tracking_writer.enabled:
+                tracking_writer.flush()
+
+            try:
+                active_trips = {
+                    row.vehicle_id: row for row in db.session.query(
+                        Trip.vehicle_id, Trip.id, Trip.last_speed_kmph
+                    ).filter(Trip.vehicle_id.in_(vehicle_ids), Trip.status == 'active')
+                }
+                batteries = dict(
+                    db.session.query(BatteryStatus.vehicle_id, BatteryStatus.current_percentage)
+                    .filter(BatteryStatus.vehicle_id.in_(vehicle_ids))
+                )
+                vehicles = {
+                    row.id: row for row in db.session.query(
+                        Vehicle.id, Vehicle.user_id, Vehicle.battery_capacity_kwh
+                    ).filter(Vehicle.id.in_(vehicle_ids))
+                }
+
+                # Latest stored point of each active trip by device time, fetched in one query
+                previous = {}
+                if active_trips:
+                    latest = (
+                        select(VehicleTracking.trip_id, func.max(VehicleTracking.recorded_at).label('recorded_at'))
+                        .where(VehicleTracking.trip_id.in_([t.id for t in active_trips.values()]))
+                        .group_by(VehicleTracking.trip_id)
+                        .subquery()
+                    )
+                    # Ordered by id, so of several fixes with the same time the last one stored wins
+                    previous = {
+                        row.vehicle_id: (float(row.latitude), float(row.longitude), row.recorded_at)
+                        for row in db.session.query(
+                            VehicleTracking.vehicle_id, VehicleTracking.latitude,
+                            VehicleTracking.longitude, VehicleTracking.recorded_at
+                        ).join(latest, and_(VehicleTracking.trip_id == latest.c.trip_id,
+                                            VehicleTracking.recorded_at == latest.c.recorded_at))
+                        .order_by(VehicleTracking.id)
+                    }
+
+                rows = []
+                battery_pcts = {}
+                speeds = {}
+                late = 0
+                for vehicle_id, vehicle_points in by_vehicle.items():
+                    active_trip = active_trips.get(vehicle_id)
+                    trip_id = active_trip.id if active_trip else None
+                    prev = previous.get(vehicle_id)
+                    delta = TripStats(prev_speed=float(active_trip.last_speed_kmph or 0) if active_trip else 0.0)
+
+                    for point in vehicle_points:
+                        rows.append({
+                            'vehicle_id': vehicle_id,
+                            'trip_id': trip_id,
+                            'latitude': point['lat'],
+                            'longitude': point['lng'],
+                            'speed': point['speed'],
+                            'recorded_at': point['recorded_at'],
+                        })
+                        if prev and point['recorded_at'] < prev[2]:
+                            late += 1
+                            continue
+                        if active_trip and prev:
+                            delta.add(prev[0], prev[1], prev[2], point['lat'], point['lng'], point['recorded_at'])
+                        prev = (point['lat'], point['lng'], point['recorded_at'])
+
+                    battery_pct = batteries.get(vehicle_id)
+                    if battery_pct is not None:
+                        battery_pct = float(battery_pct)
+                    if active_trip and prev is not None:
+                        capacity = vehicles[vehicle_id].battery_capacity_kwh if vehicle_id in vehicles else None
+                        TripService._fold_into_trip(trip_id, delta, capacity)
+                        if battery_pct is not None and delta.distance_km > 0:
+                            battery_pct = max(0.0, battery_pct - TripService._drain_pct(delta.distance_km, capacity))
+                            # Stamped with the device time of the fix it reflects, as _write_fixes does
+                            db.session.execute(
+                                update(BatteryStatus).where(BatteryStatus.vehicle_id == vehicle_id).values(
+                                    current_percentage=battery_pct, last_updated=prev[2]
+                                )
+                            )
+                    battery_pcts[vehicle_id] = battery_pct
+                    speeds[vehicle_id] = delta.prev_speed
+
+                    last = vehicle_points[-1]
+                    TripService._upsert_latest_position(
+                        vehicle_id, last['lat'], last['lng'], last['speed'], last['recorded_at'], battery_pct
+                    )
+
+                db.session.execute(insert(VehicleTracking), rows)
+                db.session.commit()
+                metrics.points_ingested.inc(amount=len(rows))
+                if late:
+                    logger.info("Stored %d of %d points without folding them: older than the trip's latest fix",
+                                late, len(rows))
+            except Exception:
+                db.session.rollback()
+                logger.exception("Failed to ingest batch of %d points", len(points))
+                raise
+            finally:
+                for vehicle_id in vehicle_ids:
+                    vehicle_state.invalidate(vehicle_id)
+
+        for vehicle_id, vehicle_points in by_vehicle.items():
+            active_trip = active_trips.get(vehicle_id)
+            last = vehicle_points[-1]
+            if active_trip is None:
+                available_index.upsert(vehicle_id, last['lat'], last['lng'])
+            owner = vehicles.get(vehicle_id)
+            previous_pct = batteries.get(vehicle_id)
+            publish_position(
+                vehicle_id, owner.user_id if owner else None, active_trip.id if active_trip else None,
+                [(p['lat'], p['lng'], p['recorded_at']) for p in vehicle_points],
+                last['speed'] or speeds.get(vehicle_id), battery_pcts[vehicle_id],
+                float(previous_pct) if previous_pct is not None else None,
+            )
+        return battery_pcts
+
+    @staticmethod
+    def _normalise_fix(lat, lng, recorded_at=None):
+        """
+        Round a fix to the precision the database stores (DECIMAL(10, 8) and
+        whole-second TIMESTAMP) so running stats match a later recomputation.
+        """
+        recorded_at = (recorded_at or datetime.utcnow()).replace(microsecond=0)
+        return round(float(lat), COORD_DECIMALS), round(float(lng), COORD_DECIMALS), recorded_at
+
+    @staticmethod
+    def _upsert_latest_position(vehicle_id, lat, lng, speed, recorded_at, battery_pct):
+        """
+        Refresh the vehicle's denormalized latest telemetry. Fixes older than
+        the stored one (a replayed backlog) never move the position backwards.
+        """
+        values = dict(current_lat=lat, current_lng=lng, current_speed=speed or 0.0, last_seen_at=recorded_at)
+        if battery_pct is not None:
+            values['battery_level'] = battery_pct
+        db.session.execute(
+            update(Vehicle).where(
+                Vehicle.id == vehicle_id,
+                or_(Vehicle.last_seen_at.is_(None), Vehicle.last_seen_at <= recorded_at),
+            ).values(**values)
+        )
+
+    @staticmethod
+    def _fold_into_trip(trip_id, delta, capacity):
+        """
+        Add a TripStats delta to the running state stored on the trip row.
+
+        Only an active trip is updated, so a late fix (a stale ping, or one
+        queued for write-behind before the trip ended) cannot overwrite the
+        final summary. Returns False when the trip was already closed.
+        """
+        capacity = float(capacity or 75.0)
+        running_distance = func.coalesce(Trip.running_distance_km, 0) + delta.distance_km
+        energy = func.coalesce(Trip.energy_consumed_kwh, 0) + delta.energy_kwh
+        result = db.session.execute(
+            update(Trip).where(Trip.id == trip_id, Trip.status == 'active').values(
+                running_distance_km=running_distance,
+                total_distance_km=running_distance,
+                energy_consumed_kwh=energy,
+                battery_consumed_percent=energy * (100 / capacity) if capacity > 0 else 0,
+                overspeed_count=func.coalesce(Trip.overspeed_count, 0) + delta.overspeed,
+                harsh_acceleration_count=func.coalesce(Trip.harsh_acceleration_count, 0) + delta.harsh_accel,
+                harsh_braking_count=func.coalesce(Trip.harsh_braking_count, 0) + delta.harsh_brake,
+                last_speed_kmph=delta.prev_speed,
+            )
+        )
+        if result.rowcount == 0:
+            logger.info("Trip %s already closed; not folding a late fix into it", trip_id)
+            return False
+        return True
+
+    @staticmethod
+    def _drain_pct(dist, capacity):
+        """Battery percentage consumed travelling dist km with the given pack capacity."""
+        capacity = float(capacity or 75.0)
+        drain_kwh = calculate_battery_drain(dist)
+        return (drain_kwh / capacity) * 100 if capacity > 0 else 0
+
+    @staticmethod
+    def finalise_trip(vehicle_id, recompute=False):
         """
         Analyze and close the active trip.
+
+        The summary is built from the running state kept during ingest. Pass
+        recompute=True to rebuild it from every stored point instead.
         """
+        if tracking_writer.enabled:
+            tracking_writer.flush()
         trip = Trip.query.filter_by(vehicle_id=vehicle_id, status='active').first()
         if not trip:
             return None, "No active trip"
@@ -120,86 +486,163 @@ class TripService:
             trip.end_time = datetime.utcnow()
             trip.status = 'completed'
             
-            # Retrieve all points to determine actual end location
-            points = VehicleTracking.query.filter_by(
-                trip_id=trip.id
-            ).order_by(VehicleTracking.recorded_at).all()
-
-            if points:
-                trip.end_lat = points[-1].latitude
-                trip.end_longitude = points[-1].longitude
+            # Only the last point is needed to determine the actual end location
+            last_point = db.session.query(VehicleTracking.latitude, VehicleTracking.longitude) \
+                .filter(VehicleTracking.trip_id == trip.id) \
+                .order_by(VehicleTracking.recorded_at.desc(), VehicleTracking.id.desc()).first()
+
+            if last_point:
+                trip.end_lat = last_point.latitude
+                trip.end_longitude = last_point.longitude
             else:
                 trip.end_lat = trip.start_lat
                 trip.end_longitude = trip.start_longitude
 
-            # Comprehensive analysis
             capacity = vehicle.battery_capacity_kwh if vehicle else 75.0
-            stats = TripService._analyze_trip_points(points, capacity)
-
-            trip.total_distance_km = stats['total_distance']
-            duration_hours = (trip.end_time - trip.start_time).total_seconds() / 3600
-            trip.average_speed_kmph = round(stats['total_distance'] / duration_hours, 2) if duration_hours > 0 else 0
-
-            trip.harsh_acceleration_count = stats['harsh_accel']
-            trip.harsh_braking_count = stats['harsh_brake']
-            trip.overspeed_count = stats['overspeed']
-
-            # Scoring logic
-            score = 100 - (stats['overspeed'] * 2 + stats['harsh_accel'] * 3 + stats['harsh_brake'] * 3)
-            trip.driving_score = max(0, score)
-            trip.driver_rating = TripService._get_rating(trip.driving_score)
-
-            # Battery final sync
-            trip.battery_consumed_percent = stats['battery_consumed_pct']
+            stats = TripService.recompute_trip_stats(trip) if recompute else TripStats.from_trip(trip)
+            TripService._apply_summary(trip, stats.result(capacity))
+            if vehicle:
+                UserService.record_trip_completed(vehicle.user_id, trip)
 
             db.session.commit()
+            metrics.trips_finished.inc()
+            AdminService.record_trip_completed(trip)
+            if vehicle:
+                AnalyticsService.record_trip_completed(vehicle.user_id, trip)
+            vehicle_state.invalidate(vehicle_id)
+            if trip.end_lat is not None and trip.end_longitude is not None:
+                available_index.upsert(vehicle_id, trip.end_lat, trip.end_longitude)
+            publish_trip_ended(trip)
+            # The simplified map routes are built by RouteService.get_route on first view
             return trip, None
         except Exception:
             db.session.rollback()
             logger.exception("Failed to finalise trip for vehicle %s", vehicle_id)
             raise
 
+    @staticmethod
+    def recompute_trip_stats(trip, vectorized=False):
+        """
+        Rebuild a trip's running state from its stored tracking points.
+
+        Used to verify the incremental path or to backfill trips recorded
+        before running state existed. The default scalar path reproduces the
+        ingest arithmetic exactly; vectorized=True uses the NumPy engine on
+        column arrays, which is far cheaper for long trips. The caller commits.
+        """
+        if vectorized:
+            stats = fold_arrays(*TripService.get_trip_columns(trip.id))
+        else:
+            points = VehicleTracking.query.filter_by(trip_id=trip.id) \
+                .order_by(VehicleTracking.recorded_at, VehicleTracking.id).all()
+            if not points and trip.archived_at:
+                points = ArchiveService.load_points(trip.id)
+            stats = fold_points(points)
+        stats.apply_to(trip)
+        return stats
+
+    @staticmethod
+    def get_trip_columns(trip_id):
+        """
+        Fetch a trip's (latitude, longitude, recorded_at) as NumPy arrays,
+        without hydrating VehicleTracking objects. Times are epoch seconds.
+        Archived trips are read back from cold storage.
+        """
+        rows = db.session.execute(
+            select(
+                type_coerce(VehicleTracking.latitude, db.Double),
+                type_coerce(VehicleTracking.longitude, db.Double),
+                VehicleTracking.recorded_at,
+            ).where(VehicleTracking.trip_id == trip_id)
+            .order_by(VehicleTracking.recorded_at, VehicleTracking.id)
+        ).all()
+        if not rows:
+            track = ArchiveService.read_track(trip_id)
+            if track is not None:
+                return track.lats, track.lngs, track.times_us / 1e6
+            return np.empty(0), np.empty(0), np.empty(0)
+
+        lats, lngs, times = zip(*rows)
+        epoch_seconds = np.array(times, dtype='datetime64[us]').astype(np.int64) / 1e6
+        return np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64), epoch_seconds
+
+    @staticmethod
+    def get_trip_page(vehicle_ids, after=None, limit=50, newest_first=True, status=None):
+        """
+        One keyset page of trips ordered by (start_time, id).
+
+        after is the key of the last trip of the previous page. Rows are
+        plain column tuples rather than ORM objects, so long listings do not
+        fill the session. Returns (trips, key of the next page or None).
+        """
+        query = db.session.query(*TRIP_LIST_COLUMNS).filter(Trip.vehicle_id.in_(vehicle_ids))
+        if status:
+            query = query.filter(Trip.status == status)
+        if after:
+            start_time, trip_id = after
+            if newest_first:
+                query = query.filter(or_(Trip.start_time < start_time,
+                                         and_(Trip.start_time == start_time, Trip.id < trip_id)))
+            else:
+                query = query.filter(or_(Trip.start_time > start_time,
+                                         and_(Trip.start_time == start_time, Trip.id > trip_id)))
+        if newest_first:
+            query = query.order_by(Trip.start_time.desc(), Trip.id.desc())
+        else:
+            query = query.order_by(Trip.start_time, Trip.id)
+
+        rows = query.limit(limit + 1).all()
+        page = rows[:limit]
+        return page, ((page[-1].start_time, page[-1].id) if len(rows) > limit else None)
+
+    @staticmethod
+    def get_point_page(trip, after=None, limit=1000):
+        """
+        One page of a trip's tracking points in recording order.
+
+        Hot rows are paged on VehicleTracking.id (key ('id', last id));
+        archived trips by position in the archive file (key ('n', offset)).
+        Returns (points, key of the next page or None).
+        """
+        if after is None or after[0] == 'id':
+            query = db.session.query(
+                VehicleTracking.id, VehicleTracking.latitude, VehicleTracking.longitude,
+                VehicleTracking.speed, VehicleTracking.recorded_at
+            ).filter(VehicleTracking.trip_id == trip.id)
+            if after:
+                query = query.filter(VehicleTracking.id > after[1])
+            rows = query.order_by(VehicleTracking.id).limit(limit + 1).all()
+            if rows or after is not None or not trip.archived_at:
+                page = rows[:limit]
+                return page, (('id', page[-1].id) if len(rows) > limit else None)
+
+        offset = after[1] if after else 0
+        points = ArchiveService.load_points(trip.id)
+        end = offset + limit
+        return points[offset:end], (('n', end) if end < len(points) else None)
+
+    @staticmethod
+    def _apply_summary(trip, stats):
+        """Copy an analysis summary onto a finished trip and score it."""
+        trip.total_distance_km = stats['total_distance']
+        duration_hours = (trip.end_time - trip.start_time).total_seconds() / 3600
+        trip.average_speed_kmph = round(stats['total_distance'] / duration_hours, 2) if duration_hours > 0 else 0
+
+        trip.harsh_acceleration_count = stats['harsh_accel']
+        trip.harsh_braking_count = stats['harsh_brake']
+        trip.overspeed_count = stats['overspeed']
+
+        # Scoring logic
+        score = 100 - (stats['overspeed'] * 2 + stats['harsh_accel'] * 3 + stats['harsh_brake'] * 3)
+        trip.driving_score = max(0, score)
+        trip.driver_rating = TripService._get_rating(trip.driving_score)
+
+        # Battery final sync
+        trip.battery_consumed_percent = stats['battery_consumed_pct']
+
     @staticmethod
     def _analyze_trip_points(points, battery_capacity):
-        total_distance = 0
-        harsh_accel = 0
-        harsh_brake = 0
-        overspeed = 0
-        total_energy = 0
-
-        SPEED_LIMIT = 80
-        HARSH_THRESHOLD = 3
-        prev_speed = 0
-
-        for i in range(1, len(points)):
-            dist = haversine_distance(
-                points[i-1].latitude, points[i-1].longitude,
-                points[i].latitude, points[i].longitude
-            )
-            total_distance += dist
-            total_energy += calculate_battery_drain(dist)
-
-            time_diff = (points[i].recorded_at - points[i-1].recorded_at).total_seconds()
-            if time_diff > 0:
-                speed = dist / (time_diff / 3600)
-                if speed > SPEED_LIMIT:
-                    overspeed += 1
-
-                accel = (speed - prev_speed) / (time_diff / 3600) / 3600 * 1000
-                if accel > HARSH_THRESHOLD:
-                    harsh_accel += 1
-                elif accel < -HARSH_THRESHOLD:
-                    harsh_brake += 1
-                prev_speed = speed
-
-        capacity = float(battery_capacity or 75.0)
-        return {
-            'total_distance': round(total_distance, 2),
-            'harsh_accel': harsh_accel,
-            'harsh_brake': harsh_brake,
-            'overspeed': overspeed,
-            'battery_consumed_pct': round((total_energy / capacity) * 100, 2) if capacity > 0 else 0
-        }
+        return analyze_points(points, battery_capacity)
 
     @staticmethod
     def _get_rating(score):
@@ -211,3 +654,9 @@ class TripService:
             return "C"
         return "D"
 
+
+# Background writer for update_location's optional write-behind mode
+tracking_writer = WriteBehindQueue(lambda fixes: TripService._write_queued_fixes(fixes),
+                                   key=lambda fix: fix['vehicle_id'],
+                                   dead_letter=lambda fixes: TripService._dead_letter_fixes(fixes),
+                                   name='tracking-writer')
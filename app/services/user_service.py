@@ -1,40 +1,34 @@
+import logging
 from app import db
-from app.models import Trip, Vehicle
-from sqlalchemy import func
+from app.models import Trip, Vehicle, UserStats
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 
+logger = logging.getLogger(__name__)
 
-class UserService:
-    @staticmethod
-    def _get_vehicle_ids(user_id):
-        """Get all vehicle IDs for a user. Shared helper to avoid duplicate queries."""
-        return [v.id for v in Vehicle.query.filter_by(user_id=user_id).with_entities(Vehicle.id).all()]
+ROLLUP_FIELDS = ('total_distance_km', 'trip_count', 'score_sum', 'scored_trip_count', 'vehicle_count')
 
+
+class UserService:
     @staticmethod
     def get_user_statistics(user_id):
         """
         Aggregate lifetime stats for the user dashboard.
-        """
-        vehicle_ids = UserService._get_vehicle_ids(user_id)
-
-        if not vehicle_ids:
-            return {
-                "total_distance": 0,
-                "total_trips": 0,
-                "avg_score": 0,
-                "active_vehicles": 0
-            }
 
-        stats = db.session.query(
-            func.sum(Trip.total_distance_km),
-            func.count(Trip.id),
-            func.avg(Trip.driving_score)
-        ).filter(Trip.vehicle_id.in_(vehicle_ids), Trip.status == 'completed').first()
+        Read from the user_stats rollup by primary key; users missing from
+        the rollup (before `flask rebuild-user-stats` has run) are aggregated
+        on the fly.
+        """
+        row = db.session.get(UserStats, user_id)
+        if row is None:
+            totals = UserService._aggregate(user_id).get(user_id, {})
+            row = UserStats(**UserService._with_defaults(totals))
 
         return {
-            "total_distance": round(float(stats[0] or 0), 2),
-            "total_trips": int(stats[1] or 0),
-            "avg_score": round(float(stats[2] or 0), 1),
-            "active_vehicles": len(vehicle_ids)
+            "total_distance": round(float(row.total_distance_km or 0), 2),
+            "total_trips": int(row.trip_count or 0),
+            "avg_score": round(row.score_sum / row.scored_trip_count, 1) if row.scored_trip_count else 0,
+            "active_vehicles": int(row.vehicle_count or 0)
         }
 
     @staticmethod
@@ -42,12 +36,8 @@ class UserService:
         """
         Get recent completed trips across all vehicles.
         """
-        vehicle_ids = UserService._get_vehicle_ids(user_id)
-        if not vehicle_ids:
-            return []
-
-        return Trip.query.filter(
-            Trip.vehicle_id.in_(vehicle_ids),
+        return Trip.query.join(Vehicle).filter(
+            Vehicle.user_id == user_id,
             Trip.status == 'completed'
         ).order_by(Trip.end_time.desc()).limit(limit).all()
 
@@ -62,3 +52,117 @@ class UserService:
             Trip.status == 'active'
         ).first()
 
+    @staticmethod
+    def record_trip_completed(user_id, trip):
+        """Fold a just-completed trip into the owner's rollup. The caller commits."""
+        score = trip.driving_score
+        UserService._bump(
+            user_id,
+            total_distance_km=UserStats.total_distance_km + float(trip.total_distance_km or 0),
+            trip_count=UserStats.trip_count + 1,
+            score_sum=UserStats.score_sum + (score or 0),
+            scored_trip_count=UserStats.scored_trip_count + (0 if score is None else 1),
+        )
+
+    @staticmethod
+    def record_vehicle_added(user_id):
+        """Count a newly registered vehicle in the owner's rollup. The caller commits."""
+        UserService._bump(user_id, vehicle_count=UserStats.vehicle_count + 1)
+
+    @staticmethod
+    def rebuild_statistics():
+        """
+        Recompute every user's rollup from vehicles and completed trips,
+        replacing whatever drifted. Returns (users, rows_changed).
+        """
+        try:
+            current = {
+                row.user_id: UserService._fingerprint({f: getattr(row, f) for f in ROLLUP_FIELDS})
+                for row in db.session.scalars(select(UserStats))
+            }
+            rebuilt = {
+                user_id: UserService._with_defaults(totals)
+                for user_id, totals in UserService._aggregate().items()
+            }
+            changed = sum(
+                1 for user_id in current.keys() | rebuilt.keys()
+                if current.get(user_id) != (UserService._fingerprint(rebuilt[user_id]) if user_id in rebuilt else None)
+            )
+
+            db.session.execute(delete(UserStats))
+            if rebuilt:
+                db.session.execute(insert(UserStats), [
+                    {'user_id': user_id, **totals} for user_id, totals in rebuilt.items()
+                ])
+            db.session.commit()
+            return len(rebuilt), changed
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to rebuild user statistics")
+            raise
+
+    @staticmethod
+    def _bump(user_id, **increments):
+        """Apply in-place increments to a user's row, creating it from a full aggregate if missing."""
+        if UserService._increment(user_id, increments):
+            return
+        # First event for this user: the aggregate already sees the pending change
+        totals = UserService._aggregate(user_id).get(user_id, {})
+        try:
+            with db.session.begin_nested():
+                db.session.add(UserStats(user_id=user_id, **UserService._with_defaults(totals)))
+        except IntegrityError:
+            # A concurrent first event created the row meanwhile, without our
+            # uncommitted change in its aggregate: add ours to it
+            UserService._increment(user_id, increments)
+
+    @staticmethod
+    def _increment(user_id, increments):
+        result = db.session.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values(**increments),
+            execution_options={'synchronize_session': False},
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    def _aggregate(user_id=None):
+        """Rollup totals per user id, computed from the source tables."""
+        vehicles = select(Vehicle.user_id, func.count(Vehicle.id)).group_by(Vehicle.user_id)
+        trips = (
+            select(
+                Vehicle.user_id,
+                func.sum(Trip.total_distance_km),
+                func.count(Trip.id),
+                func.sum(Trip.driving_score),
+                func.count(Trip.driving_score),
+            )
+            .join(Vehicle, Vehicle.id == Trip.vehicle_id)
+            .where(Trip.status == 'completed')
+            .group_by(Vehicle.user_id)
+        )
+        if user_id is not None:
+            vehicles = vehicles.where(Vehicle.user_id == user_id)
+            trips = trips.where(Vehicle.user_id == user_id)
+
+        totals = {}
+        for owner, count in db.session.execute(vehicles):
+            totals.setdefault(owner, {})['vehicle_count'] = count
+        for owner, distance, count, score_sum, scored in db.session.execute(trips):
+            totals.setdefault(owner, {}).update(
+                total_distance_km=float(distance or 0),
+                trip_count=count,
+                score_sum=int(score_sum or 0),
+                scored_trip_count=scored,
+            )
+        return totals
+
+    @staticmethod
+    def _with_defaults(totals):
+        return {'total_distance_km': 0.0, 'trip_count': 0, 'score_sum': 0,
+                'scored_trip_count': 0, 'vehicle_count': 0, **totals}
+
+    @staticmethod
+    def _fingerprint(totals):
+        # Distances accumulated by increments may differ from a fresh SUM in the last float bits
+        return tuple(round(float(totals[f]), 2) if f == 'total_distance_km' else totals[f]
+                     for f in ROLLUP_FIELDS)
@@ -1,9 +1,19 @@
 import logging
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Vehicle, BatteryStatus
+from app.models import Vehicle, BatteryStatus, Trip
+from app.services.admin_service import AdminService
+from app.services.user_service import UserService
+from app.utils.schemas import vehicle_card, vehicle_position
+from app.utils.spatial_index import SpatialIndex
 
 logger = logging.getLogger(__name__)
 
+# Last-known positions of available vehicles; kept current by TripService
+available_index = SpatialIndex()
+
 
 class VehicleService:
     @staticmethod
@@ -25,8 +35,10 @@ class VehicleService:
             # Initialize battery status
             battery = BatteryStatus(vehicle_id=vehicle.id)
             db.session.add(battery)
+            UserService.record_vehicle_added(user_id)
 
             db.session.commit()
+            AdminService.record_vehicle_added()
             return vehicle
         except Exception:
             db.session.rollback()
@@ -37,6 +49,26 @@ class VehicleService:
     def get_user_vehicles(user_id):
         return Vehicle.query.filter_by(user_id=user_id).all()
 
+    @staticmethod
+    def get_dashboard_vehicles(user_id):
+        """
+        Dashboard cards for one owner's fleet in two queries, whatever its size:
+        vehicles with their battery row joined in, then the active trip ids.
+        """
+        vehicles = (
+            Vehicle.query
+            .options(joinedload(Vehicle.battery))
+            .filter_by(user_id=user_id)
+            .order_by(Vehicle.id)
+            .all()
+        )
+        active_trips = dict(db.session.execute(
+            select(Trip.vehicle_id, Trip.id)
+            .join(Vehicle, Vehicle.id == Trip.vehicle_id)
+            .where(Vehicle.user_id == user_id, Trip.status == 'active')
+        ).all())
+        return [vehicle_card(v, active_trips.get(v.id)) for v in vehicles]
+
     @staticmethod
     def get_vehicle_status(vehicle_id):
         vehicle = Vehicle.query.get(vehicle_id)
@@ -48,34 +80,68 @@ class VehicleService:
             }
         return None
 
+    @staticmethod
+    def get_fleet_positions(user_id=None):
+        """
+        Current position and telemetry of every vehicle (or one owner's fleet),
+        read from the denormalized columns in a single query.
+        """
+        query = Vehicle.query.filter(Vehicle.current_lat.isnot(None))
+        if user_id is not None:
+            query = query.filter(Vehicle.user_id == user_id)
+        return [vehicle_position(v) for v in query.all()]
+
     @staticmethod
     def get_nearest_available_vehicle(lat, lon):
         """
-        Find the nearest vehicle with status='available' using SQLAlchemy and geopy.
+        Find the nearest vehicle with status='available'.
+        Returns (vehicle, distance_km), or (None, inf) when none is known.
         """
-        from app.models import VehicleTracking
-        from geopy.distance import geodesic
-        from sqlalchemy import desc
-
-        # 1. Get all available vehicles
-        available_vehicles = Vehicle.query.filter_by(status='available').all()
-        
-        nearest_vehicle = None
-        min_distance = float('inf')
-
-        for vehicle in available_vehicles:
-            # 2. Get the latest tracking point for each vehicle
-            latest_point = VehicleTracking.query.filter_by(vehicle_id=vehicle.id)\
-                                                .order_by(desc(VehicleTracking.recorded_at))\
-                                                .first()
-            
-            if latest_point:
-                # 3. Calculate distance using geopy
-                distance = geodesic((lat, lon), (latest_point.latitude, latest_point.longitude)).kilometers
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_vehicle = vehicle
-
-        return nearest_vehicle, min_distance
+        matches = VehicleService.get_nearest_available_vehicles(lat, lon, k=1)
+        if not matches:
+            return None, float('inf')
+        return matches[0]
+
+    @staticmethod
+    def get_nearest_available_vehicles(lat, lon, k=5):
+        """Up to k (vehicle, distance_km) pairs for available vehicles, closest first."""
+        VehicleService._ensure_index()
+        while True:
+            candidates = available_index.nearest(lat, lon, k)
+            matches = VehicleService._resolve_available(candidates)
+            if len(matches) == len(candidates):
+                return matches
+
+    @staticmethod
+    def get_available_vehicles_within(lat, lon, radius_km):
+        """(vehicle, distance_km) pairs for available vehicles within radius_km, closest first."""
+        VehicleService._ensure_index()
+        return VehicleService._resolve_available(available_index.within(lat, lon, radius_km))
+
+    @staticmethod
+    def _resolve_available(candidates):
+        """Load candidate vehicles in one query, evicting any the index holds by mistake."""
+        if not candidates:
+            return []
+        vehicles = {v.id: v for v in Vehicle.query.filter(Vehicle.id.in_([key for _, key in candidates]))}
+
+        matches = []
+        for distance, vehicle_id in candidates:
+            vehicle = vehicles.get(vehicle_id)
+            if vehicle is None or vehicle.status != 'available':
+                available_index.remove(vehicle_id)
+                continue
+            matches.append((vehicle, distance))
+        return matches
+
+    @staticmethod
+    def _ensure_index():
+        """Warm the dispatch index from the database when it is cold or expired."""
+        if available_index.is_warm(current_app.config.get('DISPATCH_INDEX_MAX_AGE')):
+            return
 
+        rows = db.session.query(Vehicle.id, Vehicle.current_lat, Vehicle.current_lng).filter(
+            Vehicle.status == 'available', Vehicle.current_lat.isnot(None)
+        ).all()
+        available_index.load(rows)
+        logger.info("Dispatch index warmed with %d available vehicles", len(rows))
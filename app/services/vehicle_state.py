@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from app import db
+from app.models import Vehicle, BatteryStatus, Trip, VehicleTracking
+
+
+class VehicleState:
+    """
+    Hot-path snapshot of a vehicle used while ingesting telemetry.
+    """
+    __slots__ = ('vehicle_id', 'owner_id', 'capacity', 'battery_pct', 'trip_id', 'last_speed',
+                 'last_lat', 'last_lng', 'last_recorded_at')
+
+    def __init__(self, vehicle_id, owner_id, capacity, battery_pct=None, trip_id=None,
+                 last_speed=0.0, last_lat=None, last_lng=None, last_recorded_at=None):
+        self.vehicle_id = vehicle_id
+        self.owner_id = owner_id
+        self.capacity = float(capacity or 75.0)
+        self.battery_pct = battery_pct
+        self.trip_id = trip_id
+        self.last_speed = last_speed
+        self.last_lat = last_lat
+        self.last_lng = last_lng
+        self.last_recorded_at = last_recorded_at
+
+    @property
+    def has_last_point(self):
+        return self.last_lat is not None and self.last_lng is not None
+
+    def __repr__(self):
+        return f"VehicleState(vehicle={self.vehicle_id}, trip={self.trip_id}, battery={self.battery_pct})"
+
+
+class VehicleStateStore:
+    """
+    Bounded, thread-safe LRU of VehicleState keyed by vehicle id.
+
+    Entries are loaded from the database on a miss and must be invalidated
+    whenever the trip lifecycle changes (start_trip / finalise_trip).
+    A maxsize of 0 disables caching: every lookup reads the database.
+
+    Readers that fold a fix into a state (read, compute, write back) hold
+    lock(vehicle_id) for the whole step, so two pings of one vehicle handled
+    by different threads cannot both start from the same previous point;
+    a batch covering several vehicles holds lock_all(vehicle_ids).
+    """
+    LOCK_STRIPES = 256
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Striped rather than one lock per vehicle: bounded, and never needs evicting
+        self._vehicle_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('VEHICLE_STATE_CACHE_SIZE', self.maxsize)
+        self.clear()
+
+    def get(self, vehicle_id):
+        """Return the cached state for a vehicle, warming it from the DB on a miss."""
+        with self._lock:
+            state = self._entries.get(vehicle_id)
+            if state is not None:
+                self._entries.move_to_end(vehicle_id)
+                return state
+
+        state = self._load(vehicle_id)
+        if state is not None and self.maxsize > 0:
+            with self._lock:
+                self._entries[vehicle_id] = state
+                self._entries.move_to_end(vehicle_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return state
+
+    def owner_id(self, vehicle_id):
+        """
+        The vehicle's owner, for authorising a ping: from its (warmed) state,
+        or with one query when caching is off and the state would be loaded
+        again by the update itself. None if there is no such vehicle.
+        """
+        if self.maxsize > 0:
+            state = self.get(vehicle_id)
+            return state.owner_id if state else None
+        return db.session.query(Vehicle.user_id).filter(Vehicle.id == vehicle_id).scalar()
+
+    def lock(self, vehicle_id):
+        """The lock serialising updates of this vehicle's state (shared with a few other vehicles)."""
+        return self._vehicle_locks[hash(vehicle_id) % self.LOCK_STRIPES]
+
+    @contextmanager
+    def lock_all(self, vehicle_ids):
+        """Hold the locks of several vehicles, taken in stripe order so batches cannot deadlock."""
+        stripes = sorted({hash(vehicle_id) % self.LOCK_STRIPES for vehicle_id in vehicle_ids})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._vehicle_locks[stripe])
+            yield
+
+    def invalidate(self, vehicle_id):
+        with self._lock:
+            self._entries.pop(vehicle_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._entries
+
+    @staticmethod
+    def _load(vehicle_id):
+        vehicle = db.session.query(
+            Vehicle.user_id, Vehicle.battery_capacity_kwh,
+            Vehicle.current_lat, Vehicle.current_lng, Vehicle.last_seen_at
+        ).filter(Vehicle.id == vehicle_id).first()
+        if vehicle is None:
+            return None
+
+        battery_pct = db.session.query(BatteryStatus.current_percentage) \
+            .filter(BatteryStatus.vehicle_id == vehicle_id).scalar()
+        trip = db.session.query(Trip.id, Trip.last_speed_kmph) \
+            .filter(Trip.vehicle_id == vehicle_id, Trip.status == 'active').first()
+
+        # While on a trip only that trip's points count as "previous";
+        # otherwise the denormalized latest position is enough
+        if trip:
+            last_point = db.session.query(
+                VehicleTracking.latitude, VehicleTracking.longitude, VehicleTracking.recorded_at
+            ).filter(VehicleTracking.trip_id == trip.id) \
+                .order_by(VehicleTracking.recorded_at.desc(), VehicleTracking.id.desc()).first()
+        elif vehicle.current_lat is not None:
+            last_point = (vehicle.current_lat, vehicle.current_lng, vehicle.last_seen_at)
+        else:
+            last_point = None
+
+        state = VehicleState(
+            vehicle_id=vehicle_id,
+            owner_id=vehicle.user_id,
+            capacity=vehicle.battery_capacity_kwh,
+            battery_pct=float(battery_pct) if battery_pct is not None else None,
+            trip_id=trip.id if trip else None,
+            last_speed=float(trip.last_speed_kmph or 0) if trip else 0.0,
+        )
+        if last_point:
+            state.last_lat = float(last_point[0])
+            state.last_lng = float(last_point[1])
+            state.last_recorded_at = last_point[2]
+        return state
+
+
+vehicle_state = VehicleStateStore()
@@ -0,0 +1,126 @@
+"""
+In-process cache for one expensive computed value, served stale-while-revalidate.
+
+The first read computes the value inline. After `ttl` seconds, or after
+invalidate(), reads keep returning the cached value while a single
+background thread recomputes it, so only a cold cache ever makes a
+caller wait. Writers that know how an event changes the value can fold
+it in with apply() rather than waiting for the next refresh.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AggregateCache:
+    """Thread-safe holder of a dict computed by `loader` inside the app context."""
+
+    def __init__(self, loader, ttl=60.0, name='aggregate-cache'):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._app = None
+        self._value = None
+        self._expires_at = 0.0
+        self._loaded_at = None
+        # Bumped by every apply()/invalidate(); a refresh that overlapped one is kept but marked stale
+        self._version = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def init_app(self, app, ttl=None):
+        self._app = app
+        if ttl is not None:
+            self.ttl = ttl
+        self.clear()
+
+    def get(self):
+        """Current value; schedules a background refresh when it has expired."""
+        with self._lock:
+            value = self._value
+            if value is not None:
+                self.hits += 1
+                refresh = time.monotonic() >= self._expires_at and self._thread is None
+                if refresh:
+                    self._thread = threading.Thread(target=self._refresh, name=self.name, daemon=True)
+                    self._thread.start()
+                return value
+            self.misses += 1
+            version = self._version
+
+        value = self.loader()
+        self._store(value, version)
+        return value
+
+    def apply(self, update):
+        """Fold a known change into the cached value: update(copy) mutates a copy in place."""
+        with self._lock:
+            self._version += 1
+            if self._value is None:
+                return
+            value = dict(self._value)
+            update(value)
+            self._value = value
+
+    def invalidate(self):
+        """Mark the value stale; the next read serves it and refreshes in the background."""
+        with self._lock:
+            self._version += 1
+            self._expires_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+            self._expires_at = 0.0
+            self._version += 1
+        self._reset_counters()
+
+    def wait(self, timeout=None):
+        """Block until an in-flight background refresh has finished (tests, shutdown)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+        return {
+            'cached': self._value is not None,
+            'age_s': round(age, 3) if age is not None else None,
+            'ttl_s': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+        }
+
+    def _reset_counters(self):
+        self.hits = self.misses = self.refreshes = self.failures = 0
+
+    def _store(self, value, version):
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+            # An event landed while we were loading and may be missing from the result
+            self._expires_at = time.monotonic() + self.ttl if version == self._version else 0.0
+
+    def _refresh(self):
+        with self._lock:
+            version = self._version
+        try:
+            with self._app.app_context():
+                value = self.loader()
+            self._store(value, version)
+            self.refreshes += 1
+        except Exception:
+            self.failures += 1
+            logger.exception("%s: background refresh failed; serving the previous value", self.name)
+            with self._lock:
+                self._expires_at = time.monotonic() + self.ttl
+        finally:
+            with self._lock:
+                self._thread = None
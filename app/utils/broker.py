@@ -0,0 +1,125 @@
+"""
+In-process publish/subscribe broker for live server-push streams.
+
+Every subscriber owns a bounded queue. publish() never blocks: when a
+subscriber's queue is full it is treated as a slow consumer and dropped,
+so one stalled client cannot hold back ingest or other observers. Events
+only reach subscribers of the same process.
+"""
+import itertools
+import queue
+import threading
+
+
+class BrokerFull(Exception):
+    """Raised when the subscriber cap has been reached."""
+
+
+class Subscription:
+    """One consumer's view of the broker: a bounded queue of (id, event, data) messages."""
+
+    def __init__(self, broker, topics, maxsize):
+        self.topics = tuple(topics)
+        self.dropped = False
+        self._broker = broker
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Next (id, event, data) message, or None if nothing arrives within timeout."""
+        if self.dropped:
+            return None
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+    def _offer(self, message):
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+
+class Broker:
+    """Thread-safe topic broker with a cap on concurrent subscribers."""
+
+    def __init__(self, max_subscribers=16, queue_size=100):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._topics = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.max_subscribers = app.config.get('LIVE_STREAM_MAX_SUBSCRIBERS', self.max_subscribers)
+        self.queue_size = app.config.get('LIVE_STREAM_QUEUE_SIZE', self.queue_size)
+        self.clear()
+
+    def subscribe(self, *topics):
+        """Register a subscription to the given topics. Raises BrokerFull at the cap."""
+        subscription = Subscription(self, topics, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull(f"{self.max_subscribers} live subscribers already connected")
+            self._subscribers.add(subscription)
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._discard(subscription)
+
+    def publish(self, topic, event, data):
+        """Fan an event out to the topic's subscribers. Returns how many received it."""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        if not subscribers:
+            return 0
+
+        message = (next(self._ids), event, data)
+        delivered = 0
+        slow = []
+        for subscription in subscribers:
+            if subscription._offer(message):
+                delivered += 1
+            else:
+                slow.append(subscription)
+
+        with self._lock:
+            self.published += 1
+            for subscription in slow:
+                if subscription in self._subscribers:
+                    self.dropped += 1
+                    self._discard(subscription)
+        return delivered
+
+    def clear(self):
+        with self._lock:
+            for subscription in self._subscribers:
+                subscription.dropped = True
+            self._topics.clear()
+            self._subscribers.clear()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def __contains__(self, subscription):
+        return subscription in self._subscribers
+
+    def _discard(self, subscription):
+        self._subscribers.discard(subscription)
+        for topic in subscription.topics:
+            members = self._topics.get(topic)
+            if members is not None:
+                members.discard(subscription)
+                if not members:
+                    del self._topics[topic]
@@ -0,0 +1,69 @@
+"""
+Great-circle distance kernels.
+
+Three flavours, chosen per call site:
+
+* haversine_km        -- scalar spherical haversine, pure ``math``. ~1-2 µs per call.
+* haversine_km_array  -- the same formula over NumPy arrays (pairwise with
+  broadcasting); path_distances_km gives consecutive segments of a track.
+* geodesic_km         -- geopy's ellipsoidal (WGS-84, Karney) distance. Exact,
+  but about 100x slower per call; opt in with ``precise=True``.
+
+Error bound
+-----------
+Treating the Earth as a sphere of radius 6371.0088 km (IUGG mean radius),
+the haversine result differs from the WGS-84 geodesic by at most
+HAVERSINE_MAX_RELATIVE_ERROR (0.57 %) for any pair of points between
+70°S and 70°N, whatever the heading. At campus scale that is at most
+~6 m over a 1 km segment and ~285 m over a 50 km cross-campus trip.
+"""
+import math
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+EARTH_RADIUS_KM = 6371.0088
+HAVERSINE_MAX_RELATIVE_ERROR = 0.0057
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Fast scalar great-circle distance in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def geodesic_km(lat1, lon1, lat2, lon2):
+    """Precise ellipsoidal distance in kilometres (geopy, imported on first use)."""
+    from geopy.distance import geodesic
+    return geodesic((lat1, lon1), (lat2, lon2)).kilometers
+
+
+def distance_km(lat1, lon1, lat2, lon2, precise=False):
+    """Scalar distance; precise=True trades speed for the exact ellipsoidal value."""
+    if precise:
+        return geodesic_km(lat1, lon1, lat2, lon2)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def haversine_km_array(lat1, lon1, lat2, lon2):
+    """Element-wise haversine over arrays (NumPy broadcasting rules apply)."""
+    phi1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    phi2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    dlmb = np.radians(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def path_distances_km(lats, lngs):
+    """Lengths of the n-1 consecutive segments of an ordered track."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    return haversine_km_array(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+
+def haversine_error_bound_km(distance):
+    """Worst-case absolute haversine error for a distance of the given size."""
+    return distance * HAVERSINE_MAX_RELATIVE_ERROR
@@ -0,0 +1,66 @@
+"""
+Deferred imports for heavy dependencies.
+
+    np = lazy_import('numpy')
+
+binds a stand-in that imports numpy the first time one of its attributes
+is used, so modules on the app's import chain don't pay for it at startup.
+Attributes are copied onto the stand-in as they are looked up, after which
+they cost the same as a plain module attribute. Unlike
+importlib.util.LazyLoader this is safe when the first use happens in
+several threads at once.
+"""
+import importlib
+import sys
+import threading
+
+_lock = threading.Lock()
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    # No public names of its own: every attribute belongs to the real module
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+        self.__lock = threading.Lock()
+
+    def __load(self):
+        if self.__module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__module = importlib.import_module(self.__name)
+        return self.__module
+
+    def __getattr__(self, attr):
+        value = getattr(self.__load(), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = 'imported' if self.__module is not None else 'not imported'
+        return f"<lazy module {self.__name!r} ({state})>"
+
+
+_deferred = {}  # name -> LazyModule, shared by every importer
+
+
+def lazy_import(name):
+    """The module if it is already imported, else a LazyModule for it."""
+    module = sys.modules.get(name)
+    if module is None:
+        with _lock:
+            module = _deferred.setdefault(name, LazyModule(name))
+    return module
+
+
+def load(module):
+    """Import a lazy module now; returns the real module."""
+    return module._LazyModule__load() if isinstance(module, LazyModule) else module
+
+
+def load_all():
+    """Import every module deferred so far, e.g. while warming up a worker."""
+    for module in list(_deferred.values()):
+        load(module)
+
@@ -0,0 +1,104 @@
+"""
+Rate-limit counters shared by every worker process on one host.
+
+Flask-Limiter's default memory:// storage is per process, so N workers
+would each grant the full limit. SQLiteStorage keeps the fixed-window
+counters in a local SQLite file (WAL mode) instead, which every process
+on the host opens; each hit is a single atomic UPSERT. Importing this
+module registers the scheme, after which
+
+    RATELIMIT_STORAGE_URI=sqlite:////var/run/ev-tracking/ratelimit.db
+
+selects it (three slashes for a relative path, four for an absolute one,
+as in SQLAlchemy URLs). Only the fixed-window strategy is supported.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# An expired window starts again from `amount`; a live one is incremented
+_INCR = """
+INSERT INTO rate_limits (key, hits, expires_at) VALUES (?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    hits = CASE WHEN expires_at <= ? THEN excluded.hits ELSE hits + excluded.hits END,
+    expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+RETURNING hits
+"""
+
+# Expired rows are purged after this many increments in a process
+_PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file, safe across threads and processes."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, timeout=5.0, **options):
+        self.path = uri.split('://', 1)[1][1:]
+        if not self.path:
+            raise ValueError(f"{uri!r} names no database file")
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._incrs = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().execute(_SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread, reopened in a forked child
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._connection()
+        hits = conn.execute(_INCR, (key, amount, now + expiry, now, now)).fetchone()[0]
+        self._incrs += 1
+        if self._incrs % _PURGE_EVERY == 0:
+            conn.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return hits
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT hits FROM rate_limits WHERE key = ? AND expires_at > ?', (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
@@ -0,0 +1,246 @@
+"""
+Fleet-scale load generator for the ingest path.
+
+Drives N simulated vehicles through the application itself: trips are
+started with TripService.start_trip, fixes from simulate_next_location
+are posted to /api/update_location (or /api/update_location/batch) and
+trips are ended through /api/trip/end, all via Flask test clients, so
+routing, login, validation and the database are exercised for real.
+The database is whatever DATABASE_URL points at (SQLite or a local MySQL)
+and the run leaves its user, vehicles and trips behind; use a disposable
+database. Rate limiting and CSRF checks are switched off for the run.
+
+The report is a plain dict (see LoadGenerator.run) so it can be written
+as JSON and compared between versions.
+"""
+import heapq
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, text
+
+from app import db, limiter
+from app.models import Campus, Trip, User, VehicleTracking
+from app.utils.simulation import simulate_next_location
+
+logger = logging.getLogger(__name__)
+
+# Where the simulated fleet drives around
+ORIGIN = (19.0760, 72.8777)
+SPEED_KMH = 40
+
+
+def percentiles(samples_ms):
+    """Summary of a list of latencies in milliseconds."""
+    if not samples_ms:
+        return {'count': 0}
+    values = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+class _Vehicle:
+    __slots__ = ('id', 'lat', 'lng', 'heading', 'pending')
+
+    def __init__(self, vehicle_id, lat, lng):
+        self.id = vehicle_id
+        self.lat = lat
+        self.lng = lng
+        self.heading = random.uniform(0, 360)
+        self.pending = []
+
+    def step(self):
+        self.heading = (self.heading + random.uniform(-15, 15)) % 360
+        self.lat, self.lng = simulate_next_location(self.lat, self.lng, SPEED_KMH, self.heading)
+        return self.lat, self.lng
+
+
+class LoadGenerator:
+    """One load run against the current app; call run() inside an app context."""
+
+    def __init__(self, vehicles=50, duration=30.0, rate=1.0, batch=1, workers=4):
+        self.vehicles = vehicles
+        self.duration = duration
+        self.rate = rate          # fixes per vehicle per second
+        self.batch = batch        # fixes per request; 1 uses /api/update_location
+        self.workers = max(1, min(workers, vehicles))
+        self._ingest = 'update_location' if batch <= 1 else 'update_location_batch'
+        self._latencies = {'start_trip': [], self._ingest: [], 'end_trip': []}
+        self._statuses = {}
+        self._fixes = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        app = current_app._get_current_object()
+        user_id, fleet = self._create_fleet()
+        before = self._db_snapshot()
+        limiter_enabled, csrf_enabled = limiter.enabled, app.config.get('WTF_CSRF_ENABLED', True)
+        limiter.enabled, app.config['WTF_CSRF_ENABLED'] = False, False
+        try:
+            self._start_trips(fleet)
+            started = time.perf_counter()
+            threads = [threading.Thread(target=self._drive, args=(app, user_id, fleet[i::self.workers]),
+                                        name=f'loadgen-{i}', daemon=True)
+                       for i in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            self._end_trips(app, user_id, fleet)
+        finally:
+            limiter.enabled, app.config['WTF_CSRF_ENABLED'] = limiter_enabled, csrf_enabled
+        db.session.remove()
+        after = self._db_snapshot()
+        return self._report(elapsed, before, after)
+
+    # --------------- phases ---------------
+
+    def _create_fleet(self):
+        from app.services.vehicle_service import VehicleService
+
+        tag = datetime.utcnow().strftime('%Y%m%d%H%M%S') + f'{random.randrange(1000):03d}'
+        user = User(username=f'loadgen-{tag}', email=f'loadgen-{tag}@example.com', password_hash='!')
+        db.session.add(user)
+        if Campus.query.count() < 2:
+            db.session.add_all([Campus(name=f'Loadgen A {tag}', latitude=ORIGIN[0], longitude=ORIGIN[1]),
+                                Campus(name=f'Loadgen B {tag}', latitude=ORIGIN[0] - 0.04, longitude=ORIGIN[1])])
+        db.session.commit()
+        fleet = []
+        for i in range(self.vehicles):
+            vehicle = VehicleService.create_vehicle(user.id, f'Load {i}', f'LG{tag[-8:]}{i:05d}', 'EV', 60.0)
+            fleet.append(_Vehicle(vehicle.id, ORIGIN[0] + random.uniform(-0.05, 0.05),
+                                  ORIGIN[1] + random.uniform(-0.05, 0.05)))
+        return user.id, fleet
+
+    def _start_trips(self, fleet):
+        from app.services.trip_service import TripService
+
+        source, destination = Campus.query.order_by(Campus.id).limit(2).all()
+        for vehicle in fleet:
+            started = time.perf_counter()
+            trip, error = TripService.start_trip(vehicle.id, source.id, destination.id, vehicle.lat, vehicle.lng,
+                                                 destination.latitude, destination.longitude)
+            self._latencies['start_trip'].append((time.perf_counter() - started) * 1000)
+            if error:
+                raise RuntimeError(f"Could not start a trip for vehicle {vehicle.id}: {error}")
+
+    def _drive(self, app, user_id, fleet):
+        """Post each vehicle's fixes on its own schedule until the duration is up."""
+        client = self._client(app, user_id)
+        latencies, statuses, fixes = [], {}, 0
+        interval = 1.0 / self.rate
+        start = time.perf_counter()
+        deadline = start + self.duration
+        # Spread the vehicles' first fixes over one interval
+        due = [(start + interval * i / len(fleet), i) for i in range(len(fleet))]
+        heapq.heapify(due)
+        while due:
+            at, i = heapq.heappop(due)
+            if at >= deadline:
+                break
+            delay = at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            vehicle = fleet[i]
+            lat, lng = vehicle.step()
+            if self.batch <= 1:
+                sent = 1
+                began = time.perf_counter()
+                response = client.post('/api/update_location',
+                                       json={'vehicle_id': vehicle.id, 'lat': lat, 'lng': lng})
+            else:
+                vehicle.pending.append({'vehicle_id': vehicle.id, 'lat': lat, 'lng': lng,
+                                        'speed': SPEED_KMH, 'recorded_at': time.time()})
+                response = None
+                if len(vehicle.pending) >= self.batch:
+                    points, vehicle.pending = vehicle.pending, []
+                    sent = len(points)
+                    began = time.perf_counter()
+                    response = client.post('/api/update_location/batch', json={'points': points})
+            if response is not None:
+                latencies.append((time.perf_counter() - began) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    fixes += sent
+            heapq.heappush(due, (at + interval, i))
+        with self._lock:
+            self._latencies[self._ingest].extend(latencies)
+            self._fixes += fixes
+            for status, count in statuses.items():
+                self._statuses[status] = self._statuses.get(status, 0) + count
+
+    def _end_trips(self, app, user_id, fleet):
+        client = self._client(app, user_id)
+        for vehicle in fleet:
+            started = time.perf_counter()
+            response = client.post('/api/trip/end', json={'vehicle_id': vehicle.id})
+            self._latencies['end_trip'].append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                logger.warning("Ending the trip of vehicle %s returned %s", vehicle.id, response.status_code)
+
+    # --------------- helpers ---------------
+
+    @staticmethod
+    def _client(app, user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+
+    def _db_snapshot(self):
+        return {
+            'trips': db.session.query(func.count(Trip.id)).scalar(),
+            'tracking_points': db.session.query(func.count(VehicleTracking.id)).scalar(),
+            'bytes': _database_bytes(),
+        }
+
+    def _report(self, elapsed, before, after):
+        requests = sum(self._statuses.values())
+        growth = {key: after[key] - before[key] for key in ('trips', 'tracking_points')}
+        growth['bytes'] = after['bytes'] - before['bytes'] if after['bytes'] is not None else None
+        return {
+            'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'database': db.engine.dialect.name,
+            'config': {
+                'vehicles': self.vehicles, 'duration_s': self.duration, 'rate_per_vehicle': self.rate,
+                'batch': self.batch, 'workers': self.workers,
+                'write_behind': current_app.config.get('TRACKING_WRITE_BEHIND', False),
+            },
+            'elapsed_s': round(elapsed, 3),
+            'offered_fixes_per_s': round(self.vehicles * self.rate, 1),
+            'fixes_accepted': self._fixes,
+            'fixes_per_s': round(self._fixes / elapsed, 1) if elapsed else 0.0,
+            'requests': requests,
+            'requests_per_s': round(requests / elapsed, 1) if elapsed else 0.0,
+            'status_codes': {str(status): count for status, count in sorted(self._statuses.items())},
+            'latency': {name: percentiles(samples) for name, samples in self._latencies.items()},
+            'db_growth': growth,
+        }
+
+
+def _database_bytes():
+    """Size of the database's tables where the backend can tell us, else None."""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        page_count = db.session.execute(text('PRAGMA page_count')).scalar()
+        page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+        return page_count * page_size
+    if dialect == 'mysql':
+        return int(db.session.execute(text(
+            "SELECT COALESCE(SUM(data_length + index_length), 0) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE()")).scalar())
+    return None
@@ -0,0 +1,70 @@
+"""
+Small thread-safe LRU map for per-process caches of immutable values.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used key. maxsize=0 disables it.
+    With a ttl (seconds), entries also expire that long after they were put.
+
+    `generation` advances on every pop() and clear(). A caller that computes
+    a value from the database reads it first and passes it to put(), which
+    then drops the value if an invalidation happened in between (it may
+    hold data from before the change).
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_MISSING, None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+        self.hits = self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,47 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor records the sort key of the last row a client has seen; the next
+page starts strictly after it, so pages stay stable while new rows are
+inserted and deep pages cost the same as the first one. Cursors are
+signed with the app's SECRET_KEY: clients can pass them back but cannot
+forge or edit them.
+"""
+from datetime import datetime
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was tampered with or issued by another endpoint."""
+
+
+def _serializer(scope):
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=f"cursor:{scope}")
+
+
+def encode_cursor(scope, *key):
+    """Opaque cursor for the sort key of the last returned row. Datetimes are supported."""
+    values = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in key]
+    return _serializer(scope).dumps(values)
+
+
+def decode_cursor(scope, token):
+    """Sort key stored in a cursor, or None for the first page. Raises InvalidCursor."""
+    if not token:
+        return None
+    try:
+        values = _serializer(scope).loads(token)
+    except BadSignature as e:
+        raise InvalidCursor("Invalid cursor") from e
+    return tuple(datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in values)
+
+
+def page_size(raw, default, maximum):
+    """Clamp a requested page size to [1, maximum]."""
+    try:
+        size = int(raw) if raw is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
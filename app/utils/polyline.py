@@ -0,0 +1,120 @@
+"""
+Route level-of-detail helpers.
+
+* simplify      -- Douglas-Peucker over a local metric projection: every
+  dropped point lies within tolerance_m of the simplified line.
+* encode / decode -- Google encoded-polyline format (precision 5, ~1 m),
+  the compact string form Leaflet plugins and most map SDKs understand.
+* encode_values / decode_values -- the same varint scheme for a plain
+  integer series (e.g. vertex times in seconds).
+* resample      -- positions at fixed time steps along a timed path.
+"""
+import math
+
+from app.utils.distance import EARTH_RADIUS_KM
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+METRES_PER_DEGREE = EARTH_RADIUS_KM * 1000 * math.pi / 180
+PRECISION = 5
+
+
+def simplify(lats, lngs, tolerance_m):
+    """Indices of the points Douglas-Peucker keeps, first and last included."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    n = lats.size
+    if n <= 2:
+        return np.arange(n)
+
+    # Equirectangular projection around the track: metre-accurate at trip scale
+    y = (lats - lats[0]) * METRES_PER_DEGREE
+    x = (lngs - lngs[0]) * METRES_PER_DEGREE * np.cos(np.radians(lats.mean()))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(x[first + 1:last], y[first + 1:last],
+                                       x[first], y[first], x[last], y[last])
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance_m:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def _segment_distances(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(px - ax, py - ay)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def encode(lats, lngs):
+    """Encoded-polyline string of a path."""
+    scale = 10 ** PRECISION
+    lat_ints = np.rint(np.asarray(lats, dtype=np.float64) * scale).astype(np.int64)
+    lng_ints = np.rint(np.asarray(lngs, dtype=np.float64) * scale).astype(np.int64)
+    deltas = np.empty(lat_ints.size * 2, dtype=np.int64)
+    deltas[0::2] = np.diff(lat_ints, prepend=np.int64(0))
+    deltas[1::2] = np.diff(lng_ints, prepend=np.int64(0))
+    return _encode_ints(deltas.tolist())
+
+
+def decode(polyline):
+    """Inverse of encode: (lats, lngs) arrays."""
+    values = np.cumsum(np.array(_decode_ints(polyline), dtype=np.int64).reshape(-1, 2), axis=0)
+    return values[:, 0] / 10 ** PRECISION, values[:, 1] / 10 ** PRECISION
+
+
+def encode_values(values):
+    """Delta + varint encoding of an integer series."""
+    values = np.asarray(values, dtype=np.int64)
+    return _encode_ints(np.diff(values, prepend=np.int64(0)).tolist())
+
+
+def decode_values(encoded):
+    return np.cumsum(np.array(_decode_ints(encoded), dtype=np.int64))
+
+
+def resample(times, lats, lngs, step_s):
+    """Positions every step_s seconds along a path, linearly interpolated. Returns (t, lats, lngs)."""
+    times = np.asarray(times, dtype=np.float64)
+    if times.size == 0:
+        return times, np.empty(0), np.empty(0)
+    grid = np.arange(times[0], times[-1], step_s, dtype=np.float64)
+    grid = np.append(grid, times[-1])
+    return grid, np.interp(grid, times, lats), np.interp(grid, times, lngs)
+
+
+def _encode_ints(values):
+    chunks = []
+    for value in values:
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def _decode_ints(encoded):
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    return values
@@ -0,0 +1,139 @@
+"""
+Connection pool instrumentation.
+
+PoolMonitor listens to the engine's pool events and keeps counters for
+connections opened, checked out, returned and invalidated, plus the
+high-water mark of connections in use. Checkout wait time is measured by
+InstrumentedQueuePool, a QueuePool that times each wait for a connection
+and records checkouts that had to use overflow or timed out. Both report
+to the module-level `pool_monitor`.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkouts waiting longer than this are logged
+SLOW_CHECKOUT_MS = 100
+
+
+class PoolMonitor:
+    """Thread-safe counters fed by pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self.reset()
+
+    def attach(self, engine):
+        """Start recording the events of engine's pool (replaces any previous engine)."""
+        self.reset()
+        self._pool = engine.pool
+        for name, handler in (('connect', self._on_connect), ('checkout', self._on_checkout),
+                              ('checkin', self._on_checkin), ('invalidate', self._on_invalidate),
+                              ('soft_invalidate', self._on_invalidate)):
+            if not event.contains(engine, name, handler):
+                event.listen(engine, name, handler)
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.overflow_checkouts = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.slow_checkouts = 0
+
+    def record_wait(self, wait_ms, overflow):
+        with self._lock:
+            self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if overflow:
+                self.overflow_checkouts += 1
+            if wait_ms >= SLOW_CHECKOUT_MS:
+                self.slow_checkouts += 1
+        if wait_ms >= SLOW_CHECKOUT_MS:
+            logger.warning("Waited %.0f ms for a database connection (%d in use)", wait_ms, self.in_use)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+        logger.error("Database pool exhausted: no connection within the pool timeout (%d in use)", self.in_use)
+
+    def stats(self):
+        pool = self._pool
+        size = pool.size() if isinstance(pool, QueuePool) else None
+        capacity = size + pool._max_overflow if size is not None and pool._max_overflow >= 0 else None
+        with self._lock:
+            return {
+                'pool': type(pool).__name__ if pool is not None else None,
+                'size': size,
+                'capacity': capacity,
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'utilization': round(self.in_use / capacity, 3) if capacity else None,
+                'idle': pool.checkedin() if isinstance(pool, QueuePool) else None,
+                'overflow': pool.overflow() if isinstance(pool, QueuePool) else None,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'overflow_checkouts': self.overflow_checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'avg_wait_ms': round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3),
+            }
+
+    # --------------- event handlers ---------------
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+        logger.warning("Database connection invalidated: %s", exception)
+
+
+pool_monitor = PoolMonitor()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        overflow = self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_monitor.record_timeout()
+            raise
+        # Only a checkout that opened a connection beyond pool_size is an overflow one
+        grew = self.overflow()
+        pool_monitor.record_wait((time.perf_counter() - started) * 1000, overflow=grew > overflow and grew > 0)
+        return connection
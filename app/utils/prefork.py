@@ -0,0 +1,240 @@
+"""
+Pre-forking process manager for the Waitress server.
+
+The parent binds the listening socket once and forks `workers` children,
+each of which builds the app and serves it with Waitress on that shared
+socket, so CPU-bound requests spread over several interpreters instead of
+contending for one GIL. The parent only supervises: it replaces workers
+that exit (crashed or recycled), backs off while they keep dying at
+startup, restarts them all on SIGHUP and stops them on SIGTERM or SIGINT.
+
+A Worker stops gracefully when signalled, when its parent goes away, or
+after max_requests requests: it stops accepting connections, waits up to
+graceful_timeout seconds for the requests in flight, then shuts down.
+"""
+import atexit
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A worker exiting sooner than this after being forked failed to boot
+MIN_UPTIME = 2.0
+MAX_BACKOFF = 30.0
+
+
+def bind_socket(host, port, backlog=1024):
+    """A listening TCP socket for the workers to share."""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+class _TrackedResponse:
+    """Response iterable that reports when the server has finished with it."""
+
+    def __init__(self, iterable, done):
+        self._iterable = iterable
+        self._done = done
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            close = getattr(self._iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._done()
+
+
+class Worker:
+    """
+    WSGI wrapper that serves one app in a worker process.
+
+    It counts requests in flight (until their response is closed, so live
+    streams count too) for the graceful stop, and requests served for
+    recycling.
+    """
+
+    def __init__(self, app, sock, threads=4, max_requests=0, graceful_timeout=30, **adjustments):
+        self.app = app
+        self.sock = sock
+        self.threads = threads
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.adjustments = adjustments
+        self.served = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = None
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.in_flight += 1
+            self.served += 1
+            recycle = self.served == self.max_requests
+        if recycle:
+            logger.info("Worker %s served %s requests; recycling", os.getpid(), self.served)
+            self.stop()
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        return _TrackedResponse(response, self._finished)
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stop(self, *_):
+        """Begin a graceful stop; safe to call from a signal handler."""
+        self._stopping.set()
+
+    def serve(self):
+        """Serve until stopped, then return once in-flight requests are done."""
+        from waitress import create_server
+
+        def shut_down(*_):
+            raise SystemExit(0)  # caught by the Waitress loop, which stops its threads
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, shut_down)
+        self._server = create_server(self, sockets=[self.sock], threads=self.threads, **self.adjustments)
+        threading.Thread(target=self._drain_when_stopped, name='worker-drain', daemon=True).start()
+        self._server.run()
+
+    def _drain_when_stopped(self):
+        parent = os.getppid()
+        while not self._stopping.wait(1.0):
+            if os.getppid() != parent:
+                logger.warning("Worker %s lost its parent; stopping", os.getpid())
+                break
+        self._server.accepting = False
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.in_flight > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if self.in_flight > 0:
+            logger.warning("Worker %s stopping with %s requests still in flight", os.getpid(), self.in_flight)
+        os.kill(os.getpid(), signal.SIGUSR1)
+
+
+class PreforkServer:
+    """
+    Forks and supervises `workers` processes that each call serve_worker(slot).
+
+    serve_worker runs in the child and should return when the worker has
+    stopped; the child then exits with status 0 (1 if it raised).
+    """
+
+    def __init__(self, serve_worker, workers, graceful_timeout=30):
+        self.serve_worker = serve_worker
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self._children = {}   # pid -> (slot, forked_at)
+        self._due = {}        # slot -> monotonic time to fork it at
+        self._failures = {}   # slot -> consecutive failed boots
+        self._running = False
+        self._reload = False
+
+    def run(self):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._restart_all)
+        self._due = {slot: 0.0 for slot in range(self.workers)}
+        logger.info("Supervisor %s starting %s workers", os.getpid(), self.workers)
+        while self._running:
+            if self._reload:
+                self._reload = False
+                logger.info("Restarting %s workers", len(self._children))
+                self._signal_all(signal.SIGTERM)
+            now = time.monotonic()
+            for slot, when in list(self._due.items()):
+                if when <= now:
+                    del self._due[slot]
+                    self._spawn(slot)
+            self._reap()
+            time.sleep(0.2)
+        self._shutdown()
+
+    def _stop(self, *_):
+        self._running = False
+
+    def _restart_all(self, *_):
+        self._reload = True
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            try:
+                self.serve_worker(slot)
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                status = 1
+            finally:
+                atexit._run_exitfuncs()
+                os._exit(status)
+        self._children[pid] = (slot, time.monotonic())
+        logger.info("Worker %s started (slot %s)", pid, slot)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, forked_at = self._children.pop(pid, (None, None))
+            if slot is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                logger.warning("Worker %s exited with %s", pid, code if code > 0 else f"signal {-code}")
+            if not self._running:
+                continue
+            if code != 0 and time.monotonic() - forked_at < MIN_UPTIME:
+                self._failures[slot] = self._failures.get(slot, 0) + 1
+            else:
+                self._failures[slot] = 0
+            delay = min(2 ** self._failures[slot] - 1, MAX_BACKOFF)
+            if delay:
+                logger.warning("Worker slot %s keeps failing to start; retrying in %ss", slot, delay)
+            self._due[slot] = time.monotonic() + delay
+
+    def _signal_all(self, signum):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown(self):
+        logger.info("Stopping %s workers", len(self._children))
+        self._signal_all(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        if self._children:
+            logger.warning("Killing %s workers that did not stop in time", len(self._children))
+            self._signal_all(signal.SIGKILL)
+            while self._children:
+                pid, _ = os.waitpid(-1, 0)
+                self._children.pop(pid, None)
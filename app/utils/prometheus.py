@@ -0,0 +1,165 @@
+"""
+Minimal in-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and fixed-bucket histograms keyed by a tuple of label
+values, with no dependency beyond the standard library. Updates take one
+lock and a dict lookup, so they are cheap enough for the ingest hot path;
+rendering walks every series and is meant for a scraper every few seconds.
+Metrics that are always updated together can share one lock and be
+updated in a single critical section through their _inc/_observe methods.
+"""
+import threading
+from bisect import bisect_left
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=(), lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = lock or threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set; or read from a callback at scrape time."""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), function=None, lock=None):
+        super().__init__(name, documentation, labelnames, lock)
+        self.function = function
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _inc(self, labelvalues, amount=1):
+        """inc() for callers already holding this metric's lock."""
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self):
+        if self.function is not None:
+            value = self.function()
+            return [] if value is None else [f'{self.name} {_format_value(value)}']
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}' for key, v in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down; or read from a callback at scrape time."""
+    type_name = 'gauge'
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set."""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, lock=None):
+        super().__init__(name, documentation, labelnames, lock)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            self._observe(value, labelvalues)
+
+    def _observe(self, value, labelvalues):
+        """observe() for callers already holding this metric's lock."""
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, (le,))} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def clear(self):
+        """Reset every series (tests, app re-creation); callback gauges are kept."""
+        for metric in self._metrics.values():
+            if hasattr(metric, 'clear'):
+                metric.clear()
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,46 @@
+"""
+Shared statement timing on top of SQLAlchemy cursor events.
+
+Every consumer of per-query timings (the /metrics counters, the query
+inspector) subscribes a callback(statement, elapsed_seconds) here instead
+of installing its own before/after_cursor_execute pair: SQLAlchemy then
+dispatches one pair of events per query however many consumers there are,
+and an engine nobody subscribed for pays for none.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+
+_callbacks = ()  # replaced, never mutated, so the listeners iterate without locking
+_lock = threading.Lock()
+
+
+def subscribe(engine, callback):
+    """Call callback(statement, elapsed_seconds) after every statement run on engine."""
+    global _callbacks
+    with _lock:
+        if callback not in _callbacks:
+            _callbacks = _callbacks + (callback,)
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def unsubscribe(callback):
+    global _callbacks
+    with _lock:
+        _callbacks = tuple(c for c in _callbacks if c is not callback)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for callback in _callbacks:
+        callback(statement, elapsed)
@@ -0,0 +1,146 @@
+"""
+Opt-in SQL inspection for development and tests.
+
+QueryInspector subscribes to the shared cursor-event timing of
+app.utils.query_events and records every statement run on the current
+thread while a capture is open: its
+normalised shape (literals and IN-lists collapsed) and its duration.
+Repeated shapes within one request are the signature of an N+1 pattern.
+
+With QUERY_INSPECTOR=true each request is captured: the response gets
+X-Query-Count / X-Query-Time-Ms headers and a log line, and shapes run
+at least QUERY_INSPECTOR_REPEAT_THRESHOLD times are logged as likely
+N+1s. Tests use capture() directly (see the query_budget fixture).
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import request
+
+from app.utils import query_events
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+# The open request capture, kept in the WSGI environ (g outlives the request under a pushed app context)
+_CAPTURE_KEY = 'ev_tracking.query_capture'
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+
+
+def statement_shape(statement):
+    """Statement with literals and placeholder lists collapsed, to group repeats."""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    return _PLACEHOLDER_LIST.sub('(?...)', shape)
+
+
+class QueryReport:
+    """Statements recorded by one capture, in execution order."""
+
+    def __init__(self):
+        self.statements = []  # (shape, elapsed_ms)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(ms for _, ms in self.statements)
+
+    def repeated(self, threshold=2):
+        """[(shape, times)] of shapes run at least threshold times, most frequent first."""
+        counts = Counter(shape for shape, _ in self.statements)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+    def summary(self, threshold=2):
+        lines = [f"{self.count} queries in {self.total_ms:.1f} ms"]
+        lines.extend(f"  {n}x {shape}" for shape, n in self.repeated(threshold))
+        return '\n'.join(lines)
+
+
+class QueryInspector:
+    """Thread-local statement capture on top of the shared cursor-event timing."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self.repeat_threshold = 5
+
+    def init_app(self, app, engine):
+        """Capture every request when QUERY_INSPECTOR is set; otherwise stay detached."""
+        if not app.config.get('QUERY_INSPECTOR', False):
+            return
+        self.repeat_threshold = app.config.get('QUERY_INSPECTOR_REPEAT_THRESHOLD', self.repeat_threshold)
+        self.listen(engine)
+        app.before_request(self._start_request)
+        app.after_request(self._report_request)
+        # Closed on teardown, which runs even when the view raised and after_request was skipped
+        app.teardown_request(self._end_request)
+
+    def listen(self, engine):
+        query_events.subscribe(engine, self._record)
+
+    @contextmanager
+    def capture(self, engine=None):
+        """Record the statements run on this thread inside the block into a QueryReport."""
+        if engine is not None:
+            self.listen(engine)
+        report = QueryReport()
+        reports = self._reports()
+        reports.append(report)
+        try:
+            yield report
+        finally:
+            reports.remove(report)
+
+    # --------------- request hooks ---------------
+
+    def _start_request(self):
+        capture = self.capture()
+        request.environ[_CAPTURE_KEY] = (capture, capture.__enter__())
+
+    def _report_request(self, response):
+        if _CAPTURE_KEY not in request.environ:
+            return response
+        _, report = request.environ[_CAPTURE_KEY]
+        response.headers['X-Query-Count'] = str(report.count)
+        response.headers['X-Query-Time-Ms'] = f"{report.total_ms:.2f}"
+        repeated = report.repeated(self.repeat_threshold)
+        if repeated:
+            logger.warning("%s %s: possible N+1, %s", request.method, request.path,
+                           report.summary(self.repeat_threshold))
+        else:
+            logger.info("%s %s: %d queries in %.1f ms", request.method, request.path,
+                        report.count, report.total_ms)
+        return response
+
+    def _end_request(self, exc=None):
+        capture, _ = request.environ.pop(_CAPTURE_KEY, (None, None))
+        if capture is not None:
+            capture.__exit__(None, None, None)
+
+    # --------------- statement timing ---------------
+
+    def _reports(self):
+        reports = getattr(self._local, 'reports', None)
+        if reports is None:
+            reports = self._local.reports = []
+        return reports
+
+    def _record(self, statement, elapsed):
+        reports = getattr(self._local, 'reports', None)
+        if not reports:
+            return
+        shape = statement_shape(statement)
+        for report in reports:
+            report.statements.append((shape, elapsed * 1000))
+
+
+query_inspector = QueryInspector()
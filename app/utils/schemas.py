@@ -22,7 +22,44 @@ def trip_summary(trip):
     }
 
 
-def vehicle_card(vehicle):
+def trip_list_item(trip):
+    """A trip row in paginated history listings."""
+    return {
+        **trip_summary(trip),
+        "start": _point(trip.start_lat, trip.start_longitude),
+        "end": _point(trip.end_lat, trip.end_longitude),
+    }
+
+
+def tracking_point(point):
+    """One stored GPS fix of a trip."""
+    return {
+        "lat": float(point.latitude),
+        "lng": float(point.longitude),
+        "speed_kmph": round(float(point.speed or 0), 2),
+        "recorded_at": point.recorded_at.isoformat() if point.recorded_at else None,
+    }
+
+
+def analytics_bucket(start, totals):
+    """Aggregated completed trips of one day/week/month bucket."""
+    return {
+        "start": start.isoformat(),
+        "trips": totals.trips,
+        "distance_km": round(totals.distance_km, 2),
+        "avg_speed_kmph": round(totals.speed_sum / totals.trips, 2) if totals.trips else 0,
+        "avg_score": round(totals.score_sum / totals.scored, 1) if totals.scored else None,
+        "energy_kwh": round(totals.energy_kwh, 3),
+    }
+
+
+def _point(lat, lng):
+    if lat is None or lng is None:
+        return None
+    return [round(float(lat), 6), round(float(lng), 6)]
+
+
+def vehicle_card(vehicle, active_trip_id=None):
     """Public representation shown on the dashboard."""
     battery = vehicle.battery
     return {
@@ -31,15 +68,61 @@ def vehicle_card(vehicle):
         "license_plate": vehicle.license_plate,
         "model": vehicle.model,
         "battery_pct": round(float(battery.current_percentage), 1) if battery else 0,
+        "active_trip_id": active_trip_id,
     }
 
 
-def battery_update(battery):
+def vehicle_position(vehicle):
+    """Latest known position and telemetry of a vehicle (fleet map)."""
+    return {
+        "id": vehicle.id,
+        "name": vehicle.name,
+        "status": vehicle.status,
+        "lat": float(vehicle.current_lat) if vehicle.current_lat is not None else None,
+        "lng": float(vehicle.current_lng) if vehicle.current_lng is not None else None,
+        "speed_kmph": round(float(vehicle.current_speed or 0), 1),
+        "battery_pct": round(float(vehicle.battery_level), 1) if vehicle.battery_level is not None else None,
+        "last_seen_at": vehicle.last_seen_at.isoformat() if vehicle.last_seen_at else None,
+    }
+
+
+def battery_update(battery_pct):
     """Real-time telemetry payload returned during live tracking."""
-    if not battery:
+    if battery_pct is None:
         return {"battery": 100.0, "low_battery_alert": False}
-    pct = float(battery.current_percentage)
+    pct = float(battery_pct)
     return {
         "battery": round(pct, 1),
         "low_battery_alert": pct < 20,
     }
+
+
+def live_position(vehicle_id, trip_id, points, speed, battery_pct):
+    """Server-push payload for the live trip / fleet streams."""
+    lat, lng, recorded_at = points[-1]
+    return {
+        "vehicle_id": vehicle_id,
+        "trip_id": trip_id,
+        "lat": float(lat),
+        "lng": float(lng),
+        "path": [[float(p[0]), float(p[1])] for p in points],
+        "speed_kmph": round(float(speed or 0), 1),
+        "recorded_at": recorded_at.isoformat() if recorded_at else None,
+        **battery_update(battery_pct),
+    }
+
+
+def trip_route(route, replay_step_s, replay_polyline):
+    """Simplified route of a trip plus its fixed-step replay, both as encoded polylines."""
+    return {
+        "trip_id": route.trip_id,
+        "tolerance_m": route.tolerance_m,
+        "polyline": route.polyline,
+        "points": route.point_count,
+        "source_points": route.source_point_count,
+        "started_at": route.start_epoch,
+        "replay": {
+            "step_s": replay_step_s,
+            "polyline": replay_polyline,
+        },
+    }
@@ -1,13 +1,13 @@
 import math
-from geopy.distance import geodesic
+from app.utils.distance import distance_km
 
-def haversine_distance(lat1, lon1, lat2, lon2):
+def haversine_distance(lat1, lon1, lat2, lon2, precise=False):
     """
     Calculate the great circle distance between two points 
     on the earth (specified in decimal degrees)
     """
-    # Use geopy for accuracy
-    return geodesic((lat1, lon1), (lat2, lon2)).kilometers
+    # Fast haversine by default; precise=True uses the geopy geodesic
+    return distance_km(float(lat1), float(lon1), float(lat2), float(lon2), precise=precise)
 
 def calculate_battery_drain(distance_km, vehicle_model="Standard"):
     """
@@ -0,0 +1,167 @@
+"""
+In-memory grid index of point positions for nearest / radius queries.
+
+Positions are bucketed into fixed-size lat/lng cells. A nearest query
+walks rings of cells outward from the query cell and stops as soon as no
+unvisited cell can hold anything closer, so its cost depends on the local
+density rather than on the total number of points. When a query would
+visit more cells than are occupied (e.g. far away from the whole fleet)
+it falls back to scanning the occupied cells directly.
+"""
+import heapq
+import math
+import threading
+import time
+
+from app.utils.distance import haversine_km
+
+KM_PER_DEGREE = 111.195  # great-circle km per degree of latitude
+
+
+class SpatialIndex:
+    """Thread-safe grid index mapping ids to (lat, lng)."""
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self._cells = {}
+        self._positions = {}
+        self._lock = threading.RLock()
+        self.warmed_at = None
+
+    # --------------- maintenance ---------------
+
+    def upsert(self, key, lat, lng):
+        lat, lng = float(lat), float(lng)
+        cell = self._cell(lat, lng)
+        with self._lock:
+            old = self._positions.get(key)
+            if old is not None and old[2] != cell:
+                self._discard(key, old[2])
+            self._positions[key] = (lat, lng, cell)
+            self._cells.setdefault(cell, {})[key] = (lat, lng)
+
+    def remove(self, key):
+        with self._lock:
+            old = self._positions.pop(key, None)
+            if old is not None:
+                self._discard(key, old[2])
+
+    def load(self, items):
+        """Replace the whole index with (key, lat, lng) items and mark it warm."""
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+            for key, lat, lng in items:
+                self.upsert(key, lat, lng)
+            self.warmed_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+            self.warmed_at = None
+
+    def is_warm(self, max_age=None):
+        if self.warmed_at is None:
+            return False
+        return max_age is None or time.monotonic() - self.warmed_at < max_age
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    # --------------- queries ---------------
+
+    def nearest(self, lat, lng, k=1):
+        """Return up to k (distance_km, key) pairs, closest first."""
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            if not self._positions:
+                return []
+            ci, cj = self._cell(lat, lng)
+            best = []  # max-heap of (-distance, key)
+            visited = 0
+            ring = 0
+            while True:
+                for cell in self._ring(ci, cj, ring):
+                    visited += 1
+                    for key, (plat, plng) in self._cells.get(cell, {}).items():
+                        self._offer(best, k, haversine_km(lat, lng, plat, plng), key)
+                # Anything outside the visited rings is at least this far away
+                if len(best) == k and -best[0][0] <= self._ring_clearance_km(lat, ring):
+                    break
+                if len(best) == len(self._positions):
+                    break
+                if visited > len(self._cells):
+                    return self._scan(lat, lng, k)
+                ring += 1
+            return sorted((-d, key) for d, key in best)
+
+    def within(self, lat, lng, radius_km):
+        """Return (distance_km, key) pairs within radius_km, closest first."""
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            ci, cj = self._cell(lat, lng)
+            di = math.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE))
+            cos_lat = max(math.cos(math.radians(min(abs(lat) + di * self.cell_deg, 89.9))), 1e-6)
+            # +1: a great circle is slightly shorter than the parallel it spans
+            dj = math.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE * cos_lat)) + 1
+
+            if (2 * di + 1) * (2 * dj + 1) > len(self._cells):
+                cells = self._cells.values()
+            else:
+                cells = (self._cells.get((i, j), {})
+                         for i in range(ci - di, ci + di + 1) for j in range(cj - dj, cj + dj + 1))
+
+            found = []
+            for bucket in cells:
+                for key, (plat, plng) in bucket.items():
+                    d = haversine_km(lat, lng, plat, plng)
+                    if d <= radius_km:
+                        found.append((d, key))
+            return sorted(found)
+
+    # --------------- internals ---------------
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _discard(self, key, cell):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def _ring_clearance_km(self, lat, r):
+        """Lower bound on the distance from a point in the centre cell to cells beyond ring r."""
+        cos_lat = math.cos(math.radians(min(abs(lat) + (r + 1) * self.cell_deg, 89.9)))
+        # 0.99: a great circle is slightly shorter than the parallel it spans
+        return 0.99 * r * self.cell_deg * KM_PER_DEGREE * cos_lat
+
+    @staticmethod
+    def _ring(ci, cj, r):
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    @staticmethod
+    def _offer(heap, k, distance, key):
+        if len(heap) < k:
+            heapq.heappush(heap, (-distance, key))
+        elif distance < -heap[0][0]:
+            heapq.heapreplace(heap, (-distance, key))
+
+    def _scan(self, lat, lng, k):
+        best = []
+        for key, (plat, plng, _) in self._positions.items():
+            self._offer(best, k, haversine_km(lat, lng, plat, plng), key)
+        return sorted((-d, key) for d, key in best)
@@ -0,0 +1,110 @@
+"""
+Process startup helpers.
+
+ensure_schema() replaces an unconditional db.create_all() at boot: a
+database that already records SCHEMA_VERSION costs one query instead of
+an existence check per table. Only an empty database is created and
+stamped; one that is behind must be upgraded by hand (schema.sql).
+
+warm_up() pays the costs the first requests would otherwise see --
+template compilation, opening pooled database connections, the deferred
+imports of app.utils.lazy and the admin dashboard aggregation -- before
+a worker starts accepting connections.
+"""
+import logging
+import time
+
+from sqlalchemy import exc, func, inspect, select, text
+
+from app import db
+from app.models import SCHEMA_VERSION, SchemaVersion
+from app.services.admin_service import admin_stats
+from app.utils import lazy
+
+logger = logging.getLogger(__name__)
+
+
+def schema_version():
+    """The highest revision recorded in the database, None if there is none (or no table)."""
+    try:
+        # Core rather than ORM: the mappers need not be configured yet
+        return db.session.execute(select(func.max(SchemaVersion.__table__.c.version))).scalar()
+    except exc.DBAPIError:
+        db.session.rollback()
+        return None
+
+
+def ensure_schema():
+    """
+    Create the schema in an empty database and stamp it with SCHEMA_VERSION;
+    True if it did. Raises RuntimeError for a database that holds some of the
+    tables but is behind: create_all() would only add the missing tables and
+    leave changed columns and indexes behind, so it is not stamped.
+    """
+    current = schema_version()
+    if current is not None and current >= SCHEMA_VERSION:
+        return False
+    existing = set(inspect(db.engine).get_table_names()) & set(db.metadata.tables)
+    if existing:
+        raise RuntimeError(
+            f"Database schema is at version {current or 'unknown'}, the code expects {SCHEMA_VERSION}: "
+            f"apply the statements under 'UPGRADING AN EXISTING DATABASE' at the end of schema.sql"
+        )
+    logger.info("Empty database: creating the schema at version %s", SCHEMA_VERSION)
+    try:
+        db.create_all()
+        db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Failed to create the database schema")
+        raise
+    return True
+
+
+def warm_up(app, connections=None):
+    """
+    Compile every template, open up to `connections` pooled connections
+    (default: the pool size), import deferred modules and prime the admin
+    dashboard stats.
+
+    Returns {step: seconds}.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    timings['templates'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with app.app_context():
+        engine = db.engine
+        if connections is None:
+            size = getattr(engine.pool, 'size', None)
+            connections = size() if callable(size) else 1
+        opened = []
+        try:
+            # Held together, so the pool really opens that many connections
+            for _ in range(connections):
+                conn = engine.connect()
+                opened.append(conn)
+                conn.execute(text('SELECT 1'))
+        finally:
+            for conn in opened:
+                conn.close()
+    timings['database'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lazy.load_all()
+    timings['imports'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with app.app_context():
+        # A cold admin_stats computes inline; afterwards it only refreshes in the background
+        admin_stats.get()
+    timings['aggregates'] = time.perf_counter() - started
+
+    logger.info("Warmed up in %.0f ms (%s)", sum(timings.values()) * 1000,
+                ', '.join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items()))
+    return timings
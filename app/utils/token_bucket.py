@@ -0,0 +1,58 @@
+"""
+Per-key token-bucket rate limiting.
+
+Each key (e.g. a vehicle id) gets a bucket of `burst` tokens refilled at
+`rate` tokens per second; a request spends one token or is refused with the
+time until the next token. Buckets live in a bounded LRU map, so an idle key
+simply starts again from a full bucket.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Thread-safe token buckets keyed by an arbitrary hashable."""
+
+    def __init__(self, rate=1.0, burst=10, maxsize=100000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self.allowed = self.limited = 0
+
+    def init_app(self, app, rate=None, burst=None):
+        if rate is not None:
+            self.rate = rate
+        if burst is not None:
+            self.burst = burst
+        self.clear()
+
+    def consume(self, key, tokens=1):
+        """(allowed, retry_after_s): spend tokens from key's bucket if it has them."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+            if bucket[0] >= tokens:
+                bucket[0] -= tokens
+                self.allowed += 1
+                return True, 0.0
+            self.limited += 1
+            return False, (tokens - bucket[0]) / self.rate if self.rate > 0 else float('inf')
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+        self.allowed = self.limited = 0
+
+    def __len__(self):
+        return len(self._buckets)
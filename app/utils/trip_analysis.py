@@ -0,0 +1,146 @@
+"""
+Driving-behaviour analysis shared by live ingest and post-trip recomputation.
+
+TripStats is the running state of a trip. Live ingest folds one point at a
+time into it and persists the deltas; a full recomputation folds every
+stored point from scratch. Both paths go through TripStats.add so they
+produce identical results.
+
+fold_arrays is the vectorized engine for bulk (post-trip / backfill)
+analysis: it works on plain lat/lng/time column arrays and uses the same
+haversine kernel, so it matches the scalar path to floating-point
+rounding.
+"""
+from app.utils.distance import path_distances_km
+from app.utils.lazy import lazy_import
+from app.utils.simulation import haversine_distance, calculate_battery_drain
+
+np = lazy_import('numpy')
+
+SPEED_LIMIT = 80  # km/h
+HARSH_THRESHOLD = 3  # m/s^2
+
+
+class TripStats:
+    """Running distance, energy and driving-event counters for one trip."""
+
+    __slots__ = ('distance_km', 'energy_kwh', 'overspeed', 'harsh_accel', 'harsh_brake', 'prev_speed')
+
+    def __init__(self, distance_km=0.0, energy_kwh=0.0, overspeed=0, harsh_accel=0,
+                 harsh_brake=0, prev_speed=0.0):
+        self.distance_km = distance_km
+        self.energy_kwh = energy_kwh
+        self.overspeed = overspeed
+        self.harsh_accel = harsh_accel
+        self.harsh_brake = harsh_brake
+        self.prev_speed = prev_speed
+
+    @classmethod
+    def from_trip(cls, trip):
+        """Rebuild the running state persisted on a Trip row."""
+        return cls(
+            distance_km=float(trip.running_distance_km or 0),
+            energy_kwh=float(trip.energy_consumed_kwh or 0),
+            overspeed=trip.overspeed_count or 0,
+            harsh_accel=trip.harsh_acceleration_count or 0,
+            harsh_brake=trip.harsh_braking_count or 0,
+            prev_speed=float(trip.last_speed_kmph or 0),
+        )
+
+    def apply_to(self, trip):
+        """Persist this running state onto a Trip row (the caller commits)."""
+        trip.running_distance_km = self.distance_km
+        trip.energy_consumed_kwh = self.energy_kwh
+        trip.overspeed_count = self.overspeed
+        trip.harsh_acceleration_count = self.harsh_accel
+        trip.harsh_braking_count = self.harsh_brake
+        trip.last_speed_kmph = self.prev_speed
+
+    def add(self, prev_lat, prev_lng, prev_time, lat, lng, recorded_at):
+        """Fold the segment between two consecutive fixes. Returns its length in km."""
+        dist = haversine_distance(prev_lat, prev_lng, lat, lng)
+        self.distance_km += dist
+        self.energy_kwh += calculate_battery_drain(dist)
+
+        time_diff = (recorded_at - prev_time).total_seconds()
+        if time_diff > 0:
+            speed = dist / (time_diff / 3600)
+            if speed > SPEED_LIMIT:
+                self.overspeed += 1
+
+            accel = (speed - self.prev_speed) / (time_diff / 3600) / 3600 * 1000
+            if accel > HARSH_THRESHOLD:
+                self.harsh_accel += 1
+            elif accel < -HARSH_THRESHOLD:
+                self.harsh_brake += 1
+            self.prev_speed = speed
+        return dist
+
+    def merge(self, later):
+        """Append the deltas of a later stretch of the same trip."""
+        self.distance_km += later.distance_km
+        self.energy_kwh += later.energy_kwh
+        self.overspeed += later.overspeed
+        self.harsh_accel += later.harsh_accel
+        self.harsh_brake += later.harsh_brake
+        self.prev_speed = later.prev_speed
+        return self
+
+    def result(self, battery_capacity):
+        """Summary in the shape returned by TripService._analyze_trip_points."""
+        capacity = float(battery_capacity or 75.0)
+        return {
+            'total_distance': round(self.distance_km, 2),
+            'harsh_accel': self.harsh_accel,
+            'harsh_brake': self.harsh_brake,
+            'overspeed': self.overspeed,
+            'battery_consumed_pct': round((self.energy_kwh / capacity) * 100, 2) if capacity > 0 else 0
+        }
+
+
+def fold_points(points):
+    """Fold an ordered sequence of tracking points into a fresh TripStats."""
+    stats = TripStats()
+    for i in range(1, len(points)):
+        prev, cur = points[i - 1], points[i]
+        stats.add(prev.latitude, prev.longitude, prev.recorded_at,
+                  cur.latitude, cur.longitude, cur.recorded_at)
+    return stats
+
+
+def analyze_points(points, battery_capacity):
+    """Full recomputation over an ordered sequence of tracking points."""
+    return fold_points(points).result(battery_capacity)
+
+
+def fold_arrays(lats, lngs, times):
+    """
+    Vectorized equivalent of fold_points.
+
+    lats / lngs are float arrays in degrees, times are epoch seconds, all in
+    recording order. Returns a TripStats.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    if lats.size < 2:
+        return TripStats()
+
+    dists = path_distances_km(lats, lngs)
+
+    # Speed only updates across segments with a positive time step
+    time_diffs = np.diff(times)
+    moving = time_diffs > 0
+    hours = time_diffs[moving] / 3600
+    speeds = dists[moving] / hours
+    prev_speeds = np.concatenate(([0.0], speeds[:-1]))
+    accels = (speeds - prev_speeds) / hours / 3600 * 1000
+
+    return TripStats(
+        distance_km=float(dists.sum()),
+        energy_kwh=float(calculate_battery_drain(dists).sum()),
+        overspeed=int(np.count_nonzero(speeds > SPEED_LIMIT)),
+        harsh_accel=int(np.count_nonzero(accels > HARSH_THRESHOLD)),
+        harsh_brake=int(np.count_nonzero(accels < -HARSH_THRESHOLD)),
+        prev_speed=float(speeds[-1]) if speeds.size else 0.0,
+    )
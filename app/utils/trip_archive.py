@@ -0,0 +1,73 @@
+"""
+Compact on-disk encoding of one trip's tracking points.
+
+Layout: a fixed header (magic, version, point count, CRC-32 of the raw
+payload) followed by a zlib-compressed payload of four int64 columns --
+latitude and longitude in 1e-8 degrees (exactly the DECIMAL(10, 8) /
+DECIMAL(11, 8) resolution), speed in 0.01 km/h and recorded_at in
+microseconds since the epoch. Each column is delta-encoded and
+byte-shuffled before compression, so a slowly moving track compresses to
+a few bytes per point while decoding back to the stored values exactly.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+MAGIC = b'EVTA'
+VERSION = 1
+HEADER = struct.Struct('<4sBII')  # magic, version, count, crc32
+COORD_SCALE = 10 ** 8
+SPEED_SCALE = 100
+
+Track = namedtuple('Track', 'lats lngs speeds times_us')
+
+
+class ArchiveFormatError(ValueError):
+    """Raised when an archive blob is truncated, corrupt or of an unknown version."""
+
+
+def encode_track(lats, lngs, speeds, times_us):
+    """Encode equal-length columns (degrees, km/h, epoch microseconds) into bytes."""
+    columns = (
+        np.rint(np.asarray(lats, dtype=np.float64) * COORD_SCALE),
+        np.rint(np.asarray(lngs, dtype=np.float64) * COORD_SCALE),
+        np.rint(np.asarray(speeds, dtype=np.float64) * SPEED_SCALE),
+        np.asarray(times_us),
+    )
+    count = len(columns[0])
+    payload = b''.join(_shuffle(np.diff(c.astype(np.int64), prepend=np.int64(0))) for c in columns)
+    return HEADER.pack(MAGIC, VERSION, count, zlib.crc32(payload)) + zlib.compress(payload, 9)
+
+
+def decode_track(blob):
+    """Inverse of encode_track. Returns a Track of NumPy arrays."""
+    if len(blob) < HEADER.size:
+        raise ArchiveFormatError("archive blob is truncated")
+    magic, version, count, crc = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ArchiveFormatError(f"unsupported archive format {magic!r} v{version}")
+    try:
+        payload = zlib.decompress(blob[HEADER.size:])
+    except zlib.error as e:
+        raise ArchiveFormatError(f"archive payload is corrupt: {e}") from e
+    if len(payload) != 4 * 8 * count or zlib.crc32(payload) != crc:
+        raise ArchiveFormatError("archive payload failed its integrity check")
+
+    size = 8 * count
+    lats, lngs, speeds, times = (
+        np.cumsum(_unshuffle(payload[i * size:(i + 1) * size], count)) for i in range(4)
+    )
+    return Track(lats / COORD_SCALE, lngs / COORD_SCALE, speeds / SPEED_SCALE, times)
+
+
+def _shuffle(column):
+    """Group the n-th byte of every value together; deltas are mostly zero high bytes."""
+    return column.astype('<i8').view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(data, count):
+    return np.frombuffer(data, dtype=np.uint8).reshape(8, count).T.copy().view('<i8').ravel()
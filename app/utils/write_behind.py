@@ -0,0 +1,226 @@
+"""
+Bounded write-behind queue drained by a background thread.
+
+Producers submit() items and return immediately; a daemon thread hands
+them to a handler in batches, either once flush_size items are waiting
+or after flush_interval seconds, whichever comes first. A full queue
+raises WriteBehindFull so callers can push back on their clients instead
+of buffering without limit. flush() drains everything synchronously, and
+the queue is flushed once more when the process exits.
+
+A batch the handler fails on is retried ahead of everything queued after
+it, up to max_retries times with exponential backoff from retry_delay
+(flush() retries without waiting). After that it is handed to dead_letter,
+if given, and dropped: an accepted item is not a stored one.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindFull(Exception):
+    """Raised by submit() when the queue is at capacity."""
+
+
+class WriteBehindQueue:
+    """Thread-safe bounded buffer with a batching background writer."""
+
+    def __init__(self, handler, key=None, maxsize=10000, flush_size=200, flush_interval=1.0,
+                 max_retries=3, retry_delay=0.5, dead_letter=None, name='write-behind'):
+        self.handler = handler
+        self.key = key
+        self.maxsize = maxsize
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.dead_letter = dead_letter
+        self.name = name
+        self.enabled = False
+        self._app = None
+        self._items = deque()
+        self._retry = None  # (batch, attempts) of a failed batch, written before anything else
+        self._retry_at = 0.0
+        self._pending = Counter()
+        self._cond = threading.Condition()
+        # Held while a batch is taken off the queue *and* written, so batches
+        # are persisted strictly in submission order
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._atexit_registered = False
+        self._reset_counters()
+
+    def init_app(self, app, enabled=False, maxsize=None, flush_size=None, flush_interval=None,
+                 max_retries=None, retry_delay=None):
+        self.stop()
+        self._app = app
+        self.enabled = enabled
+        self.maxsize = maxsize or self.maxsize
+        self.flush_size = flush_size or self.flush_size
+        self.flush_interval = flush_interval or self.flush_interval
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if retry_delay is not None:
+            self.retry_delay = retry_delay
+        self._retry = None
+        self._pending.clear()
+        self._reset_counters()
+        if enabled and not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    # --------------- producer side ---------------
+
+    def submit(self, item):
+        """Queue an item for the background writer. Raises WriteBehindFull at capacity."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self.rejected += 1
+                raise WriteBehindFull(f"{self.name} queue is full ({self.maxsize} items)")
+            self._items.append(item)
+            if self.key is not None:
+                self._pending[self.key(item)] += 1
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            if len(self._items) >= self.flush_size:
+                self._cond.notify()
+        self._ensure_started()
+
+    def has_pending(self, key):
+        """Whether items submitted under key (see the key function) are not yet written."""
+        return self._pending.get(key, 0) > 0
+
+    def flush(self):
+        """Write everything queued so far on the calling thread."""
+        while self._write_batch(wait_backoff=False):
+            pass
+
+    def stop(self):
+        """Stop the background writer and flush whatever is still queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        if self._app is not None and (self._items or self._retry):
+            self.flush()
+        self._stopping = False
+
+    def stats(self):
+        flushes = self.flushes or 1
+        return {
+            'enabled': self.enabled,
+            'queue_depth': len(self._items),
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'submitted': self.submitted,
+            'written': self.written,
+            'rejected': self.rejected,
+            'retried': self.retried,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_flush_ms': round(self.total_flush_ms / flushes, 3),
+        }
+
+    def __len__(self):
+        return len(self._items) + (len(self._retry[0]) if self._retry else 0)
+
+    # --------------- writer side ---------------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                timeout = self.flush_interval
+                if self._retry is not None:
+                    timeout = min(timeout, max(0.0, self._retry_at - time.monotonic()))
+                self._cond.wait_for(
+                    lambda: self._stopping or (self._retry is None and len(self._items) >= self.flush_size),
+                    timeout=timeout)
+                if self._stopping:
+                    return
+            # Drain whole batches; leave a partial one for the next time window
+            while self._write_batch() and len(self._items) >= self.flush_size:
+                pass
+
+    def _write_batch(self, wait_backoff=True):
+        """
+        Retry the failed batch, or take up to flush_size items, and hand them to
+        the handler. Returns False when idle or while a retry is backing off.
+        """
+        with self._write_lock:
+            if self._retry is not None:
+                if wait_backoff and time.monotonic() < self._retry_at:
+                    return False
+                (batch, attempts), self._retry = self._retry, None
+            else:
+                with self._cond:
+                    batch = [self._items.popleft() for _ in range(min(self.flush_size, len(self._items)))]
+                attempts = 0
+            if not batch:
+                return False
+
+            started = time.perf_counter()
+            try:
+                with self._app.app_context():
+                    self.handler(batch)
+                self.written += len(batch)
+            except Exception:
+                attempts += 1
+                if attempts <= self.max_retries:
+                    delay = self.retry_delay * 2 ** (attempts - 1)
+                    self._retry, self._retry_at = (batch, attempts), time.monotonic() + delay
+                    self.retried += len(batch)
+                    logger.warning("%s: failed to write a batch of %d items, retry %d of %d in %.1f s",
+                                   self.name, len(batch), attempts, self.max_retries, delay, exc_info=True)
+                else:
+                    self.failed += len(batch)
+                    logger.exception("%s: dropping a batch of %d items after %d attempts",
+                                     self.name, len(batch), attempts)
+                    self._dead_letter(batch)
+            if self._retry is None and self.key is not None:
+                with self._cond:
+                    self._pending.subtract(self.key(item) for item in batch)
+                    self._pending += Counter()  # drop keys that reached zero
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return True
+
+    def _dead_letter(self, batch):
+        if self.dead_letter is None:
+            return
+        try:
+            with self._app.app_context():
+                self.dead_letter(batch)
+        except Exception:
+            logger.exception("%s: failed to dead-letter %d items", self.name, len(batch))
+
+    def _reset_counters(self):
+        self.submitted = 0
+        self.written = 0
+        self.rejected = 0
+        self.retried = 0
+        self.failed = 0
+        self.flushes = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
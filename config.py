@@ -28,3 +28,97 @@ class Config:
     SESSION_COOKIE_SECURE = False 
     REMEMBER_COOKIE_SECURE = False
 
+    # Telemetry ingest
+    TRACKING_BATCH_MAX_POINTS = int(os.environ.get('TRACKING_BATCH_MAX_POINTS', 500))
+    # Device clocks may run this many seconds ahead; later recorded_at values are rejected
+    TRACKING_MAX_CLOCK_SKEW = int(os.environ.get('TRACKING_MAX_CLOCK_SKEW', 300))
+    # Per-process LRU of hot vehicle state (0 disables it, e.g. with several worker processes)
+    VEHICLE_STATE_CACHE_SIZE = int(os.environ.get('VEHICLE_STATE_CACHE_SIZE', 1024))
+    # Logged-in user snapshots for the login manager; 0 disables. The TTL bounds how long
+    # a change made outside the app (e.g. a user deleted in SQL) takes to apply
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 4096))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    # Vehicle API tokens (Authorization: Bearer) for update_location / trip end; signed with
+    # SECRET_KEY unless set. Revocations reach other processes within the deny-list TTL
+    DEVICE_TOKEN_SECRET = os.environ.get('DEVICE_TOKEN_SECRET')
+    DEVICE_TOKEN_DENYLIST_TTL = int(os.environ.get('DEVICE_TOKEN_DENYLIST_TTL', 30))
+    # Token-bucket limit per vehicle for token-authenticated calls (instead of the per-IP limits)
+    DEVICE_RATE_PER_SECOND = float(os.environ.get('DEVICE_RATE_PER_SECOND', 1.0))
+    DEVICE_RATE_BURST = int(os.environ.get('DEVICE_RATE_BURST', 20))
+    # Write-behind: update_location answers from in-memory state and a background
+    # thread writes fixes in batches. Single-process only, and needs the state cache.
+    TRACKING_WRITE_BEHIND = os.environ.get('TRACKING_WRITE_BEHIND', 'false').lower() == 'true'
+    TRACKING_WRITE_QUEUE_SIZE = int(os.environ.get('TRACKING_WRITE_QUEUE_SIZE', 10000))
+    TRACKING_FLUSH_SIZE = int(os.environ.get('TRACKING_FLUSH_SIZE', 200))
+    TRACKING_FLUSH_INTERVAL = float(os.environ.get('TRACKING_FLUSH_INTERVAL', 1.0))
+    # A batch that fails to write is retried this often (backing off from the delay, in
+    # seconds), then appended to the dead-letter file (JSON lines) and dropped
+    TRACKING_WRITE_RETRIES = int(os.environ.get('TRACKING_WRITE_RETRIES', 3))
+    TRACKING_RETRY_DELAY = float(os.environ.get('TRACKING_RETRY_DELAY', 0.5))
+    TRACKING_DEAD_LETTER_PATH = os.environ.get('TRACKING_DEAD_LETTER_PATH', 'logs/tracking_dead_letter.jsonl')
+
+    # Cold storage for the tracking points of completed trips (flask archive-trips)
+    TRIP_ARCHIVE_DIR = os.environ.get('TRIP_ARCHIVE_DIR', 'archive')
+    TRIP_ARCHIVE_AFTER_DAYS = int(os.environ.get('TRIP_ARCHIVE_AFTER_DAYS', 30))
+
+    # Dispatch: seconds before the in-memory index of available vehicles is rebuilt from the DB
+    DISPATCH_INDEX_MAX_AGE = int(os.environ.get('DISPATCH_INDEX_MAX_AGE', 300))
+
+    # Admin dashboard: seconds its cached aggregates are served before a background refresh
+    ADMIN_STATS_TTL = float(os.environ.get('ADMIN_STATS_TTL', 60))
+    # Analytics: closed day/week/month buckets kept in memory (entries per process)
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 20000))
+    # Seconds a cached bucket is served; bounds staleness after a late trip completion elsewhere
+    ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 3600))
+
+    # Live server-push streams (SSE). Every open stream holds one server thread,
+    # so keep the subscriber cap below the WSGI server's thread count; 0 turns them off
+    # (as wsgi.py --workers > 1 does).
+    LIVE_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_STREAM_MAX_SUBSCRIBERS', 16))
+    # Events buffered per subscriber before it is dropped as a slow consumer
+    LIVE_STREAM_QUEUE_SIZE = int(os.environ.get('LIVE_STREAM_QUEUE_SIZE', 100))
+    LIVE_STREAM_HEARTBEAT = int(os.environ.get('LIVE_STREAM_HEARTBEAT', 15))
+    # Streams are closed after this many seconds; EventSource reconnects on its own
+    LIVE_STREAM_MAX_DURATION = int(os.environ.get('LIVE_STREAM_MAX_DURATION', 300))
+
+    # Waitress worker threads (wsgi.py --threads); leaves room for regular
+    # requests next to the live streams
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4 + LIVE_STREAM_MAX_SUBSCRIBERS))
+    # Worker processes forked by wsgi.py, each running SERVER_THREADS threads on the
+    # shared listening socket; workers exit gracefully and are replaced after
+    # SERVER_MAX_REQUESTS requests (plus up to _JITTER more, 0 never recycles)
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 1))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 0))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 0))
+    # Seconds a stopping worker waits for in-flight requests (live streams included)
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    # Compile templates, open the DB pool and import deferred modules before serving
+    SERVER_WARM_UP = os.environ.get('SERVER_WARM_UP', 'false').lower() == 'true'
+    # Flask-Limiter counters. memory:// is per process; wsgi.py --workers > 1 switches
+    # it to a SQLite file shared by the workers (sqlite:////path/to/file.db)
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+
+    # Database connection pool (not applied to SQLite). Live streams hand their
+    # connection back before streaming, so one per server thread covers every
+    # request; the overflow absorbs background writers and refreshes.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', SERVER_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    # Seconds a request waits for a free connection before failing
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    # Recycle connections before MySQL's wait_timeout closes them server-side
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # Request/database/domain metrics, scraped from /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    # Per-request query count/time; adds SQLAlchemy's event dispatch to every query
+    METRICS_DB_QUERIES = os.environ.get('METRICS_DB_QUERIES', 'true').lower() == 'true'
+
+    # Development aid: log each request's SQL and add X-Query-Count/X-Query-Time-Ms headers
+    QUERY_INSPECTOR = os.environ.get('QUERY_INSPECTOR', 'false').lower() == 'true'
+    # Statement shapes repeated this often in one request are logged as likely N+1 queries
+    QUERY_INSPECTOR_REPEAT_THRESHOLD = int(os.environ.get('QUERY_INSPECTOR_REPEAT_THRESHOLD', 5))
+
+    # Operational endpoints under /internal (and /metrics) are only served to these client addresses
+    INTERNAL_ALLOWED_IPS = [ip.strip() for ip in
+                            os.environ.get('INTERNAL_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
@@ -1,11 +1,12 @@
 import os
-from app import create_app, db
+from app import create_app
+from app.utils.startup import ensure_schema
 
 app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()  # Create tables if they don't exist (useful for SQLite/Local Dev)
+        ensure_schema()  # Creates the tables in an empty database; refuses one behind SCHEMA_VERSION
     debug_mode = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
     app.run(debug=debug_mode)
     app.run(debug=True)
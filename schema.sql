@@ -1,5 +1,5 @@
 -- Database Creation Script for EV Tracking and Monitoring System
--- Table order: users → vehicles → battery_status → trips → vehicle_tracking
+-- Table order: users → vehicles → battery_status → trips → vehicle_tracking → trip_routes → user_stats
 -- (Dependencies must be created before dependents)
 
 CREATE DATABASE IF NOT EXISTS ev_tracking_db;
@@ -26,9 +26,14 @@ CREATE TABLE IF NOT EXISTS vehicles (
     status ENUM('available', 'busy') DEFAULT 'available',
     campus_id INT NULL,
     battery_level FLOAT DEFAULT 100.0 CHECK (battery_level BETWEEN 0 AND 100),
+    current_lat DECIMAL(10, 8) NULL,
+    current_lng DECIMAL(11, 8) NULL,
+    current_speed DECIMAL(5, 2) NULL,
+    last_seen_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (campus_id) REFERENCES campuses(id) ON DELETE SET NULL
+    FOREIGN KEY (campus_id) REFERENCES campuses(id) ON DELETE SET NULL,
+    INDEX idx_vehicles_status (status)
 ) ENGINE=InnoDB;
 
 -- ================== 3. BATTERY STATUS ==================
@@ -61,13 +66,20 @@ CREATE TABLE IF NOT EXISTS trips (
     harsh_acceleration_count INT DEFAULT 0,
     harsh_braking_count INT DEFAULT 0,
     overspeed_count INT DEFAULT 0,
+    running_distance_km DOUBLE DEFAULT 0.0,
+    energy_consumed_kwh DOUBLE DEFAULT 0.0,
+    last_speed_kmph DOUBLE DEFAULT 0.0,
     driving_score INT DEFAULT 100 CHECK (driving_score >= 0 AND driving_score <= 100),
     driver_rating VARCHAR(2),
     status ENUM('active', 'completed') DEFAULT 'active',
+    archived_at TIMESTAMP NULL,
     FOREIGN KEY (vehicle_id) REFERENCES vehicles(id) ON DELETE CASCADE,
     FOREIGN KEY (source_campus_id) REFERENCES campuses(id) ON DELETE SET NULL,
     FOREIGN KEY (destination_campus_id) REFERENCES campuses(id) ON DELETE SET NULL,
     INDEX idx_trips_vehicle (vehicle_id),
+    INDEX idx_trips_vehicle_start (vehicle_id, start_time, id),
+    INDEX idx_trips_analytics (vehicle_id, status, start_time, total_distance_km,
+                               average_speed_kmph, driving_score, energy_consumed_kwh),
     INDEX idx_trips_status (status)
 ) ENGINE=InnoDB;
 
@@ -84,6 +96,117 @@ CREATE TABLE IF NOT EXISTS vehicle_tracking (
     FOREIGN KEY (trip_id) REFERENCES trips(id) ON DELETE CASCADE,
     INDEX idx_tracking_vehicle (vehicle_id),
     INDEX idx_tracking_trip (trip_id),
-    INDEX idx_tracking_time (recorded_at)
+    INDEX idx_tracking_time (recorded_at),
+    INDEX idx_tracking_trip_time (trip_id, recorded_at)
 ) ENGINE=InnoDB;
 
+
+-- ================== 6. TRIP ROUTES ==================
+-- Simplified routes of completed trips, one row per level of detail
+CREATE TABLE IF NOT EXISTS trip_routes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    trip_id INT NOT NULL,
+    tolerance_m INT NOT NULL,
+    polyline MEDIUMTEXT NOT NULL,
+    timeline MEDIUMTEXT NOT NULL,
+    start_epoch BIGINT NULL,
+    point_count INT NOT NULL,
+    source_point_count INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (trip_id) REFERENCES trips(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_trip_routes_level (trip_id, tolerance_m),
+    INDEX idx_trip_routes_trip (trip_id)
+) ENGINE=InnoDB;
+
+-- ================== 7. USER STATS ==================
+-- Per-user rollup read by the profile dashboard; updated as trips complete
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    total_distance_km DOUBLE NOT NULL DEFAULT 0.0,
+    trip_count INT NOT NULL DEFAULT 0,
+    score_sum INT NOT NULL DEFAULT 0,
+    scored_trip_count INT NOT NULL DEFAULT 0,
+    vehicle_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- ================== 8. DEVICE TOKEN REVOCATIONS ==================
+-- Deny-list of vehicle API tokens: one token, or (token_id NULL) every token
+-- of the vehicle issued before revoked_at. Cached by each app process.
+CREATE TABLE IF NOT EXISTS device_token_revocations (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    vehicle_id INT NOT NULL,
+    token_id VARCHAR(32) NULL,
+    revoked_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX idx_device_token_revocations_vehicle (vehicle_id),
+    UNIQUE KEY uq_device_token_revocations_token (vehicle_id, token_id),
+    FOREIGN KEY (vehicle_id) REFERENCES vehicles(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- ================== 9. SCHEMA VERSION ==================
+-- Revisions of this schema applied to the database (SCHEMA_VERSION in
+-- app/models.py). run.py creates the tables only in an empty database and
+-- refuses to start on one that is behind: apply the upgrade notes below.
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO schema_version (version) VALUES (1), (2), (3), (4);
+
+-- ================== UPGRADING AN EXISTING DATABASE ==================
+-- Databases created from an earlier revision of this script can be brought
+-- up to date by running the statements below once.
+--
+-- ALTER TABLE trips
+--     ADD COLUMN running_distance_km DOUBLE DEFAULT 0.0,
+--     ADD COLUMN energy_consumed_kwh DOUBLE DEFAULT 0.0,
+--     ADD COLUMN last_speed_kmph DOUBLE DEFAULT 0.0;
+--
+-- ALTER TABLE vehicles
+--     ADD COLUMN current_lat DECIMAL(10, 8) NULL,
+--     ADD COLUMN current_lng DECIMAL(11, 8) NULL,
+--     ADD COLUMN current_speed DECIMAL(5, 2) NULL,
+--     ADD COLUMN last_seen_at TIMESTAMP NULL,
+--     ADD INDEX idx_vehicles_status (status);
+-- then run `flask backfill-latest-positions` to populate the new columns.
+--
+-- ALTER TABLE trips
+--     ADD COLUMN archived_at TIMESTAMP NULL;
+--
+-- and create the trip_routes table (section 6 above); routes of older
+-- trips are built on first view.
+--
+-- ALTER TABLE trips
+--     ADD INDEX idx_trips_vehicle_start (vehicle_id, start_time, id);
+--
+-- Create the user_stats table (section 7 above), then run
+-- `flask rebuild-user-stats` to populate it.
+--
+-- ALTER TABLE trips
+--     ADD INDEX idx_trips_analytics (vehicle_id, status, start_time, total_distance_km,
+--                                    average_speed_kmph, driving_score, energy_consumed_kwh);
+--
+-- Create the device_token_revocations table (section 8 above) before
+-- issuing vehicle API tokens.
+--
+-- Create the schema_version table and record version 1 (section 9 above)
+-- once the statements above have been applied.
+--
+-- Version 2: token revocations are unique per vehicle, not globally:
+-- ALTER TABLE device_token_revocations
+--     DROP INDEX token_id,
+--     ADD UNIQUE KEY uq_device_token_revocations_token (vehicle_id, token_id);
+-- INSERT INTO schema_version (version) VALUES (2);
+--
+-- Version 3: the latest fix of a trip by device time:
+-- ALTER TABLE vehicle_tracking
+--     ADD INDEX idx_tracking_trip_time (trip_id, recorded_at);
+-- INSERT INTO schema_version (version) VALUES (3);
+--
+-- Version 4: revoke-all cut-offs are compared in milliseconds (tables
+-- created from this file already have TIMESTAMP(3)):
+-- ALTER TABLE device_token_revocations
+--     MODIFY revoked_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3);
+-- INSERT INTO schema_version (version) VALUES (4);
@@ -0,0 +1,96 @@
+"""
+Benchmark: nearest-available-vehicle lookup with 10k synthetic vehicles.
+
+Compares the grid SpatialIndex (nearest-1, nearest-5, 1 km radius) with a
+linear haversine scan over every vehicle, and times the one-query DB warm-up
+used when the index is cold.
+
+Run from the project root (SECRET_KEY / DATABASE_URL must be set, as for the tests):
+    python -m tests.benchmarks.bench_dispatch
+    python -m tests.benchmarks.bench_dispatch --vehicles 50000
+"""
+import argparse
+import random
+import time
+import timeit
+
+from app import create_app, db
+from app.models import User, Vehicle, VehicleTracking
+from app.services.vehicle_service import VehicleService, available_index
+from app.utils.distance import haversine_km
+from app.utils.spatial_index import SpatialIndex
+from config import Config
+
+
+class BenchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+def _fleet(n, seed=3):
+    """Vehicles scattered over a ~40 x 40 km metro area."""
+    rng = random.Random(seed)
+    return [(i + 1, 19.0760 + rng.uniform(-0.18, 0.18), 72.8777 + rng.uniform(-0.18, 0.18)) for i in range(n)]
+
+
+def _best_us(fn, queries):
+    return min(timeit.repeat(lambda: [fn(q) for q in queries], number=1, repeat=5)) / len(queries) * 1e6
+
+
+def run(n):
+    fleet = _fleet(n)
+    rng = random.Random(11)
+    queries = [(19.0760 + rng.uniform(-0.15, 0.15), 72.8777 + rng.uniform(-0.15, 0.15)) for _ in range(200)]
+
+    index = SpatialIndex()
+    started = time.perf_counter()
+    index.load(fleet)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    def linear_nearest(q):
+        return min((haversine_km(q[0], q[1], lat, lng), key) for key, lat, lng in fleet)
+
+    def linear_within(q):
+        return [key for key, lat, lng in fleet if haversine_km(q[0], q[1], lat, lng) <= 1.0]
+
+    rows = (
+        ('nearest k=1', lambda q: index.nearest(*q, k=1), linear_nearest),
+        ('nearest k=5', lambda q: index.nearest(*q, k=5), linear_nearest),
+        ('within 1 km', lambda q: index.within(*q, 1.0), linear_within),
+    )
+    print(f"{n} vehicles, index built in {build_ms:.1f} ms\n")
+    print(f"{'query':<12} | {'index':>10} | {'linear':>10} | {'speed-up':>8}")
+    print('-' * 50)
+    for name, indexed, linear in rows:
+        i_us, l_us = _best_us(indexed, queries), _best_us(linear, queries[:20])
+        print(f"{name:<12} | {i_us:>8.1f}µs | {l_us:>8.1f}µs | {l_us / i_us:>7.0f}x")
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        owner = User(username='fleet', email='fleet@example.com', password_hash='x')
+        db.session.add(owner)
+        db.session.flush()
+        db.session.execute(db.insert(Vehicle), [
+            {'id': key, 'user_id': owner.id, 'name': f'V{key}', 'license_plate': f'P{key}', 'status': 'available'}
+            for key, _, _ in fleet
+        ])
+        db.session.execute(db.insert(VehicleTracking), [
+            {'vehicle_id': key, 'latitude': lat, 'longitude': lng} for key, lat, lng in fleet
+        ])
+        db.session.commit()
+
+        available_index.clear()
+        started = time.perf_counter()
+        VehicleService.get_nearest_available_vehicle(*queries[0])
+        cold_ms = (time.perf_counter() - started) * 1000
+        warm_us = _best_us(lambda q: VehicleService.get_nearest_available_vehicle(*q), queries[:50])
+        print(f"\nVehicleService.get_nearest_available_vehicle: cold (DB warm-up) {cold_ms:.1f} ms, "
+              f"warm {warm_us:.0f}µs (includes loading the Vehicle row)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vehicles', type=int, default=10000, help='Number of synthetic vehicles')
+    args = parser.parse_args()
+    run(args.vehicles)
@@ -0,0 +1,117 @@
+"""
+Benchmark: cost of the request metrics on the ingest hot path.
+
+Times the metric primitives, the before/after/teardown request hooks as
+they run for POST /api/update_location and the per-query listener, then
+adds them up for the number of queries that endpoint issues.
+
+Run from the project root (SECRET_KEY / DATABASE_URL must be set, as for the tests):
+    python -m tests.benchmarks.bench_metrics
+    python -m tests.benchmarks.bench_metrics --requests 5000
+"""
+import argparse
+import threading
+import timeit
+
+from flask import Response
+from sqlalchemy import create_engine, text
+
+from app import create_app, db, metrics
+from app.models import User
+from app.services.vehicle_service import VehicleService
+from app.utils import query_events
+from app.utils.prometheus import Counter, Histogram
+from config import Config
+
+# Per-request overhead the hooks must stay under
+BUDGET_US = 5.0
+
+
+class BenchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+
+
+def _best_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def _primitives():
+    counter = Counter('c_total', 'c', ('endpoint', 'method', 'status'))
+    histogram = Histogram('h_seconds', 'h', ('endpoint',))
+    print(f"Counter.inc           {_best_us(lambda: counter.inc('tracking.update_location', 'POST', 200), 200000):6.2f}µs")
+    print(f"Histogram.observe     {_best_us(lambda: histogram.observe(0.0042, 'tracking.update_location'), 200000):6.2f}µs")
+
+
+def _hooks(app, label):
+    response = Response('{}', mimetype='application/json')
+    with app.test_request_context('/api/update_location', method='POST'):
+        def cycle():
+            metrics._start_request()
+            metrics._record_response(response)
+            metrics._end_request()
+        hook_us = _best_us(cycle, 50000)
+    print(f"request hooks {label:<8}{hook_us:6.2f}µs per request "
+          f"({'within' if hook_us <= BUDGET_US else 'OVER'} the {BUDGET_US:.0f}µs budget)")
+    return hook_us
+
+
+def _query_listener():
+    def select_us(engine):
+        with engine.connect() as conn:
+            return _best_us(lambda: conn.execute(text('SELECT 1')), 20000)
+
+    plain = create_engine('sqlite://')
+    listened = create_engine('sqlite://')
+    query_events.subscribe(listened, metrics._record_query)
+    base, instrumented = select_us(plain), select_us(listened)
+    # Mostly SQLAlchemy's own cost of dispatching engine events; METRICS_DB_QUERIES=false removes it
+    print(f"query listener        {instrumented - base:6.2f}µs per query (SELECT 1: {base:.1f}µs -> {instrumented:.1f}µs)")
+    return instrumented - base
+
+
+def _queries_per_update(app, n):
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        vehicle_id = VehicleService.create_vehicle(user_id, 'Bench', 'BENCH1', 'EV', 50.0).id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    payload = {'vehicle_id': vehicle_id, 'lat': 19.0760, 'lng': 72.8777}
+    client.post('/api/update_location', json=payload)  # warm the vehicle state cache
+    before = metrics.db_queries.value()
+    for _ in range(n):
+        client.post('/api/update_location', json=payload)
+    return (metrics.db_queries.value() - before) / n
+
+
+def run(n):
+    _primitives()
+    # Calibration: this machine's cost of an uncontended lock round trip
+    lock = threading.Lock()
+    print(f"(lock acquire/release {_best_us(lambda: (lock.acquire(), lock.release()), 200000):.2f}µs)")
+
+    class NoQueries(BenchConfig):
+        METRICS_DB_QUERIES = False
+
+    _hooks(create_app(NoQueries), '(no db)')
+    app = create_app(BenchConfig)
+    hook_us = _hooks(app, '(db)')
+    listener_us = _query_listener()
+    queries = _queries_per_update(app, n)
+    # An end-to-end A/B through the test client is dominated by run-to-run noise, so add up the parts
+    print(f"\nPOST /api/update_location: {queries:.1f} queries per request -> ~{hook_us:.1f}µs of request hooks "
+          f"+ ~{queries * listener_us:.0f}µs of query listeners (METRICS_DB_QUERIES=false drops the latter)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='update_location calls used to count queries')
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,164 @@
+"""
+Benchmark: service-layer hot paths on seeded datasets, with baselines.
+
+For each size N (10 / 1k / 100k by default) a fresh in-memory database is
+seeded with an active trip of N points, N completed trips for one user and
+N available vehicles with positions. Then each case below is timed, best
+of several rounds, and its queries per call are counted:
+
+  TripService.update_location, TripService.finalise_trip,
+  TripService._analyze_trip_points (N points), VehicleService.get_nearest_available_vehicle,
+  UserService.get_user_statistics, AdminService.get_dashboard_stats (cached) and
+  compute_dashboard_stats (cold), schemas.trip_list_item / tracking_point (N rows).
+
+Run from the project root (SECRET_KEY / DATABASE_URL must be set, as for the tests):
+    python -m tests.benchmarks.bench_services --save baseline.json
+    python -m tests.benchmarks.bench_services --compare baseline.json --tolerance 0.25
+    python -m tests.benchmarks.bench_services --sizes 10,1000 --cases update_location,finalise_trip
+--compare exits with status 1 when a case got slower than the tolerance or issues more queries.
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import create_app, db
+from app.models import Campus, Trip, User, Vehicle, VehicleTracking
+from app.services.admin_service import AdminService
+from app.services.trip_service import TripService
+from app.services.user_service import UserService
+from app.services.vehicle_service import VehicleService
+from app.services.vehicle_state import vehicle_state
+from app.utils.schemas import tracking_point, trip_list_item
+from config import Config
+from tests.benchmarks.harness import compare, exit_code, load_baseline, measure, save_baseline
+
+ORIGIN = (19.0760, 72.8777)
+
+
+class BenchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+def _seed(n, seed=7):
+    """Returns (user_id, tracked vehicle id, active trip id)."""
+    rng = random.Random(seed)
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    fleet_owner = User(username='fleet', email='fleet@example.com', password_hash='x')
+    source = Campus(name='North', latitude=ORIGIN[0], longitude=ORIGIN[1])
+    destination = Campus(name='South', latitude=19.0330, longitude=72.8570)
+    db.session.add_all([user, fleet_owner, source, destination])
+    db.session.flush()
+    tracked = Vehicle(user_id=user.id, name='Tracked', license_plate='BENCH-T', status='busy',
+                      battery_capacity_kwh=60.0)
+    history = Vehicle(user_id=user.id, name='History', license_plate='BENCH-H', battery_capacity_kwh=60.0)
+    db.session.add_all([tracked, history])
+    db.session.flush()
+    trip = Trip(vehicle_id=tracked.id, source_campus_id=source.id, destination_campus_id=destination.id,
+                start_lat=ORIGIN[0], start_longitude=ORIGIN[1], status='active')
+    db.session.add(trip)
+    db.session.flush()
+
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    db.session.execute(db.insert(VehicleTracking), [
+        {'vehicle_id': tracked.id, 'trip_id': trip.id, 'latitude': ORIGIN[0] + i * 0.0001,
+         'longitude': ORIGIN[1] + (i % 50) * 0.00005, 'speed': 30.0, 'recorded_at': start + timedelta(seconds=10 * i)}
+        for i in range(n)
+    ])
+    db.session.execute(db.insert(Trip), [
+        {'vehicle_id': history.id, 'source_campus_id': source.id, 'destination_campus_id': destination.id,
+         'status': 'completed', 'start_time': start - timedelta(hours=i), 'end_time': start - timedelta(hours=i - 1),
+         'start_lat': ORIGIN[0], 'start_longitude': ORIGIN[1], 'end_lat': 19.0330, 'end_longitude': 72.8570,
+         'total_distance_km': rng.uniform(1, 30), 'average_speed_kmph': rng.uniform(15, 60),
+         'driving_score': rng.randint(40, 100), 'driver_rating': 'B'}
+        for i in range(n)
+    ])
+    db.session.execute(db.insert(Vehicle), [
+        {'user_id': fleet_owner.id, 'name': f'Fleet {i}', 'license_plate': f'FLEET-{i}', 'status': 'available',
+         'current_lat': ORIGIN[0] + rng.uniform(-0.18, 0.18), 'current_lng': ORIGIN[1] + rng.uniform(-0.18, 0.18)}
+        for i in range(n)
+    ])
+    db.session.commit()
+    UserService.rebuild_statistics()
+    return user.id, tracked.id, trip.id
+
+
+def _cases(n, user_id, vehicle_id, trip_id):
+    """(name, fn, setup) for each hot path."""
+    steps = itertools.count()
+
+    def update_location():
+        i = next(steps)
+        TripService.update_location(vehicle_id, ORIGIN[0] + i * 1e-5, ORIGIN[1], speed=30.0)
+
+    def reopen_trip():
+        db.session.execute(update(Trip).where(Trip.id == trip_id).values(status='active', end_time=None))
+        db.session.execute(update(Vehicle).where(Vehicle.id == vehicle_id).values(status='busy'))
+        db.session.commit()
+        vehicle_state.invalidate(vehicle_id)
+
+    points = [VehicleTracking(latitude=ORIGIN[0] + i * 0.0001, longitude=ORIGIN[1], speed=float(20 + i % 40),
+                              recorded_at=datetime(2026, 1, 1) + timedelta(seconds=10 * i)) for i in range(n)]
+    rng = random.Random(5)
+    targets = itertools.cycle([(ORIGIN[0] + rng.uniform(-0.15, 0.15), ORIGIN[1] + rng.uniform(-0.15, 0.15))
+                               for _ in range(100)])
+    # Detached, so the other cases' commits neither expire them nor pay to walk them
+    trips = Trip.query.filter_by(status='completed').limit(n).all()
+    stored = VehicleTracking.query.filter_by(trip_id=trip_id).limit(n).all()
+    db.session.expunge_all()
+
+    return [
+        ('update_location', update_location, None),
+        ('finalise_trip', lambda: TripService.finalise_trip(vehicle_id), reopen_trip),
+        ('_analyze_trip_points', lambda: TripService._analyze_trip_points(points, 60.0), None),
+        ('get_nearest_available_vehicle', lambda: VehicleService.get_nearest_available_vehicle(*next(targets)), None),
+        ('get_user_statistics', lambda: UserService.get_user_statistics(user_id), None),
+        ('get_dashboard_stats', AdminService.get_dashboard_stats, None),
+        ('compute_dashboard_stats', AdminService.compute_dashboard_stats, None),
+        ('trip_list_item', lambda: [trip_list_item(t) for t in trips], None),
+        ('tracking_point', lambda: [tracking_point(p) for p in stored], None),
+    ]
+
+
+def run(sizes, only=None):
+    results = {}
+    print(f"{'case':<32} | {'size':>7} | {'per call':>12} | {'queries':>7}")
+    print('-' * 68)
+    for n in sizes:
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            ids = _seed(n)
+            print(f"{'(seed)':<32} | {n:>7} | {(time.perf_counter() - started) * 1000:>10.0f}ms |")
+            for name, fn, setup in _cases(n, *ids):
+                if only and name not in only:
+                    continue
+                us, queries = measure(fn, setup)
+                results[f'{name}@{n}'] = {'us': round(us, 2), 'queries': queries}
+                shown = f'{us:>10.1f}µs' if us < 10000 else f'{us / 1000:>10.1f}ms'
+                print(f"{name:<32} | {n:>7} | {shown} | {queries:>7}")
+            db.session.remove()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10,1000,100000', help='comma-separated dataset sizes')
+    parser.add_argument('--cases', default=None, help='comma-separated case names (default: all)')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slow-down before flagging')
+    args = parser.parse_args()
+
+    results = run([int(s) for s in args.sizes.split(',')], args.cases and set(args.cases.split(',')))
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nBaseline written to {args.save}")
+    if args.compare:
+        sys.exit(exit_code(compare(results, load_baseline(args.compare), args.tolerance)))
@@ -0,0 +1,149 @@
+"""
+Benchmark: cold start, from interpreter start to the first responses.
+
+Each round starts fresh interpreters (imports only happen once per
+process) against a SQLite file that already holds the schema, and times:
+
+  import_app    -- `from app import create_app, db`
+  create_app    -- building the app (extensions, blueprints, caches)
+  connect       -- the first database round trip
+  warm_up       -- app.utils.startup.warm_up (warm runs only)
+  schema_check  -- ensure_schema() on an up-to-date database, as run.py does
+  create_all    -- db.create_all(), what run.py used to do on every start
+  first_page    -- GET /login (template compilation)
+  first_query   -- GET /health
+  to_first_page -- import_app + create_app + warm_up + schema_check + first_page
+
+once without and once with the optional warm-up ("cold/" and "warm/"
+cases). --imports N also lists the N slowest top-level imports of the
+create_app chain (python -X importtime).
+
+Run from the project root (SECRET_KEY must be set, as for the tests):
+    python -m tests.benchmarks.bench_startup
+    python -m tests.benchmarks.bench_startup --rounds 10 --imports 15 --save startup.json
+    python -m tests.benchmarks.bench_startup --compare startup.json --tolerance 0.3
+--compare exits with status 1 when a case got slower than the tolerance or issues more queries.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in a fresh interpreter: argv = [database URI, 'cold' | 'warm']
+CHILD = textwrap.dedent("""
+    import json, sys, time
+    started = time.perf_counter()
+    from app import create_app, db
+    imported = time.perf_counter()
+    from config import Config
+
+    class StartupConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = sys.argv[1]
+
+    app = create_app(StartupConfig)
+    created = time.perf_counter()
+
+    from app.utils.query_inspector import query_inspector
+    from app.utils.startup import ensure_schema, warm_up
+
+    stages = {'import_app': [imported - started, 0], 'create_app': [created - imported, 0]}
+    client = app.test_client()
+
+    def stage(name, fn):
+        with app.app_context(), query_inspector.capture(db.engine) as report:
+            began = time.perf_counter()
+            fn()
+            stages[name] = [time.perf_counter() - began, report.count]
+
+    if sys.argv[2] == 'warm':
+        stage('warm_up', lambda: warm_up(app))
+    stage('connect', lambda: db.session.execute(db.text('SELECT 1')))
+    stage('schema_check', ensure_schema)
+    stage('create_all', db.create_all)
+    stage('first_page', lambda: client.get('/login'))
+    stage('first_query', lambda: client.get('/health'))
+    stages['to_first_page'] = [sum(stages[name][0] for name in
+                                   ('import_app', 'create_app', 'warm_up', 'schema_check', 'first_page')
+                                   if name in stages), 0]
+    print(json.dumps(stages))
+""")
+
+IMPORTS = "from app import create_app; from config import Config; create_app(type('C', (Config,), {'TESTING': True}))"
+
+
+def _child(database, mode):
+    result = subprocess.run([sys.executable, '-c', CHILD, database, mode], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(n):
+    """[(ms, module)] of the n slowest top-level imports under create_app, cumulative."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORTS], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    top = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # Imported by create_app itself (depth 0) or directly by the app package
+        if depth <= 1 and name.strip() != 'app':
+            top.append((int(cumulative) / 1000, name.strip()))
+    return sorted(top, reverse=True)[:n]
+
+
+def run(rounds):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    database = f'sqlite:///{path}'
+    try:
+        _child(database, 'cold')  # creates the schema
+        best = {}
+        for _ in range(rounds):
+            for mode in ('cold', 'warm'):
+                for name, (seconds, queries) in _child(database, mode).items():
+                    key = f'{mode}/{name}'
+                    if key not in best or seconds < best[key][0]:
+                        best[key] = (seconds, queries)
+    finally:
+        os.unlink(path)
+
+    print(f"{'case (best of ' + str(rounds) + ')':<28} | {'time':>10} | {'queries':>7}")
+    print('-' * 52)
+    results = {}
+    for key, (seconds, queries) in best.items():
+        results[key] = {'us': round(seconds * 1e6, 1), 'queries': queries}
+        print(f"{key:<28} | {seconds * 1000:>8.1f}ms | {queries:>7}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5, help='fresh processes per mode')
+    parser.add_argument('--imports', type=int, default=0, metavar='N', help='list the N slowest imports')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slow-down before flagging')
+    args = parser.parse_args()
+
+    results = run(args.rounds)
+    if args.imports:
+        print(f"\n{'slowest imports (cumulative)':<40} | {'time':>10}")
+        print('-' * 54)
+        for ms, module in slowest_imports(args.imports):
+            print(f"{module:<40} | {ms:>8.1f}ms")
+
+    # Only the parent imports the app (through the harness), after the fresh processes ran
+    from tests.benchmarks.harness import compare, exit_code, load_baseline, save_baseline
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nBaseline written to {args.save}")
+    if args.compare:
+        sys.exit(exit_code(compare(results, load_baseline(args.compare), args.tolerance)))
@@ -0,0 +1,112 @@
+"""
+Benchmark: scalar vs vectorized post-trip analysis.
+
+Compares, for trips of 1k / 10k / 100k points,
+  * analysis CPU: TripService._analyze_trip_points over VehicleTracking
+    objects vs fold_arrays over column arrays, and
+  * fetch: hydrating every VehicleTracking row vs TripService.get_trip_columns.
+
+Run from the project root (SECRET_KEY / DATABASE_URL must be set, as for the tests):
+    python -m tests.benchmarks.bench_trip_analysis
+    python -m tests.benchmarks.bench_trip_analysis --sizes 1000,10000
+"""
+import argparse
+import math
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.models import User, Vehicle, Campus, Trip, VehicleTracking
+from app.services.trip_service import TripService
+from app.utils.trip_analysis import fold_arrays
+from config import Config
+
+
+class BenchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+def _seed_trip(n):
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    campus = Campus(name='Bench', latitude=19.0760, longitude=72.8777)
+    db.session.add_all([user, campus])
+    db.session.flush()
+    vehicle = Vehicle(user_id=user.id, name='Bench', license_plate='BENCH-1')
+    db.session.add(vehicle)
+    db.session.flush()
+    trip = Trip(vehicle_id=vehicle.id, source_campus_id=campus.id, destination_campus_id=campus.id,
+                status='completed')
+    db.session.add(trip)
+    db.session.flush()
+
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    rows = []
+    for i in range(n):
+        step = 0.0035 if i % 40 >= 25 and i % 40 < 30 else 0.0004
+        rows.append({
+            'vehicle_id': vehicle.id, 'trip_id': trip.id,
+            'latitude': 19.0760 + i * step * math.cos(i / 500),
+            'longitude': 72.8777 + i * step * math.sin(i / 500) * 0.1,
+            'recorded_at': start + timedelta(seconds=10 * i),
+        })
+    db.session.execute(db.insert(VehicleTracking), rows)
+    db.session.commit()
+    return trip.id
+
+
+def _measure(fn):
+    """Wall time of one call, then peak traced memory of a second call."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(sizes):
+    app = create_app(BenchConfig)
+    print(f"{'points':>8} | {'stage':<8} | {'scalar':>10} | {'vectorized':>10} | {'speed-up':>8} | "
+          f"{'peak MB (s/v)':>15}")
+    print('-' * 74)
+    for n in sizes:
+        with app.app_context():
+            db.create_all()
+            trip_id = _seed_trip(n)
+
+            points, fetch_s, fetch_s_mem = _measure(
+                lambda: VehicleTracking.query.filter_by(trip_id=trip_id)
+                .order_by(VehicleTracking.recorded_at, VehicleTracking.id).all()
+            )
+            columns, fetch_v, fetch_v_mem = _measure(lambda: TripService.get_trip_columns(trip_id))
+
+            scalar, analyze_s, analyze_s_mem = _measure(lambda: TripService._analyze_trip_points(points, 75.0))
+            vectorized, analyze_v, analyze_v_mem = _measure(lambda: fold_arrays(*columns).result(75.0))
+
+            for stage, s, v, sm, vm in (
+                ('fetch', fetch_s, fetch_v, fetch_s_mem, fetch_v_mem),
+                ('analyze', analyze_s, analyze_v, analyze_s_mem, analyze_v_mem),
+            ):
+                print(f"{n:>8} | {stage:<8} | {s * 1000:>8.1f}ms | {v * 1000:>8.1f}ms | {s / v:>7.1f}x | "
+                      f"{sm / 2**20:>6.1f} / {vm / 2**20:<6.1f}")
+
+            drift = abs(vectorized['total_distance'] - scalar['total_distance']) / (scalar['total_distance'] or 1)
+            counters = ('overspeed', 'harsh_accel', 'harsh_brake')
+            print(f"{'':>8}   distance drift {drift:.3%}; events scalar "
+                  f"{[scalar[k] for k in counters]} vs vectorized {[vectorized[k] for k in counters]}")
+
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='Comma-separated trip sizes in points')
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(',')])
@@ -0,0 +1,112 @@
+"""
+Shared timing, query counting and baseline handling for the benchmarks.
+
+measure() reports the best per-call time over several rounds (timeit-style,
+with the garbage collector off while timing) and the number of SQL
+statements one call issues. Results are saved as JSON baselines and a later
+run can be compared against one: slower than the tolerance, or issuing
+more queries than before, counts as a regression.
+"""
+import gc
+import json
+import platform
+import sys
+import time
+import timeit
+from datetime import datetime
+
+import sqlalchemy
+
+from app import db
+from app.utils.query_inspector import query_inspector
+
+ROUNDS = 5
+
+
+def measure(fn, setup=None, rounds=ROUNDS):
+    """
+    (best µs per call, queries per call) for fn.
+
+    Queries are counted on the call after a warm-up call, i.e. with caches
+    in their steady state.
+
+    Without setup, each round calls fn enough times to last at least 0.2 s.
+    With setup (for calls that consume their input, e.g. closing a trip),
+    each round runs setup() untimed and then times a single call.
+    Must run inside an app context.
+    """
+    for warm_up in (True, False):
+        if setup is not None:
+            setup()
+        if warm_up:
+            fn()
+            continue
+        with query_inspector.capture(db.engine) as report:
+            fn()
+    if setup is None:
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()  # enough calls for a round of at least 0.2 s
+        best = min(timer.repeat(repeat=rounds, number=number)) / number
+    else:
+        times = []
+        for _ in range(rounds):
+            setup()
+            gc.collect()
+            gc.disable()
+            try:
+                started = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - started)
+            finally:
+                gc.enable()
+        best = min(times)
+    return best * 1e6, report.count
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+    }
+
+
+def save_baseline(path, results):
+    """Write {case: {'us': ..., 'queries': ...}} with the environment it was measured in."""
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Print each case against the baseline; returns the number of regressions."""
+    previous = baseline['results']
+    print(f"\nAgainst baseline from {baseline['environment']['created']} "
+          f"(Python {baseline['environment']['python']}, tolerance {tolerance:.0%}):")
+    regressions = 0
+    for key, result in results.items():
+        before = previous.get(key)
+        if before is None:
+            print(f"  {key:<48} new")
+            continue
+        change = result['us'] / before['us'] - 1 if before['us'] else 0.0
+        slower = change > tolerance
+        more_queries = result['queries'] > before['queries']
+        regressions += slower or more_queries
+        flags = ' '.join(flag for flag, hit in (('SLOWER', slower), ('MORE QUERIES', more_queries)) if hit)
+        print(f"  {key:<48} {change:+7.1%}  queries {before['queries']} -> {result['queries']}  {flags}".rstrip())
+    skipped = len(previous.keys() - results.keys())
+    if skipped:
+        print(f"  ({skipped} baseline cases not run)")
+    return regressions
+
+
+def exit_code(regressions):
+    if regressions:
+        print(f"\n{regressions} regression(s)", file=sys.stderr)
+    return 1 if regressions else 0
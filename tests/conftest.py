@@ -24,3 +24,56 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+@pytest.fixture
+def user(app):
+    from app.models import User
+    user = User(username='driver', email='driver@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def campuses(app):
+    from app.models import Campus
+    source = Campus(name='North', latitude=19.0760, longitude=72.8777)
+    destination = Campus(name='South', latitude=19.0330, longitude=72.8570)
+    db.session.add_all([source, destination])
+    db.session.commit()
+    return source, destination
+
+@pytest.fixture
+def vehicle(app, user):
+    from app.services.vehicle_service import VehicleService
+    return VehicleService.create_vehicle(user.id, 'Shuttle 1', 'MH01AB1234', 'EV', 50.0)
+
+@pytest.fixture
+def auth_client(client, user):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def query_budget(app):
+    """
+    Fail if the block runs more than max_queries statements, or any one
+    statement shape more than max_repeats times (a likely N+1):
+
+        with query_budget(4):
+            auth_client.get('/dashboard')
+    """
+    from contextlib import contextmanager
+    from app.utils.query_inspector import query_inspector
+
+    @contextmanager
+    def budget(max_queries, max_repeats=None):
+        with query_inspector.capture(db.engine) as report:
+            yield report
+        assert report.count <= max_queries, \
+            f"expected at most {max_queries} queries, got {report.summary()}"
+        if max_repeats is not None:
+            repeated = report.repeated(max_repeats + 1)
+            assert not repeated, f"statements repeated more than {max_repeats} times: {report.summary()}"
+
+    return budget
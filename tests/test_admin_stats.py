@@ -0,0 +1,78 @@
+import threading
+import time
+
+from app import db
+from app.models import User
+from app.services.admin_service import AdminService, admin_stats
+from app.services.auth_service import AuthService
+from app.services.trip_service import TripService
+from app.services.vehicle_service import VehicleService
+from app.utils.aggregate_cache import AggregateCache
+
+
+def test_events_update_cached_counts_without_reaggregating(app, user, vehicle, campuses):
+    assert AdminService.get_dashboard_stats()['data']['total_vehicles'] == 1
+    assert admin_stats.stats()['misses'] == 1
+
+    AuthService.register_user('second', 'second@example.com', 'secret-pass')
+    VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 60.0)
+    source, destination = campuses
+    TripService.start_trip(vehicle.id, source.id, destination.id,
+                           source.latitude, source.longitude, destination.latitude, destination.longitude)
+
+    data = AdminService.get_dashboard_stats()['data']
+    assert (data['total_users'], data['total_vehicles'], data['total_trips']) == (2, 2, 1)
+    assert admin_stats.stats()['misses'] == 1 and admin_stats.stats()['refreshes'] == 0
+
+
+def test_trip_completion_is_folded_in_and_refreshed_in_background(app, user, vehicle, campuses):
+    source, destination = campuses
+    TripService.start_trip(vehicle.id, source.id, destination.id,
+                           source.latitude, source.longitude, destination.latitude, destination.longitude)
+    AdminService.get_dashboard_stats()
+    for i in range(5):
+        TripService.update_location(vehicle.id, 19.0760 - i * 0.001, 72.8777, speed=30)
+    trip, _ = TripService.finalise_trip(vehicle.id)
+
+    served = AdminService.get_dashboard_stats()['data']
+    assert served['total_distance'] == round(float(trip.total_distance_km), 2)
+    assert served['avg_score'] == trip.driving_score
+
+    admin_stats.wait()
+    fresh = AdminService.get_dashboard_stats()['data']
+    assert admin_stats.stats()['refreshes'] == 1
+    assert fresh['top_user'] == (user.username, float(trip.driving_score))
+
+
+def test_stale_value_is_served_while_refreshing(app):
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        if len(loads) > 1:
+            release.wait(5)
+        return {'n': len(loads)}
+
+    cache = AggregateCache(loader, ttl=60)
+    cache.init_app(app)
+    assert cache.get() == {'n': 1}
+    cache.invalidate()
+
+    started = time.perf_counter()
+    assert cache.get() == {'n': 1} and cache.get() == {'n': 1}
+    assert time.perf_counter() - started < 1
+    release.set()
+    cache.wait()
+
+    assert cache.get()['n'] == 2 and len(loads) == 2
+
+
+def test_admin_page_renders_from_cache(app, client, user):
+    user.role = 'admin'
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+
+    assert client.get('/admin').status_code == 200
+    assert User.query.count() == AdminService.get_dashboard_stats()['data']['total_users']
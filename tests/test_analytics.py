@@ -0,0 +1,91 @@
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models import Trip
+from app.services.analytics_service import AnalyticsService, bucket_cache, bucket_start, next_bucket
+from app.utils import lru_cache
+
+
+@pytest.fixture
+def trips(app, vehicle, campuses):
+    """Two completed trips a day through January 2026, plus one active trip."""
+    source, destination = campuses
+    rows = [
+        Trip(vehicle_id=vehicle.id, source_campus_id=source.id, destination_campus_id=destination.id,
+             status='completed', start_time=datetime(2026, 1, 1, 8) + timedelta(days=d, hours=h),
+             total_distance_km=10, average_speed_kmph=30 + h, driving_score=80, energy_consumed_kwh=1.5)
+        for d in range(31) for h in (0, 2)
+    ]
+    rows.append(Trip(vehicle_id=vehicle.id, source_campus_id=source.id, destination_campus_id=destination.id,
+                     status='active', start_time=datetime(2026, 1, 5, 9)))
+    db.session.add_all(rows)
+    db.session.commit()
+    return vehicle.user_id
+
+
+def test_bucket_boundaries():
+    assert bucket_start(date(2026, 1, 15), 'week') == date(2026, 1, 12)
+    assert next_bucket(date(2026, 1, 1), 'month') == date(2026, 2, 1)
+    assert next_bucket(date(2026, 12, 1), 'month') == date(2027, 1, 1)
+
+
+def test_week_buckets_cover_whole_weeks(app, trips):
+    buckets = AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'week')
+
+    # 2026-01-01 is a Thursday: the first week starts on Monday 2025-12-29
+    assert [b['start'] for b in buckets][:2] == ['2025-12-29', '2026-01-05']
+    assert buckets[0]['trips'] == 8 and buckets[1]['trips'] == 14
+    assert sum(b['trips'] for b in buckets) == 62
+    assert buckets[1] == {'start': '2026-01-05', 'trips': 14, 'distance_km': 140.0,
+                          'avg_speed_kmph': 31.0, 'avg_score': 80.0, 'energy_kwh': 21.0}
+
+
+def test_closed_buckets_are_cached(app, trips):
+    AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'month')
+    assert len(bucket_cache) == 1
+
+    cached = AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'month')
+    assert bucket_cache.hits == 1 and cached[0]['trips'] == 62
+
+    trip = Trip.query.filter_by(status='active').one()
+    AnalyticsService.record_trip_completed(trips, trip)
+    assert len(bucket_cache) == 0
+
+
+def test_bucket_invalidated_while_computing_is_not_cached(app, trips, monkeypatch):
+    daily_totals = AnalyticsService._daily_totals
+    trip = Trip.query.filter_by(status='active').one()
+
+    def completes_meanwhile(*args):
+        totals = daily_totals(*args)
+        AnalyticsService.record_trip_completed(trips, trip)  # after our read, before our put
+        return totals
+
+    monkeypatch.setattr(AnalyticsService, '_daily_totals', staticmethod(completes_meanwhile))
+    AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'month')
+    assert len(bucket_cache) == 0
+
+
+def test_cached_buckets_expire(app, trips, monkeypatch):
+    monkeypatch.setattr(bucket_cache, 'ttl', 60)
+    AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'month')
+    assert len(bucket_cache) == 1
+
+    later = time.monotonic() + 61
+    monkeypatch.setattr(lru_cache, 'time', SimpleNamespace(monotonic=lambda: later))
+    AnalyticsService.get_buckets(trips, date(2026, 1, 1), date(2026, 1, 31), 'month')
+    assert bucket_cache.hits == 0
+
+
+def test_analytics_api(auth_client, trips):
+    response = auth_client.get('/api/analytics?bucket=day&from=2026-01-30&to=2026-02-02')
+
+    assert response.status_code == 200
+    assert [b['trips'] for b in response.json['data']['buckets']] == [2, 2, 0, 0]
+    assert auth_client.get('/api/analytics?bucket=hour').status_code == 400
+    assert auth_client.get('/api/analytics?from=2020-01-01&to=2026-01-01').status_code == 400
+    assert auth_client.get('/api/analytics?from=yesterday').status_code == 400
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import db
+from app.models import Trip, VehicleTracking
+from app.services.archive_service import ArchiveService
+from app.services.trip_service import TripService
+from app.utils.trip_archive import encode_track, decode_track, ArchiveFormatError
+
+
+@pytest.fixture
+def completed_trip(app, tmp_path, vehicle, campuses):
+    app.config['TRIP_ARCHIVE_DIR'] = str(tmp_path)
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    for i in range(20):
+        TripService.update_location(vehicle.id, 19.0760 - i * 0.0007, 72.8777 + i * 0.0002,
+                                    speed=30 + i, recorded_at=start + timedelta(seconds=10 * i))
+    trip, _ = TripService.finalise_trip(vehicle.id)
+    trip.end_time = datetime.utcnow() - timedelta(days=40)
+    db.session.commit()
+    return trip.id
+
+
+def test_codec_round_trips_exactly():
+    lats = np.round(19.07 + np.cumsum(np.full(100, 1.3e-4)), 8)
+    lngs = np.round(72.87 - np.cumsum(np.full(100, 2.1e-4)), 8)
+    speeds = np.round(np.linspace(0, 80, 100), 2)
+    times = 1767254400_000000 + np.arange(100, dtype=np.int64) * 10_000_000
+
+    blob = encode_track(lats, lngs, speeds, times)
+    track = decode_track(blob)
+
+    assert np.array_equal(track.lats, lats) and np.array_equal(track.lngs, lngs)
+    assert np.array_equal(track.speeds, speeds) and np.array_equal(track.times_us, times)
+    assert len(blob) < 100 * 8
+    with pytest.raises(ArchiveFormatError):
+        decode_track(blob[:-4])
+
+
+def test_archive_moves_points_and_reads_back(app, runner, completed_trip):
+    before = TripService.get_trip_columns(completed_trip)
+
+    result = runner.invoke(args=['archive-trips', '--older-than-days', '30'])
+
+    assert 'Archived 1 trips: 20 rows moved' in result.output
+    assert VehicleTracking.query.filter_by(trip_id=completed_trip).count() == 0
+    trip = Trip.query.get(completed_trip)
+    assert trip.archived_at is not None
+
+    after = TripService.get_trip_columns(completed_trip)
+    for expected, actual in zip(before, after):
+        assert np.array_equal(expected, actual)
+    assert TripService.recompute_trip_stats(trip).distance_km == pytest.approx(float(trip.running_distance_km))
+
+
+def test_archive_is_idempotent_and_resumable(app, completed_trip):
+    # An interrupted run left a file behind but never committed the delete
+    ArchiveService._write_atomic(ArchiveService.archive_path(completed_trip), b'partial')
+
+    first = ArchiveService.archive_completed_trips(30)
+    second = ArchiveService.archive_completed_trips(30)
+
+    assert first['rows_moved'] == 20 and first['bytes_saved'] > 0
+    assert second == {'trips': 0, 'rows_moved': 0, 'archive_bytes': 0,
+                      'hot_bytes_estimate': 0, 'bytes_saved': 0}
+    assert len(ArchiveService.load_points(completed_trip)) == 20
+
+
+def test_route_of_archived_trip_is_rebuilt_from_archive(app, auth_client, completed_trip):
+    from app.models import TripRoute
+
+    ArchiveService.archive_completed_trips(30)
+    TripRoute.query.filter_by(trip_id=completed_trip).delete()
+    db.session.commit()
+
+    response = auth_client.get(f'/api/trips/{completed_trip}/route?zoom=17')
+
+    assert response.status_code == 200
+    assert response.json['data']['source_points'] == 20
@@ -0,0 +1,52 @@
+from app import db
+from app.models import BatteryStatus, Trip, Vehicle
+from app.utils.query_inspector import query_inspector
+
+
+def _add_fleet(user, campuses, size, offset=0):
+    source, destination = campuses
+    for i in range(offset, offset + size):
+        vehicle = Vehicle(user_id=user.id, name=f'Shuttle {i}', license_plate=f'MH01ZZ{i:04d}',
+                          battery_capacity_kwh=50.0)
+        db.session.add(vehicle)
+        db.session.flush()
+        db.session.add(BatteryStatus(vehicle_id=vehicle.id, current_percentage=80))
+        # A few completed trips each, and every other vehicle on an active trip
+        for status in ['completed'] * 3 + (['active'] if i % 2 else []):
+            db.session.add(Trip(vehicle_id=vehicle.id, source_campus_id=source.id,
+                                destination_campus_id=destination.id, status=status))
+    db.session.commit()
+
+
+def _dashboard_queries(client):
+    with query_inspector.capture(db.engine) as report:
+        response = client.get('/dashboard')
+    assert response.status_code == 200
+    return report.count, response.get_data(as_text=True)
+
+
+def test_dashboard_query_count_is_independent_of_fleet_size(auth_client, user, campuses):
+    _add_fleet(user, campuses, 2)
+    auth_client.get('/dashboard')  # warm the identity cache
+    small, _ = _dashboard_queries(auth_client)
+
+    _add_fleet(user, campuses, 40, offset=2)
+    large, html = _dashboard_queries(auth_client)
+
+    assert large == small
+    assert html.count('Track Live') == 21
+
+
+def test_dashboard_cards_carry_battery_and_active_trip(app, vehicle, campuses):
+    from app.services.vehicle_service import VehicleService
+
+    source, destination = campuses
+    trip = Trip(vehicle_id=vehicle.id, source_campus_id=source.id,
+                destination_campus_id=destination.id, status='active')
+    db.session.add(trip)
+    db.session.commit()
+
+    [card] = VehicleService.get_dashboard_vehicles(vehicle.user_id)
+
+    assert card['active_trip_id'] == trip.id
+    assert card['battery_pct'] == 100.0
@@ -0,0 +1,207 @@
+import calendar
+
+import pytest
+
+from app import db
+from app.models import DeviceTokenRevocation, Trip
+from app.services.device_token_service import DeviceTokenService, device_limiter, revocations
+from app.services.trip_service import TripService
+from app.services.vehicle_service import VehicleService
+from app.utils.query_inspector import query_inspector
+from app.utils.token_bucket import TokenBucketLimiter
+
+FIX = {'lat': 19.0760, 'lng': 72.8777}
+
+
+def _bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def token(app, vehicle):
+    return DeviceTokenService.issue(vehicle.id)[0]
+
+
+def test_owner_issues_a_token_that_authenticates_the_vehicle(auth_client, client, vehicle):
+    response = auth_client.post(f'/api/vehicles/{vehicle.id}/tokens')
+    assert response.status_code == 201
+    token = response.get_json()['data']['token']
+
+    device = client.application.test_client()  # no session cookie
+    response = device.post('/api/update_location', json=FIX, headers=_bearer(token))
+    assert response.status_code == 200
+    assert 'battery' in response.get_json()['data']
+
+
+def test_token_calls_skip_the_users_and_vehicle_lookups(app, client, token, vehicle):
+    payload = {**FIX, 'vehicle_id': vehicle.id}
+    client.post('/api/update_location', json=payload, headers=_bearer(token))
+    with query_inspector.capture(db.engine) as report:
+        response = client.post('/api/update_location', json=payload, headers=_bearer(token))
+    assert response.status_code == 200
+    assert not [shape for shape, _ in report.statements
+                if shape.startswith('SELECT') and ('FROM users' in shape or 'FROM vehicles' in shape)]
+
+
+def test_bad_tokens_are_rejected(client, token, vehicle, user):
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(token[:-2] + 'xx')).status_code == 401
+    assert client.post('/api/update_location', json=FIX, headers={'Authorization': 'Bearer'}).status_code == 401
+
+    other = VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 50.0)
+    response = client.post('/api/update_location', json={**FIX, 'vehicle_id': other.id}, headers=_bearer(token))
+    assert response.status_code == 403
+
+
+def test_other_authorization_schemes_fall_back_to_the_session(auth_client, vehicle):
+    basic = {'Authorization': 'Basic YWRtaW46c2VjcmV0'}  # e.g. added by a proxy in front of the app
+    response = auth_client.post('/api/update_location', json={**FIX, 'vehicle_id': vehicle.id}, headers=basic)
+    assert response.status_code == 200
+
+
+def test_verify_needs_no_database_round_trip(app, token):
+    revocations.get()  # deny-list loaded, as after the first token call
+    with query_inspector.capture(db.engine) as report:
+        assert DeviceTokenService.verify(token) is not None
+    assert report.count == 0
+
+
+def test_token_of_a_vehicle_that_changed_hands_is_refused(client, token, vehicle):
+    from app.models import User
+    from app.services.vehicle_state import vehicle_state
+
+    buyer = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(buyer)
+    db.session.flush()
+    vehicle.user_id = buyer.id
+    db.session.commit()
+    vehicle_state.invalidate(vehicle.id)
+
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(token)).status_code == 403
+
+
+def test_revoking_one_token_or_all(auth_client, client, vehicle):
+    first, first_id = DeviceTokenService.issue(vehicle.id)
+    second, _ = DeviceTokenService.issue(vehicle.id)
+
+    auth_client.post(f'/api/vehicles/{vehicle.id}/tokens/revoke', json={'token_id': first_id})
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(first)).status_code == 401
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(second)).status_code == 200
+
+    auth_client.post(f'/api/vehicles/{vehicle.id}/tokens/revoke', json={})
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(second)).status_code == 401
+    fresh, _ = DeviceTokenService.issue(vehicle.id)
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(fresh)).status_code == 200
+
+
+def test_revoking_a_token_twice_succeeds(auth_client, client, token, vehicle):
+    token_id = DeviceTokenService.verify(token).token_id
+    for _ in range(2):
+        response = auth_client.post(f'/api/vehicles/{vehicle.id}/tokens/revoke', json={'token_id': token_id})
+        assert response.status_code == 200
+    assert DeviceTokenRevocation.query.filter_by(vehicle_id=vehicle.id).count() == 1
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(token)).status_code == 401
+
+
+@pytest.mark.parametrize('token_id', [123, '', 'x' * 33, ['abc']])
+def test_revoke_rejects_malformed_token_ids(auth_client, vehicle, token_id):
+    response = auth_client.post(f'/api/vehicles/{vehicle.id}/tokens/revoke', json={'token_id': token_id})
+    assert response.status_code == 400
+    assert DeviceTokenRevocation.query.count() == 0
+
+
+def test_token_ids_are_revoked_per_vehicle(app, token, vehicle, user):
+    other = VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 50.0)
+    identity = DeviceTokenService.verify(token)
+    # Token ids are random per token; give the other vehicle's token the same one
+    twin = DeviceTokenService._serializer.dumps([other.id, user.id, identity.token_id, identity.issued_at])
+
+    DeviceTokenService.revoke(vehicle.id, identity.token_id)
+    DeviceTokenService.revoke(other.id, identity.token_id)  # no clash with the first entry
+    revocations.invalidate()
+    revocations.get()
+    revocations.wait()
+
+    assert DeviceTokenService.verify(token) is None and DeviceTokenService.verify(twin) is None
+    db.session.query(DeviceTokenRevocation).filter_by(vehicle_id=other.id).delete()
+    db.session.commit()
+    revocations.invalidate()
+    revocations.get()
+    revocations.wait()
+    assert DeviceTokenService.verify(token) is None and DeviceTokenService.verify(twin) is not None
+
+
+def test_revoke_all_is_compared_at_millisecond_precision(app, vehicle, user):
+    DeviceTokenService.revoke(vehicle.id)
+    revoked_at = db.session.query(DeviceTokenRevocation.revoked_at).scalar()
+    revoked_ms = calendar.timegm(revoked_at.utctimetuple()) * 1000 + revoked_at.microsecond // 1000
+
+    def issued_at(ms):
+        return DeviceTokenService._serializer.dumps([vehicle.id, user.id, 'abc', ms])
+
+    assert DeviceTokenService.verify(issued_at(revoked_ms - 1)) is None
+    # Issued in the revoking millisecond (or second): a re-issued token works at once
+    assert DeviceTokenService.verify(issued_at(revoked_ms)) is not None
+    token, _ = DeviceTokenService.issue(vehicle.id)
+    assert DeviceTokenService.verify(token) is not None
+
+
+def test_revocations_from_other_processes_apply_on_refresh(app, token, vehicle):
+    assert DeviceTokenService.verify(token) is not None
+    identity = DeviceTokenService.verify(token)
+    db.session.add(DeviceTokenRevocation(vehicle_id=vehicle.id, token_id=identity.token_id))
+    db.session.commit()
+
+    assert DeviceTokenService.verify(token) is not None  # cached deny-list, within the TTL
+    revocations.invalidate()
+    revocations.get()
+    revocations.wait()
+    assert DeviceTokenService.verify(token) is None
+
+
+def test_token_ends_the_trip(client, token, vehicle, campuses):
+    source, destination = campuses
+    TripService.start_trip(vehicle.id, source.id, destination.id, source.latitude, source.longitude,
+                           destination.latitude, destination.longitude)
+    client.post('/api/update_location', json=FIX, headers=_bearer(token))
+
+    response = client.post('/api/trip/end', json={}, headers=_bearer(token))
+    assert response.status_code == 200
+    assert Trip.query.filter_by(vehicle_id=vehicle.id).one().status == 'completed'
+
+
+def test_per_vehicle_bucket_replaces_the_per_ip_limit(app, client, token, user):
+    # More calls than the route's per-IP "60 per minute", all from one address
+    device_limiter.init_app(app, rate=1.0, burst=70)
+    statuses = {client.post('/api/update_location', json=FIX, headers=_bearer(token)).status_code
+                for _ in range(65)}
+    assert statuses == {200}
+
+    device_limiter.init_app(app, rate=0.01, burst=1)
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(token)).status_code == 200
+    response = client.post('/api/update_location', json=FIX, headers=_bearer(token))
+    assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+
+    # Another vehicle behind the same address has its own bucket
+    other = VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 50.0)
+    other_token, _ = DeviceTokenService.issue(other.id)
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(other_token)).status_code == 200
+
+
+def test_session_calls_still_need_csrf(app, auth_client, client, token, vehicle):
+    app.config['WTF_CSRF_ENABLED'] = True
+    response = auth_client.post('/api/update_location', json={**FIX, 'vehicle_id': vehicle.id})
+    assert response.status_code == 400
+    assert client.post('/api/update_location', json=FIX, headers=_bearer(token)).status_code == 200
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.utils.token_bucket.time.monotonic', lambda: now[0])
+    bucket = TokenBucketLimiter(rate=2.0, burst=2)
+
+    assert bucket.consume('v1') == (True, 0.0)
+    assert bucket.consume('v1') == (True, 0.0)
+    assert bucket.consume('v1') == (False, 0.5)
+    now[0] += 0.5
+    assert bucket.consume('v1')[0]
+    assert (bucket.allowed, bucket.limited) == (3, 1)
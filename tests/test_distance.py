@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.distance import (
+    HAVERSINE_MAX_RELATIVE_ERROR, distance_km, geodesic_km, haversine_km,
+    haversine_km_array, path_distances_km,
+)
+
+
+@pytest.mark.parametrize("lat", [-60.0, 0.0, 19.0760, 45.0, 69.0])
+@pytest.mark.parametrize("heading", [0, 45, 90, 135])
+def test_haversine_within_published_bound(lat, heading):
+    lng = 72.8777
+    for km in (0.05, 1.0, 50.0):
+        lat2 = lat + km / 111 * math.cos(math.radians(heading))
+        lng2 = lng + km / (111 * math.cos(math.radians(lat))) * math.sin(math.radians(heading))
+        precise = geodesic_km(lat, lng, lat2, lng2)
+        assert abs(haversine_km(lat, lng, lat2, lng2) - precise) <= precise * HAVERSINE_MAX_RELATIVE_ERROR
+
+
+def test_precise_mode_uses_geodesic():
+    args = (19.0760, 72.8777, 19.0330, 72.8570)
+    assert distance_km(*args, precise=True) == geodesic_km(*args)
+    assert distance_km(*args) == haversine_km(*args)
+
+
+def test_array_kernels_match_scalar():
+    lats = np.array([19.0760, 19.0700, 19.0600, 19.0600])
+    lngs = np.array([72.8777, 72.8800, 72.8900, 72.8900])
+    segments = path_distances_km(lats, lngs)
+
+    assert segments.shape == (3,)
+    for i, segment in enumerate(segments):
+        assert segment == pytest.approx(haversine_km(lats[i], lngs[i], lats[i + 1], lngs[i + 1]), rel=1e-12)
+    assert segments[-1] == 0
+
+    # One-to-many through broadcasting
+    many = haversine_km_array(19.0760, 72.8777, lats, lngs)
+    assert many[0] == 0 and many[2] == pytest.approx(haversine_km(19.0760, 72.8777, lats[2], lngs[2]))
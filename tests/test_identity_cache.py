@@ -0,0 +1,105 @@
+from app import db, load_user
+from app.models import User
+from app.services.identity_cache import CachedUser, identity_cache
+from app.utils.lru_cache import LRUCache
+from app.utils.query_inspector import query_inspector
+
+
+def _users_queries(report):
+    return [shape for shape, _ in report.statements if 'FROM users' in shape]
+
+
+def test_load_user_reads_the_users_table_once(auth_client, user):
+    response = auth_client.get('/dashboard')
+    assert response.status_code == 200
+    assert identity_cache.stats()['size'] == 1
+
+    with query_inspector.capture(db.engine) as report:
+        loaded = load_user(str(user.id))
+    assert loaded.id == user.id
+    assert _users_queries(report) == []
+    assert identity_cache.hits == 1
+
+
+def test_cached_identity_carries_request_fields(app, user):
+    cached = identity_cache.get(user.id)
+
+    assert isinstance(cached, CachedUser)
+    assert (cached.id, cached.username, cached.email, cached.role) == (user.id, 'driver', 'driver@example.com', 'user')
+    assert cached.is_authenticated and cached.get_id() == str(user.id)
+    assert identity_cache.get(user.id) is cached
+
+
+def test_orm_update_and_delete_invalidate(app, user):
+    identity_cache.get(user.id)
+    user.role = 'admin'
+    db.session.commit()
+    assert identity_cache.get(user.id).role == 'admin'
+
+    db.session.delete(user)
+    db.session.commit()
+    assert identity_cache.get(user.id) is None
+
+
+def test_identity_invalidated_while_loading_is_not_cached(app, user, monkeypatch):
+    def invalidated_while_loading(*row):
+        identity_cache.invalidate(row[0])
+        return CachedUser(*row)
+
+    monkeypatch.setattr('app.services.identity_cache.CachedUser', invalidated_while_loading)
+    assert identity_cache.get(user.id).id == user.id
+    assert user.id not in identity_cache._entries
+
+
+def test_change_is_invalidated_again_on_commit(app, user):
+    user.role = 'admin'
+    db.session.flush()
+    # A concurrent miss between flush and commit still reads the committed 'user' row
+    identity_cache._entries.put(user.id, CachedUser(user.id, user.username, user.email, 'user', user.created_at))
+    db.session.commit()
+
+    assert identity_cache.get(user.id).role == 'admin'
+
+
+def test_logout_invalidates(auth_client, user):
+    auth_client.get('/dashboard')
+    assert user.id in identity_cache._entries
+
+    auth_client.get('/logout')
+    assert user.id not in identity_cache._entries
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.utils.lru_cache.time.monotonic', lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=30)
+    cache.put('a', 1)
+
+    now[0] += 29
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None and len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changes_outside_the_orm_apply_within_the_ttl(app, user, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.utils.lru_cache.time.monotonic', lambda: now[0])
+    identity_cache.get(user.id)
+    db.session.execute(db.update(User).where(User.id == user.id).values(role='admin'))
+    db.session.commit()
+
+    assert identity_cache.get(user.id).role == 'user'
+    now[0] += app.config['IDENTITY_CACHE_TTL']
+    assert identity_cache.get(user.id).role == 'admin'
+
+
+def test_hit_rate_is_exposed(client, user):
+    identity_cache.get(user.id)
+    identity_cache.get(user.id)
+
+    stats = client.get('/internal/identity').get_json()['data']
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'identity_cache_hits_total 1' in body
+    assert 'identity_cache_misses_total 1' in body
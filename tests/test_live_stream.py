@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+from app.services.live_feed import broker, trip_topic, fleet_topic
+from app.services.trip_service import TripService
+from app.utils.broker import Broker, BrokerFull
+
+
+def test_broker_fans_out_by_topic():
+    hub = Broker()
+    trip_sub = hub.subscribe('trip:1')
+    fleet_sub = hub.subscribe('fleet')
+
+    assert hub.publish('trip:1', 'position', {'lat': 1}) == 1
+    assert trip_sub.get(timeout=0)[1:] == ('position', {'lat': 1})
+    assert fleet_sub.get(timeout=0) is None
+
+
+def test_broker_drops_slow_consumer():
+    hub = Broker(queue_size=2)
+    slow = hub.subscribe('fleet')
+    fast = hub.subscribe('fleet')
+
+    for i in range(3):
+        hub.publish('fleet', 'position', i)
+        fast.get(timeout=0)
+
+    assert slow.dropped and slow not in hub
+    assert not fast.dropped and fast in hub
+    assert hub.dropped == 1
+
+
+def test_broker_caps_subscribers():
+    hub = Broker(max_subscribers=1)
+    first = hub.subscribe('fleet')
+    with pytest.raises(BrokerFull):
+        hub.subscribe('fleet')
+
+    first.close()
+    assert len(hub) == 0
+    hub.subscribe('fleet').close()
+
+
+def test_update_location_publishes_after_commit(app, user, vehicle, campuses):
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    trip_sub = broker.subscribe(trip_topic(trip.id))
+    owner_sub = broker.subscribe(fleet_topic(user.id))
+
+    TripService.update_location(vehicle.id, 19.0760, 72.8777)
+    TripService.update_location(vehicle.id, 19.0700, 72.8777)
+
+    _, event, data = trip_sub.get(timeout=0)
+    assert event == 'position' and data['path'] == [[19.076, 72.8777]]
+    _, event, data = trip_sub.get(timeout=0)
+    assert data['lat'] == 19.07 and data['battery'] < 100
+    assert owner_sub.get(timeout=0)[2]['trip_id'] == trip.id
+
+    TripService.finalise_trip(vehicle.id)
+    assert trip_sub.get(timeout=0)[1] == 'trip_ended'
+
+
+def test_trip_stream_endpoint(app, auth_client, vehicle, campuses):
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    trip_id = trip.id
+    app.config['LIVE_STREAM_HEARTBEAT'] = 0.01
+    app.config['LIVE_STREAM_MAX_DURATION'] = 0.05
+
+    response = auth_client.get(f'/api/stream/trip/{trip_id}')
+    assert response.mimetype == 'text/event-stream'
+    assert len(broker) == 1
+
+    broker.publish(trip_topic(trip_id), 'position', {'lat': 19.0})
+    body = response.get_data(as_text=True)
+
+    assert body.startswith('retry: 3000')
+    assert f"event: position\ndata: {json.dumps({'lat': 19.0})}" in body
+    assert len(broker) == 0
+
+
+def test_stream_rejects_other_users_trip(app, client, vehicle, campuses):
+    from app import db
+    from app.models import User
+
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    other = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(other.id)
+
+    assert client.get(f'/api/stream/trip/{trip.id}').status_code == 403
+
+
+def test_disabled_streams_are_refused(app, auth_client, monkeypatch):
+    monkeypatch.setattr(broker, 'max_subscribers', 0)
+
+    response = auth_client.get('/api/stream/fleet')
+
+    assert response.status_code == 503 and 'Retry-After' not in response.headers
+    assert len(broker) == 0
+
+
+def test_trip_position_is_polled_without_streams(app, auth_client, client, vehicle, campuses):
+    from flask import g
+    from app import db
+    from app.models import User
+
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    TripService.update_location(vehicle.id, 19.0700, 72.8777)
+
+    data = auth_client.get(f'/api/trips/{trip.id}/position').get_json()['data']
+    assert data['status'] == 'active'
+    assert (data['position']['lat'], data['position']['trip_id']) == (19.07, trip.id)
+
+    TripService.finalise_trip(vehicle.id)
+    assert auth_client.get(f'/api/trips/{trip.id}/position').get_json()['data']['status'] == 'completed'
+
+    admin = User(username='admin', email='admin@example.com', password_hash='x', role='admin')
+    other = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add_all([admin, other])
+    db.session.commit()
+    for user, status in ((admin, 200), (other, 403)):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+        g.pop('_login_user', None)  # the test app context outlives each request
+        assert client.get(f'/api/trips/{trip.id}/position').status_code == status
@@ -0,0 +1,44 @@
+import json
+
+from app import db, limiter
+from app.models import Trip
+from app.utils.loadgen import LoadGenerator, percentiles
+
+
+def test_percentiles_summarise_latencies():
+    summary = percentiles([float(ms) for ms in range(1, 101)])
+    assert summary['count'] == 100
+    assert summary['p50_ms'] == 50.5 and summary['max_ms'] == 100.0
+    assert percentiles([]) == {'count': 0}
+
+
+def test_loadgen_drives_trips_through_the_ingest_path(app):
+    report = LoadGenerator(vehicles=3, duration=0.3, rate=20, workers=1).run()
+
+    assert report['status_codes'] == {'200': report['requests']}
+    assert report['fixes_accepted'] == report['requests'] > 0
+    assert report['latency']['start_trip']['count'] == report['latency']['end_trip']['count'] == 3
+    assert report['db_growth']['trips'] == 3
+    assert report['db_growth']['tracking_points'] == report['fixes_accepted']
+    assert {t.status for t in Trip.query.all()} == {'completed'}
+    # Rate limiting and CSRF are restored after the run
+    assert limiter.enabled and app.config['WTF_CSRF_ENABLED'] is False
+
+
+def test_loadgen_batches_fixes(app):
+    report = LoadGenerator(vehicles=2, duration=0.3, rate=20, batch=3, workers=1).run()
+
+    assert report['latency']['update_location_batch']['count'] == report['requests'] > 0
+    assert report['fixes_accepted'] == 3 * report['requests']
+    assert db.session.query(Trip).count() == 2
+
+
+def test_loadgen_command_writes_json(runner, tmp_path):
+    output = tmp_path / 'report.json'
+    result = runner.invoke(args=['loadgen', '--vehicles', '2', '--duration', '0.2', '--rate', '10',
+                                 '--workers', '1', '--output', str(output)])
+
+    assert result.exit_code == 0, result.output
+    assert 'fixes/s' in result.output
+    report = json.loads(output.read_text())
+    assert report['config']['vehicles'] == 2 and report['database'] == 'sqlite'
@@ -0,0 +1,45 @@
+from app.metrics import http_requests, points_ingested, registry, trips_started
+from app.services.trip_service import TripService
+from app.utils.prometheus import Counter, Histogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.register(Histogram('latency_seconds', 'Latency.', ('endpoint',), buckets=(0.1, 1)))
+    requests = registry.register(Counter('requests_total', 'Requests.', ('path',)))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, 'a')
+    requests.inc('say "hi"')
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{endpoint="a",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{endpoint="a",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{endpoint="a"} 3.65' in text
+    assert 'latency_seconds_count{endpoint="a"} 4' in text
+    assert 'requests_total{path="say \\"hi\\""} 1' in text
+    assert '# TYPE latency_seconds histogram' in text
+
+
+def test_requests_and_domain_events_are_counted(auth_client, vehicle, campuses):
+    source, destination = campuses
+    TripService.start_trip(vehicle.id, source.id, destination.id,
+                           source.latitude, source.longitude, destination.latitude, destination.longitude)
+    auth_client.get('/health')
+    auth_client.post('/api/update_location', json={'vehicle_id': vehicle.id, 'lat': 19.07, 'lng': 72.87})
+
+    assert http_requests.value('health_check', 'GET', 200) == 1
+    assert http_requests.value('tracking.update_location', 'POST', 200) == 1
+    assert trips_started.value() == 1 and points_ingested.value() == 1
+
+    text = auth_client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_db_queries_bucket{endpoint="tracking.update_location",le="+Inf"} 1' in text
+    assert 'http_requests_in_flight 1' in text  # the scrape itself
+    assert 'ev_points_ingested_total 1' in text
+
+
+def test_metrics_are_restricted_to_internal_addresses(client):
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 404
+    assert client.get('/metrics').mimetype == 'text/plain'
+    assert registry.get('db_queries_total') is not None
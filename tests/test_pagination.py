@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Trip, VehicleTracking
+
+
+@pytest.fixture
+def history(app, vehicle, campuses):
+    """25 completed trips, several sharing a start_time, and 30 points on the newest."""
+    source, destination = campuses
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    trips = [
+        Trip(vehicle_id=vehicle.id, source_campus_id=source.id, destination_campus_id=destination.id,
+             status='completed', start_time=start + timedelta(hours=i // 3), total_distance_km=i)
+        for i in range(25)
+    ]
+    db.session.add_all(trips)
+    db.session.flush()
+    db.session.execute(db.insert(VehicleTracking), [
+        {'vehicle_id': vehicle.id, 'trip_id': trips[-1].id, 'latitude': 19.0 + i * 0.001,
+         'longitude': 72.8, 'recorded_at': start + timedelta(seconds=i)}
+        for i in range(30)
+    ])
+    db.session.commit()
+    return vehicle.id, [t.id for t in trips]
+
+
+def _walk(client, url):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        page = response.json['data']
+        ids.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_trip_history_pages_cover_every_trip_once(auth_client, history):
+    vehicle_id, trip_ids = history
+
+    ids = _walk(auth_client, f'/api/vehicles/{vehicle_id}/trips?limit=4')
+
+    # Newest first, ties on start_time broken by id
+    assert ids == sorted(trip_ids, key=lambda i: (trip_ids.index(i) // 3, i), reverse=True)
+
+
+def test_user_trips_oldest_first(auth_client, history):
+    _, trip_ids = history
+    assert _walk(auth_client, '/api/trips?order=oldest&limit=7') == trip_ids
+
+
+def test_points_page_and_ndjson_stream(auth_client, history):
+    _, trip_ids = history
+    url = f'/api/trips/{trip_ids[-1]}/points'
+
+    first = auth_client.get(url + '?limit=20').json['data']
+    rest = auth_client.get(url + f"?limit=20&cursor={first['next_cursor']}").json['data']
+    assert len(first['items']) == 20 and len(rest['items']) == 10 and rest['next_cursor'] is None
+
+    response = auth_client.get(url + '?format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines == first['items'] + rest['items']
+
+
+def test_rejects_tampered_cursor_and_caps_page_size(auth_client, history):
+    vehicle_id, _ = history
+
+    assert auth_client.get(f'/api/vehicles/{vehicle_id}/trips?cursor=abc').status_code == 400
+    page = auth_client.get(f'/api/vehicles/{vehicle_id}/trips?limit=100000').json['data']
+    assert len(page['items']) == 25
+
+
+def test_history_pages_render_without_rows(auth_client, history):
+    vehicle_id, _ = history
+    assert auth_client.get(f'/trips/{vehicle_id}').status_code == 200
+    assert auth_client.get('/analytics').status_code == 200
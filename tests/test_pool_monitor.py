@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import create_app, db
+from app.utils.pool_monitor import InstrumentedQueuePool, pool_monitor
+from tests.conftest import TestConfig
+
+
+def test_engine_events_count_checkouts(app):
+    pool_monitor.reset()
+    for _ in range(3):
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+    stats = pool_monitor.stats()
+    assert stats['checkouts'] == 3 and stats['checkins'] == 3
+    assert stats['in_use'] == 0 and stats['max_in_use'] == 1
+
+
+def test_instrumented_pool_records_overflow_and_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=1, pool_timeout=0.05)
+    pool_monitor.attach(engine)
+
+    first, second = engine.connect(), engine.connect()
+    assert pool_monitor.stats()['overflow_checkouts'] == 1
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    # Reusing the pooled connection while the overflow one is open is not an overflow checkout
+    first.close()
+    first = engine.connect()
+    assert pool_monitor.stats()['overflow_checkouts'] == 1
+    first.close()
+    second.close()
+
+    stats = pool_monitor.stats()
+    assert stats['size'] == 1 and stats['capacity'] == 2
+    assert stats['timeouts'] == 1 and stats['max_in_use'] == 2 and stats['in_use'] == 0
+    assert stats['max_wait_ms'] >= 0
+    engine.dispose()
+
+
+def test_pool_settings_applied_to_server_databases():
+    class MySQLConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = 'mysql+mysqlconnector://u:p@localhost/db'
+        DB_POOL_SIZE = 7
+
+    try:
+        app = create_app(MySQLConfig)
+    except ImportError:
+        pytest.skip('MySQL driver not installed')
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool) and db.engine.pool.size() == 7
+    assert 'poolclass' not in create_app(TestConfig).config['SQLALCHEMY_ENGINE_OPTIONS']
+
+
+def test_internal_pool_endpoint(client):
+    response = client.get('/internal/pool')
+    assert response.status_code == 200
+    assert {'in_use', 'checkouts', 'timeouts', 'avg_wait_ms'} <= set(response.json['data'])
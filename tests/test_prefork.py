@@ -0,0 +1,118 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from app.utils.limiter_storage import SQLiteStorage
+from app.utils.prefork import Worker
+from config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Two workers answering with their pid, each recycled after three requests
+SERVER = textwrap.dedent("""
+    import os, sys
+    from app.utils.prefork import PreforkServer, Worker, bind_socket
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [str(os.getpid()).encode()]
+
+    sock = bind_socket('127.0.0.1', 0)
+    print(sock.getsockname()[1], flush=True)
+    PreforkServer(lambda slot: Worker(app, sock, threads=2, max_requests=3, graceful_timeout=2).serve(),
+                  workers=2, graceful_timeout=2).run()
+""")
+
+
+def _fetch(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=5) as response:
+        return int(response.read())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_workers_share_the_port_and_are_recycled():
+    server = subprocess.Popen([sys.executable, '-c', SERVER], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        pids = set()
+        deadline = time.monotonic() + 20
+        while len(pids) < 3 and time.monotonic() < deadline:
+            try:
+                pids.add(_fetch(port))
+            except OSError:
+                time.sleep(0.05)  # between a recycled worker leaving and its replacement booting
+        # More pids than worker slots: recycled workers were replaced
+        assert len(pids) >= 3 and server.pid not in pids
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+        server.stdout.close()
+
+
+def test_worker_counts_requests_until_the_response_is_closed():
+    def app(environ, start_response):
+        start_response('200 OK', [])
+        return iter([b'event'])
+
+    worker = Worker(app, sock=None, max_requests=2)
+    first = worker(None, lambda *a: None)
+    assert (worker.served, worker.in_flight) == (1, 1) and not worker._stopping.is_set()
+    first.close()
+    worker(None, lambda *a: None).close()
+    assert (worker.served, worker.in_flight) == (2, 0)
+    assert worker._stopping.is_set()  # recycling after max_requests
+
+
+def test_sqlite_limiter_storage_is_shared(tmp_path):
+    uri = f'sqlite:///{tmp_path}/ratelimit.db'
+    one, other = storage_from_string(uri), storage_from_string(uri)  # e.g. two workers
+    assert isinstance(one, SQLiteStorage)
+    limit = RateLimitItemPerMinute(3)
+
+    assert all(FixedWindowRateLimiter(storage).hit(limit, 'ip') for storage in (one, other, one))
+    assert not FixedWindowRateLimiter(other).hit(limit, 'ip')
+    assert other.get(limit.key_for('ip')) == 4  # refused hits count too, as with memory://
+    assert one.get_expiry(limit.key_for('ip')) > time.time()
+
+    one.clear(limit.key_for('ip'))
+    assert FixedWindowRateLimiter(other).hit(limit, 'ip')
+
+
+def test_expired_windows_start_again(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.utils.limiter_storage.time.time', lambda: now[0])
+    storage = storage_from_string(f'sqlite:///{tmp_path}/ratelimit.db')
+
+    assert storage.incr('k', 60) == 1 and storage.incr('k', 60, amount=2) == 3
+    now[0] += 60
+    assert storage.get('k') == 0
+    assert storage.incr('k', 60) == 1
+
+
+def test_worker_config_turns_off_or_bounds_per_process_state():
+    from wsgi import worker_config
+
+    class Base(Config):
+        RATELIMIT_STORAGE_URI = 'memory://'
+        LIVE_STREAM_MAX_SUBSCRIBERS = 16
+        DEVICE_RATE_PER_SECOND, DEVICE_RATE_BURST = 2.0, 20
+        ANALYTICS_CACHE_TTL = 0
+
+    config = worker_config(Base, 8080, workers=4)
+
+    assert config.RATELIMIT_STORAGE_URI.startswith('sqlite:///')
+    assert config.VEHICLE_STATE_CACHE_SIZE == 0 and config.LIVE_STREAM_MAX_SUBSCRIBERS == 0
+    # Four workers together allow the configured per-vehicle rate, not four times it
+    assert (config.DEVICE_RATE_PER_SECOND, config.DEVICE_RATE_BURST) == (0.5, 5)
+    # A cache that would never expire is turned off; the others keep their TTL
+    assert config.ANALYTICS_CACHE_SIZE == 0
+    assert config.IDENTITY_CACHE_SIZE == Base.IDENTITY_CACHE_SIZE
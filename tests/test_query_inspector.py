@@ -0,0 +1,142 @@
+import logging
+
+import pytest
+
+from app import create_app, db
+from app.models import Vehicle
+from app.services.vehicle_service import VehicleService
+from app.utils.query_inspector import query_inspector, statement_shape
+from tests.conftest import TestConfig
+
+
+def _add_vehicles(user, count):
+    for i in range(count):
+        VehicleService.create_vehicle(user.id, f'Shuttle {i}', f'MH02CD{i:04d}', 'EV', 50.0)
+    db.session.expunge_all()
+
+
+def test_statement_shape_collapses_literals_and_in_lists():
+    a = statement_shape("SELECT * FROM trips WHERE id IN (?, ?, ?) AND status = 'active' LIMIT 10")
+    b = statement_shape("SELECT *\n  FROM trips WHERE id IN (?, ?) AND status = 'completed' LIMIT 20")
+    assert a == b == "SELECT * FROM trips WHERE id IN (?...) AND status = ? LIMIT ?"
+    # Digits inside identifiers are kept
+    assert statement_shape("SELECT anon_1.id FROM anon_1") == "SELECT anon_1.id FROM anon_1"
+
+
+def test_capture_groups_repeated_statements(app, user):
+    _add_vehicles(user, 6)
+    with query_inspector.capture(db.engine) as report:
+        vehicles = db.session.execute(db.select(Vehicle)).scalars().all()
+        for vehicle in vehicles:
+            vehicle.battery  # lazy load per vehicle: the textbook N+1
+    assert report.count == 7
+    (shape, times), = report.repeated(threshold=5)
+    assert times == 6 and 'battery_status' in shape
+    assert '6x' in report.summary()
+
+
+def test_captures_nest(app, user):
+    with query_inspector.capture(db.engine) as outer:
+        db.session.execute(db.text('SELECT 1'))
+        with query_inspector.capture() as inner:
+            db.session.execute(db.text('SELECT 2'))
+    db.session.execute(db.text('SELECT 3'))
+    assert outer.count == 2 and inner.count == 1
+
+
+def test_query_budget_fails_on_n_plus_one(app, user, query_budget):
+    _add_vehicles(user, 4)
+    with pytest.raises(AssertionError, match='repeated more than 1 times'):
+        with query_budget(20, max_repeats=1):
+            for vehicle in db.session.execute(db.select(Vehicle)).scalars().all():
+                vehicle.battery
+
+
+def test_query_budget_fails_over_budget(app, query_budget):
+    with pytest.raises(AssertionError, match='at most 1 queries'):
+        with query_budget(1):
+            db.session.execute(db.text('SELECT 1'))
+            db.session.execute(db.text('SELECT 2'))
+
+
+@pytest.mark.parametrize('method, path, budget', [
+    ('get', '/dashboard', 4),
+    ('get', '/api/trips', 4),
+    ('get', '/api/analytics', 4),
+])
+def test_endpoint_query_budgets(auth_client, vehicle, query_budget, method, path, budget):
+    with query_budget(budget, max_repeats=1):
+        response = getattr(auth_client, method)(path)
+    assert response.status_code == 200
+
+
+def test_update_location_query_budget(auth_client, vehicle, query_budget):
+    payload = {'vehicle_id': vehicle.id, 'lat': 19.0760, 'lng': 72.8777}
+    auth_client.post('/api/update_location', json=payload)
+    with query_budget(4, max_repeats=1):
+        response = auth_client.post('/api/update_location', json=payload)
+    assert response.status_code == 200
+
+
+class InspectorConfig(TestConfig):
+    QUERY_INSPECTOR = True
+    QUERY_INSPECTOR_REPEAT_THRESHOLD = 3
+
+
+def test_inspector_adds_headers_and_logs_n_plus_one(caplog):
+    app = create_app(InspectorConfig)
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        for vehicle in db.session.execute(db.select(Vehicle)).scalars().all():
+            vehicle.battery
+        return 'ok'
+
+    with app.app_context():
+        db.create_all()
+        from app.models import User
+        user = User(username='driver', email='driver@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        _add_vehicles(user, 3)
+        client = app.test_client()
+
+        response = client.get('/health')
+        assert response.headers['X-Query-Count'] == '1'
+        assert float(response.headers['X-Query-Time-Ms']) >= 0
+
+        with caplog.at_level(logging.WARNING, logger='app.utils.query_inspector'):
+            response = client.get('/n-plus-one')
+        assert response.headers['X-Query-Count'] == '4'
+        assert 'possible N+1' in caplog.text and '3x' in caplog.text
+        db.session.remove()
+        db.drop_all()
+
+
+def test_inspector_is_off_by_default(client):
+    response = client.get('/health')
+    assert 'X-Query-Count' not in response.headers
+
+
+def test_inspector_and_metrics_share_one_listener(app):
+    from sqlalchemy import event
+    from app.utils import query_events
+
+    query_inspector.listen(db.engine)
+
+    assert event.contains(db.engine, 'after_cursor_execute', query_events._after_cursor_execute)
+    assert len(db.engine.dispatch.after_cursor_execute) == 1
+
+
+def test_inspector_capture_is_closed_when_the_view_raises():
+    app = create_app(InspectorConfig)
+
+    @app.route('/boom')
+    def boom():
+        db.session.execute(db.text('SELECT 1'))
+        raise RuntimeError('boom')
+
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            app.test_client().get('/boom')  # TESTING propagates the error past after_request
+        assert query_inspector._reports() == []
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import TripRoute
+from app.services.route_service import ROUTE_TOLERANCES_M, REPLAY_MAX_FRAMES, RouteService
+from app.services.trip_service import TripService
+from app.utils import polyline
+from app.utils.distance import haversine_km
+
+
+def test_simplify_respects_tolerance():
+    rng = np.random.default_rng(3)
+    lats = 19.0760 + np.cumsum(rng.normal(0, 2e-5, 5000)) + np.arange(5000) * 1e-5
+    lngs = 72.8777 + np.arange(5000) * 1e-5
+
+    kept = polyline.simplify(lats, lngs, 20)
+
+    assert kept[0] == 0 and kept[-1] == 4999 and kept.size < 500
+    # Every dropped point is within ~20 m of the chord between its neighbouring kept points
+    for a, b in zip(kept[:-1], kept[1:]):
+        for i in range(a + 1, b, 7):
+            t = (i - a) / (b - a)
+            lat = lats[a] + t * (lats[b] - lats[a])
+            lng = lngs[a] + t * (lngs[b] - lngs[a])
+            assert haversine_km(lats[i], lngs[i], lat, lng) * 1000 < 20 * 3
+
+
+def test_polyline_round_trip():
+    lats, lngs = [38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]
+    encoded = polyline.encode(lats, lngs)
+
+    assert encoded == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    decoded_lats, decoded_lngs = polyline.decode(encoded)
+    assert np.allclose(decoded_lats, lats) and np.allclose(decoded_lngs, lngs)
+    assert polyline.decode_values(polyline.encode_values([0, 10, 25, 25, 90])).tolist() == [0, 10, 25, 25, 90]
+
+
+def _completed_trip(vehicle, campuses, n):
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    trip_id = trip.id
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    TripService.ingest_batch([
+        {"vehicle_id": vehicle.id, "lat": 19.0760 - i * 0.0001, "lng": 72.8777 + (i % 2) * 0.00001,
+         "speed": 30, "recorded_at": start + timedelta(seconds=5 * i)}
+        for i in range(n)
+    ])
+    TripService.finalise_trip(vehicle.id)
+    return trip_id
+
+
+def test_routes_are_built_on_first_view_and_served(app, auth_client, vehicle, campuses):
+    trip_id = _completed_trip(vehicle, campuses, 2000)
+    assert TripRoute.query.filter_by(trip_id=trip_id).count() == 0  # finalise leaves it to the first view
+
+    response = auth_client.get(f'/api/trips/{trip_id}/route?zoom=12')
+    data = response.json['data']
+
+    levels = {r.tolerance_m: r.point_count for r in TripRoute.query.filter_by(trip_id=trip_id)}
+    assert sorted(levels) == list(ROUTE_TOLERANCES_M)
+    assert levels[ROUTE_TOLERANCES_M[-1]] <= levels[ROUTE_TOLERANCES_M[0]] < 50
+
+    assert response.status_code == 200
+    assert data['tolerance_m'] == ROUTE_TOLERANCES_M[-1] and data['source_points'] == 2000
+    frames = polyline.decode(data['replay']['polyline'])[0]
+    assert data['replay']['step_s'] == 17  # ceil(9995 s / 600 frames)
+    assert frames.size <= REPLAY_MAX_FRAMES + 1
+
+
+def test_concurrent_first_views_use_the_stored_levels(app, vehicle, campuses, monkeypatch):
+    trip_id = _completed_trip(vehicle, campuses, 50)
+    build_routes = RouteService.build_routes
+
+    def built_elsewhere_meanwhile(trip_id):
+        routes = build_routes(trip_id)
+        db.session.commit()  # the other request wins the race
+        duplicates = [TripRoute(trip_id=trip_id, tolerance_m=r.tolerance_m, polyline=r.polyline,
+                                timeline=r.timeline, start_epoch=r.start_epoch, point_count=r.point_count,
+                                source_point_count=r.source_point_count) for r in routes]
+        db.session.add_all(duplicates)
+        return duplicates
+
+    monkeypatch.setattr(RouteService, 'build_routes', staticmethod(built_elsewhere_meanwhile))
+    route = RouteService.get_route(trip_id, ROUTE_TOLERANCES_M[0])
+
+    assert route.id is not None and route.source_point_count == 50
+    assert TripRoute.query.filter_by(trip_id=trip_id).count() == len(ROUTE_TOLERANCES_M)
+
+
+def test_route_rejects_active_trip(app, auth_client, vehicle, campuses):
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+
+    assert auth_client.get(f'/api/trips/{trip.id}/route').status_code == 409
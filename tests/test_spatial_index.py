@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from app.services.vehicle_service import VehicleService, available_index
+from app.services.trip_service import TripService
+from app.utils.distance import haversine_km
+from app.utils.spatial_index import SpatialIndex
+
+
+def _random_fleet(n, seed=7):
+    rng = random.Random(seed)
+    return [(i, 19.0760 + rng.uniform(-0.2, 0.2), 72.8777 + rng.uniform(-0.2, 0.2)) for i in range(n)]
+
+
+def _brute_force(fleet, lat, lng):
+    return sorted((haversine_km(lat, lng, plat, plng), key) for key, plat, plng in fleet)
+
+
+@pytest.mark.parametrize("query", [(19.0760, 72.8777), (19.25, 72.70), (25.0, 80.0)])
+def test_nearest_matches_brute_force(query):
+    fleet = _random_fleet(500)
+    index = SpatialIndex()
+    index.load(fleet)
+
+    assert index.nearest(*query, k=5) == _brute_force(fleet, *query)[:5]
+
+
+def test_within_matches_brute_force():
+    fleet = _random_fleet(500)
+    index = SpatialIndex()
+    index.load(fleet)
+
+    expected = [match for match in _brute_force(fleet, 19.0760, 72.8777) if match[0] <= 3.0]
+    assert index.within(19.0760, 72.8777, 3.0) == expected
+
+
+def test_upsert_moves_and_remove_drops():
+    index = SpatialIndex()
+    index.upsert(1, 19.0, 72.0)
+    index.upsert(1, 19.5, 72.5)
+    index.upsert(2, 19.01, 72.01)
+
+    assert [key for _, key in index.nearest(19.0, 72.0, k=2)] == [2, 1]
+    index.remove(2)
+    assert len(index) == 1 and 2 not in index
+    assert index.within(19.0, 72.0, 5) == []
+
+
+def test_dispatch_follows_trip_lifecycle(app, vehicle, campuses):
+    source, destination = campuses
+    vehicle_id = vehicle.id
+    TripService.update_location(vehicle_id, 19.0760, 72.8777)
+
+    nearest, distance = VehicleService.get_nearest_available_vehicle(19.0761, 72.8777)
+    assert nearest.id == vehicle_id and distance < 0.05
+    assert available_index.is_warm()
+
+    trip, error = TripService.assign_and_start_trip(source.id, destination.id, 19.0760, 72.8777,
+                                                    destination.latitude, destination.longitude)
+    assert error is None and trip.vehicle_id == vehicle_id
+    assert vehicle_id not in available_index
+    assert VehicleService.get_nearest_available_vehicle(19.0760, 72.8777) == (None, float('inf'))
+
+    TripService.update_location(vehicle_id, 19.0500, 72.8600)
+    TripService.finalise_trip(vehicle_id)
+    nearest, distance = VehicleService.get_nearest_available_vehicle(19.0500, 72.8600)
+    assert nearest.id == vehicle_id and distance < 0.001
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from app import db
+from app.models import SCHEMA_VERSION, SchemaVersion
+from app.services.admin_service import admin_stats
+from app.utils import lazy
+from app.utils.query_inspector import query_inspector
+from app.utils.startup import ensure_schema, schema_version, warm_up
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_schema_is_created_once_then_only_checked(app):
+    db.drop_all()
+    assert schema_version() is None
+
+    assert ensure_schema() is True
+    assert schema_version() == SCHEMA_VERSION
+    with query_inspector.capture(db.engine) as report:
+        assert ensure_schema() is False
+    assert report.count == 1
+
+
+def test_database_behind_the_code_is_refused_not_stamped(app):
+    db.session.add(SchemaVersion(version=SCHEMA_VERSION - 1))
+    db.session.commit()
+
+    with pytest.raises(RuntimeError, match='schema.sql'):
+        ensure_schema()
+    assert schema_version() == SCHEMA_VERSION - 1
+
+
+def test_unversioned_database_with_tables_is_refused(app):
+    SchemaVersion.__table__.drop(db.engine)
+
+    with pytest.raises(RuntimeError, match='version unknown'):
+        ensure_schema()
+
+
+def test_warm_up_compiles_templates_and_loads_deferred_modules(app):
+    timings = warm_up(app)
+
+    assert set(timings) == {'templates', 'database', 'imports', 'aggregates'}
+    cached = {name for _, name in app.jinja_env.cache.keys()}
+    assert set(app.jinja_env.list_templates()) <= cached
+    assert 'numpy' in sys.modules
+    assert admin_stats.stats()['cached'] and admin_stats.stats()['misses'] == 1
+
+
+def test_lazy_module_imports_on_first_use(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'wave', raising=False)
+    wave = lazy.LazyModule('wave')
+    assert 'wave' not in sys.modules and 'not imported' in repr(wave)
+
+    assert wave.Error is sys.modules['wave'].Error
+    assert 'Error' in vars(wave)  # later lookups skip __getattr__
+    assert lazy.load(wave) is sys.modules['wave']
+
+
+def test_create_app_does_not_import_numpy():
+    script = textwrap.dedent("""
+        import sys
+        from app import create_app
+        from config import Config
+
+        class StartupConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+        create_app(StartupConfig)
+        print('numpy' in sys.modules)
+    """)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,289 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Trip, VehicleTracking, BatteryStatus
+from app.services.trip_service import TripService
+from app.services.vehicle_state import vehicle_state
+from app.utils.distance import haversine_km
+
+
+def _start_trip(vehicle, campuses):
+    source, destination = campuses
+    trip, error = TripService.start_trip(
+        vehicle.id, source.id, destination.id,
+        source.latitude, source.longitude, destination.latitude, destination.longitude
+    )
+    assert error is None
+    return trip
+
+
+def test_batch_ingest_folds_points_into_trip(auth_client, vehicle, campuses):
+    """A batch is stored in one go and its distance is folded into the trip."""
+    trip = _start_trip(vehicle, campuses)
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    points = [
+        {"vehicle_id": vehicle.id, "lat": 19.0760 - i * 0.001, "lng": 72.8777,
+         "speed": 30, "recorded_at": (start + timedelta(seconds=10 * i)).isoformat()}
+        for i in range(5)
+    ]
+
+    response = auth_client.post('/api/update_location/batch', json={"points": points})
+
+    assert response.status_code == 200
+    assert response.json['data']['accepted'] == 5
+    assert VehicleTracking.query.filter_by(trip_id=trip.id).count() == 5
+    trip = Trip.query.get(trip.id)
+    assert 0.4 < trip.total_distance_km < 0.5
+    battery = BatteryStatus.query.filter_by(vehicle_id=vehicle.id).first()
+    assert battery.current_percentage < 100
+
+
+def test_batch_ingest_rejects_foreign_vehicle(auth_client, vehicle):
+    response = auth_client.post('/api/update_location/batch', json={
+        "points": [{"vehicle_id": vehicle.id + 1, "lat": 19.0, "lng": 72.0}]
+    })
+    assert response.status_code == 403
+
+
+def test_batch_ingest_validates_points(auth_client, vehicle):
+    response = auth_client.post('/api/update_location/batch', json={
+        "points": [{"vehicle_id": vehicle.id, "lat": 19.0}]
+    })
+    assert response.status_code == 400
+
+
+def test_batch_folds_from_the_latest_fix_and_skips_older_points(app, vehicle, campuses):
+    trip_id = _start_trip(vehicle, campuses).id
+    start = datetime(2026, 1, 1, 8, 0, 0)
+
+    def point(seconds, lat):
+        return {"vehicle_id": vehicle.id, "lat": lat, "lng": 72.8777, "speed": 30,
+                "recorded_at": start + timedelta(seconds=seconds)}
+
+    TripService.ingest_batch([point(0, 19.000), point(100, 19.001)])
+    # A replayed buffer: one fix older than the stored ones, stored last (highest id)
+    TripService.ingest_batch([point(50, 19.100)])
+    TripService.ingest_batch([point(110, 19.002)])
+
+    trip = Trip.query.get(trip_id)
+    assert VehicleTracking.query.filter_by(trip_id=trip_id).count() == 4
+    # 19.000 -> 19.001 -> 19.002: two 111 m steps, not the 11 km detour to the late fix
+    assert float(trip.running_distance_km) == pytest.approx(0.222, abs=0.002)
+    # The battery reading is as of the newest folded fix, not of the upload
+    battery = BatteryStatus.query.filter_by(vehicle_id=vehicle.id).one()
+    assert battery.last_updated == start + timedelta(seconds=110)
+
+
+def test_ping_after_a_replayed_batch_folds_from_the_latest_fix(app, vehicle, campuses):
+    trip_id = _start_trip(vehicle, campuses).id
+    start = datetime(2026, 1, 1, 8, 0, 0)
+
+    def point(seconds, lat):
+        return {"vehicle_id": vehicle.id, "lat": lat, "lng": 72.8777, "speed": 30,
+                "recorded_at": start + timedelta(seconds=seconds)}
+
+    TripService.ingest_batch([point(0, 19.000), point(100, 19.001)])
+    TripService.ingest_batch([point(50, 19.100)])
+    TripService.update_location(vehicle.id, 19.002, 72.8777, 30, start + timedelta(seconds=110))
+
+    trip = Trip.query.get(trip_id)
+    assert float(trip.running_distance_km) == pytest.approx(0.222, abs=0.002)
+
+
+def test_concurrent_pings_of_a_vehicle_fold_one_after_the_other(app, vehicle, campuses, monkeypatch):
+    _start_trip(vehicle, campuses)
+    TripService.update_location(vehicle.id, 19.0000, 72.8777)
+    written = []
+
+    def slow_write(fixes):
+        time.sleep(0.05)  # both requests are now between reading and writing back the state
+        written.extend(fixes)
+
+    monkeypatch.setattr(TripService, '_write_fixes', staticmethod(slow_write))
+    threads = [threading.Thread(target=TripService.update_location, args=(vehicle.id, lat, 72.8777))
+               for lat in (19.0010, 19.0020)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first, second = written
+    # The second fix continues from the first, not from the point both started with
+    assert second['delta'].distance_km == pytest.approx(
+        haversine_km(first['lat'], first['lng'], second['lat'], second['lng']))
+
+
+def test_batch_folds_under_the_vehicle_locks(app, vehicle, campuses, monkeypatch):
+    _start_trip(vehicle, campuses)
+    TripService.update_location(vehicle.id, 19.0000, 72.8777)
+    fold_into_trip = TripService._fold_into_trip
+    held = []
+
+    def fold(*args):
+        held.append(vehicle_state.lock(vehicle.id).locked())
+        return fold_into_trip(*args)
+
+    monkeypatch.setattr(TripService, '_fold_into_trip', staticmethod(fold))
+    # A second vehicle sharing the lock stripe must not deadlock the batch
+    TripService.ingest_batch([
+        {"vehicle_id": vehicle.id, "lat": 19.0010, "lng": 72.8777, "speed": 30, "recorded_at": None},
+        {"vehicle_id": vehicle.id + vehicle_state.LOCK_STRIPES, "lat": 19.0, "lng": 72.8, "speed": 0,
+         "recorded_at": None},
+    ])
+
+    assert held == [True]
+    assert not vehicle_state.lock(vehicle.id).locked()
+
+
+@pytest.mark.parametrize('point', [
+    {"lat": 91.0, "lng": 72.0},
+    {"lat": 19.0, "lng": -180.5},
+    {"lat": "nan", "lng": 72.0},
+    {"lat": 19.0, "lng": 72.0, "recorded_at": 1e20},   # OverflowError / OSError from fromtimestamp
+    {"lat": 19.0, "lng": 72.0, "recorded_at": -1e12},
+    {"lat": 19.0, "lng": 72.0, "recorded_at": "2099-01-01T00:00:00Z"},
+])
+def test_batch_ingest_rejects_impossible_points(auth_client, vehicle, point):
+    response = auth_client.post('/api/update_location/batch', json={
+        "points": [{"vehicle_id": vehicle.id, **point}]
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('lat, lng', [("north", 72.0), ("nan", 72.0), (19.0, 180.5), (-91, 72.0), ([19], 72.0)])
+def test_update_location_rejects_impossible_points(app, auth_client, vehicle, campuses, lat, lng):
+    trip_id = _start_trip(vehicle, campuses).id
+    response = auth_client.post('/api/update_location', json={"vehicle_id": vehicle.id, "lat": lat, "lng": lng})
+    assert response.status_code == 400
+    assert VehicleTracking.query.filter_by(trip_id=trip_id).count() == 0
+
+
+def test_uncached_ping_loads_the_state_once(app, auth_client, vehicle, campuses, monkeypatch):
+    _start_trip(vehicle, campuses)
+    monkeypatch.setattr(vehicle_state, 'maxsize', 0)
+    vehicle_state.clear()
+    load = vehicle_state._load
+    loads = []
+
+    def counting_load(vehicle_id):
+        loads.append(vehicle_id)
+        return load(vehicle_id)
+
+    monkeypatch.setattr(vehicle_state, '_load', counting_load)
+    response = auth_client.post('/api/update_location', json={"vehicle_id": vehicle.id, "lat": 19.07, "lng": 72.88})
+
+    assert response.status_code == 200
+    assert loads == [vehicle.id]
+
+
+def test_update_location_uses_cached_state(app, vehicle, campuses):
+    """A warm ping issues only the INSERT and the trip/battery/vehicle UPDATEs."""
+    from sqlalchemy import event
+    from app import db
+
+    trip = _start_trip(vehicle, campuses)
+    vehicle_id, trip_id = vehicle.id, trip.id
+    TripService.update_location(vehicle_id, 19.0760, 72.8777)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        battery_pct = TripService.update_location(vehicle_id, 19.0750, 72.8777)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert not any(s.lstrip().upper().startswith('SELECT') for s in statements)
+    assert len(statements) == 4
+    assert battery_pct < 100
+    trip = Trip.query.get(trip_id)
+    assert 0.1 < trip.total_distance_km < 0.12
+
+
+def test_incremental_stats_match_full_recomputation(app, vehicle, campuses):
+    """Running trip state folded per ping equals a recomputation from stored points."""
+    trip = _start_trip(vehicle, campuses)
+    vehicle_id, trip_id = vehicle.id, trip.id
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    # Cruise, burst well past the speed limit, then stop abruptly
+    steps = [0.0002] * 10 + [0.0030] * 5 + [0.0001] * 5 + [0.0] * 5
+    lat = 19.0760
+    for i, step in enumerate(steps):
+        lat -= step
+        TripService.update_location(vehicle_id, lat, 72.8777 + i * 1e-9,
+                                    recorded_at=start + timedelta(seconds=10 * i))
+
+    completed, error = TripService.finalise_trip(vehicle_id)
+    assert error is None
+    incremental = {
+        'total_distance': float(completed.total_distance_km),
+        'harsh_accel': completed.harsh_acceleration_count,
+        'harsh_brake': completed.harsh_braking_count,
+        'overspeed': completed.overspeed_count,
+        'battery_consumed_pct': float(completed.battery_consumed_percent),
+    }
+    assert incremental['overspeed'] > 0
+    assert incremental['harsh_accel'] > 0 and incremental['harsh_brake'] > 0
+
+    trip = Trip.query.get(trip_id)
+    running = (trip.running_distance_km, trip.energy_consumed_kwh, trip.last_speed_kmph)
+    recomputed = TripService.recompute_trip_stats(trip)
+
+    assert recomputed.result(vehicle.battery_capacity_kwh) == incremental
+    assert (recomputed.distance_km, recomputed.energy_kwh, recomputed.prev_speed) == running
+
+    vectorized = TripService.recompute_trip_stats(trip, vectorized=True)
+    assert vectorized.distance_km == pytest.approx(recomputed.distance_km, rel=1e-9)
+    assert vectorized.overspeed == recomputed.overspeed
+    assert vectorized.harsh_brake == recomputed.harsh_brake
+
+
+def test_late_fix_does_not_touch_a_completed_trip(app, vehicle, campuses):
+    """A fix folded after finalise_trip (stale ping, queued write) leaves the summary alone."""
+    from app.utils.trip_analysis import TripStats
+
+    trip = _start_trip(vehicle, campuses)
+    vehicle_id, trip_id = vehicle.id, trip.id
+    TripService.update_location(vehicle_id, 19.0760, 72.8777)
+    TripService.update_location(vehicle_id, 19.0700, 72.8777)
+    completed, _ = TripService.finalise_trip(vehicle_id)
+    totals = (completed.total_distance_km, completed.battery_consumed_percent, completed.running_distance_km)
+
+    late = TripStats()
+    late.add(19.0700, 72.8777, datetime(2026, 1, 1, 8, 0, 0), 19.0600, 72.8777, datetime(2026, 1, 1, 8, 0, 30))
+    TripService._write_fixes([{
+        'vehicle_id': vehicle_id, 'trip_id': trip_id, 'lat': 19.06, 'lng': 72.8777, 'speed': 0.0,
+        'recorded_at': datetime(2026, 1, 1, 8, 0, 30), 'delta': late, 'battery_pct': None, 'capacity': 50.0,
+    }])
+    assert TripService._fold_into_trip(trip_id, late, 50.0) is False
+
+    trip = Trip.query.get(trip_id)
+    assert (trip.total_distance_km, trip.battery_consumed_percent, trip.running_distance_km) == totals
+
+
+def test_latest_position_is_upserted_and_backfilled(app, runner, vehicle):
+    from app import db
+    from app.models import Vehicle
+
+    vehicle_id = vehicle.id
+    TripService.update_location(vehicle_id, 19.0760, 72.8777, speed=12.5)
+    TripService.ingest_batch([
+        {"vehicle_id": vehicle_id, "lat": 19.0, "lng": 72.0, "speed": 0.0,
+         "recorded_at": datetime(2020, 1, 1)},
+    ])
+
+    current = db.session.get(Vehicle, vehicle_id)
+    assert float(current.current_lat) == 19.0760
+    assert float(current.current_speed) == 12.5
+
+    current.current_lat = current.current_lng = current.last_seen_at = None
+    db.session.commit()
+    result = runner.invoke(args=['backfill-latest-positions'])
+
+    assert 'for 1 of 1 vehicles' in result.output
+    current = db.session.get(Vehicle, vehicle_id)
+    assert float(current.current_lat) == 19.0760
+    assert float(current.current_speed) == 12.5
@@ -0,0 +1,63 @@
+import math
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.trip_analysis import analyze_points, fold_arrays, fold_points
+
+
+def _synthetic_track(n, heading_deg=30):
+    """Straight-line points with cruising, an overspeed burst and a hard stop."""
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    lat, lng = 19.0760, 72.8777
+    heading = math.radians(heading_deg)
+    points = []
+    for i in range(n):
+        phase = i % 40
+        if phase < 25:
+            step = 0.0004
+        elif phase < 30:
+            step = 0.0035
+        else:
+            step = 0.00005
+        lat += step * math.cos(heading)
+        lng += step * math.sin(heading)
+        points.append(SimpleNamespace(latitude=lat, longitude=lng,
+                                      recorded_at=start + timedelta(seconds=10 * i)))
+    return points
+
+
+def _columns(points):
+    epoch = datetime(1970, 1, 1)
+    return ([p.latitude for p in points], [p.longitude for p in points],
+            [(p.recorded_at - epoch).total_seconds() for p in points])
+
+
+@pytest.mark.parametrize("n", [2, 50, 400])
+def test_vectorized_engine_matches_scalar(n):
+    points = _synthetic_track(n)
+    scalar = fold_points(points)
+    vectorized = fold_arrays(*_columns(points))
+
+    assert vectorized.distance_km == pytest.approx(scalar.distance_km, rel=1e-9)
+    assert vectorized.energy_kwh == pytest.approx(scalar.energy_kwh, rel=1e-9)
+    assert vectorized.overspeed == scalar.overspeed
+    assert vectorized.harsh_accel == scalar.harsh_accel
+    assert vectorized.harsh_brake == scalar.harsh_brake
+
+
+def test_vectorized_engine_skips_non_positive_time_steps():
+    points = _synthetic_track(10)
+    points[5].recorded_at = points[4].recorded_at
+    scalar = analyze_points(points, 50)
+    vectorized = fold_arrays(*_columns(points)).result(50)
+
+    assert vectorized['overspeed'] == scalar['overspeed']
+    assert vectorized['harsh_accel'] == scalar['harsh_accel']
+    assert vectorized['harsh_brake'] == scalar['harsh_brake']
+
+
+def test_vectorized_engine_handles_short_trips():
+    assert fold_arrays([], [], []).distance_km == 0
+    assert fold_arrays([19.0], [72.0], [0.0]).result(50)['total_distance'] == 0
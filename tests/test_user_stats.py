@@ -0,0 +1,73 @@
+from sqlalchemy import insert
+
+from app import db
+from app.models import UserStats
+from app.services.trip_service import TripService
+from app.services.user_service import UserService
+from app.services.vehicle_service import VehicleService
+
+
+def _drive(vehicle, campuses, steps=5):
+    source, destination = campuses
+    TripService.start_trip(vehicle.id, source.id, destination.id,
+                           source.latitude, source.longitude,
+                           destination.latitude, destination.longitude)
+    for i in range(steps):
+        TripService.update_location(vehicle.id, 19.0760 - i * 0.001, 72.8777, speed=30)
+    trip, _ = TripService.finalise_trip(vehicle.id)
+    return trip
+
+
+def test_rollup_tracks_vehicles_and_completed_trips(app, user, vehicle, campuses):
+    VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 60.0)
+    first = _drive(vehicle, campuses)
+    second = _drive(vehicle, campuses, steps=8)
+
+    row = db.session.get(UserStats, user.id)
+    assert (row.vehicle_count, row.trip_count) == (2, 2)
+    assert row.score_sum == first.driving_score + second.driving_score
+
+    expected = float(first.total_distance_km) + float(second.total_distance_km)
+    stats = UserService.get_user_statistics(user.id)
+    assert stats == {"total_distance": round(expected, 2), "total_trips": 2,
+                     "avg_score": round(row.score_sum / 2, 1), "active_vehicles": 2}
+    assert UserService.rebuild_statistics() == (1, 0)
+
+
+def test_rebuild_corrects_drift(app, runner, user, vehicle, campuses):
+    trip = _drive(vehicle, campuses)
+    db.session.get(UserStats, user.id).trip_count = 7
+    db.session.commit()
+
+    result = runner.invoke(args=['rebuild-user-stats'])
+
+    assert 'Rebuilt statistics for 1 users (1 rows corrected)' in result.output
+    assert UserService.get_user_statistics(user.id)['total_trips'] == 1
+    assert UserService.get_recent_activity(user.id)[0].id == trip.id
+
+
+def test_statistics_fall_back_to_aggregate_without_rollup(app, user, vehicle, campuses):
+    _drive(vehicle, campuses)
+    UserStats.query.delete()
+    db.session.commit()
+
+    stats = UserService.get_user_statistics(user.id)
+
+    assert stats['total_trips'] == 1 and stats['active_vehicles'] == 1
+
+
+def test_first_events_racing_to_create_the_row_both_count(app, user, monkeypatch):
+    aggregate = UserService._aggregate
+
+    def created_concurrently(user_id=None):
+        totals = aggregate(user_id)
+        # Another request's first event inserts the row between our UPDATE and INSERT
+        db.session.execute(insert(UserStats).values(
+            user_id=user.id, total_distance_km=0.0, trip_count=0, score_sum=0,
+            scored_trip_count=0, vehicle_count=1))
+        return totals
+
+    monkeypatch.setattr(UserService, '_aggregate', staticmethod(created_concurrently))
+    VehicleService.create_vehicle(user.id, 'Shuttle 2', 'MH01AB9999', 'EV', 60.0)
+
+    assert db.session.get(UserStats, user.id).vehicle_count == 2
@@ -0,0 +1,144 @@
+import json
+import os
+
+import pytest
+
+from app.models import VehicleTracking
+from app.services.live_feed import broker, trip_topic
+from app.services.trip_service import TripService, tracking_writer
+from app.utils.write_behind import WriteBehindQueue, WriteBehindFull
+
+
+@pytest.fixture
+def write_behind(app):
+    tracking_writer.init_app(app, enabled=True, maxsize=50, flush_size=1000, flush_interval=60)
+    yield tracking_writer
+    tracking_writer.init_app(app, enabled=False)
+
+
+def _start_trip(vehicle, campuses):
+    source, destination = campuses
+    trip, _ = TripService.start_trip(vehicle.id, source.id, destination.id,
+                                     source.latitude, source.longitude,
+                                     destination.latitude, destination.longitude)
+    return trip
+
+
+def test_queue_batches_by_size_and_flushes_on_stop(app):
+    batches = []
+    writer = WriteBehindQueue(batches.append, key=lambda item: item % 2, maxsize=10,
+                              flush_size=4, flush_interval=60)
+    writer.init_app(app, enabled=True)
+
+    for i in range(6):
+        writer.submit(i)
+    assert writer.has_pending(1)
+    writer.stop()
+
+    assert batches[0] == [0, 1, 2, 3]
+    assert [i for batch in batches for i in batch] == list(range(6))
+    assert not writer.has_pending(1)
+    assert writer.stats()['written'] == 6
+
+
+def test_queue_applies_backpressure(app):
+    writer = WriteBehindQueue(lambda batch: None, maxsize=2, flush_size=10, flush_interval=60)
+    writer.init_app(app, enabled=True)
+    writer.submit(1)
+    writer.submit(2)
+
+    with pytest.raises(WriteBehindFull):
+        writer.submit(3)
+    assert writer.stats()['rejected'] == 1
+    writer.stop()
+
+
+def test_write_behind_defers_rows_but_keeps_trip_state(app, write_behind, vehicle, campuses):
+    trip = _start_trip(vehicle, campuses)
+    vehicle_id, trip_id = vehicle.id, trip.id
+    for i in range(5):
+        battery_pct = TripService.update_location(vehicle_id, 19.0760 - i * 0.001, 72.8777)
+
+    assert battery_pct < 100
+    assert VehicleTracking.query.filter_by(trip_id=trip_id).count() == 0
+    assert write_behind.stats()['queue_depth'] == 5
+
+    trip, _ = TripService.finalise_trip(vehicle_id)
+
+    assert VehicleTracking.query.filter_by(trip_id=trip_id).count() == 5
+    running_km = float(trip.running_distance_km)
+    assert 0.4 < running_km < 0.5
+    assert TripService.recompute_trip_stats(trip).distance_km == pytest.approx(running_km)
+
+
+def test_queued_fixes_are_published_once_written(app, write_behind, vehicle, campuses, monkeypatch):
+    trip_id = _start_trip(vehicle, campuses).id
+    sub = broker.subscribe(trip_topic(trip_id))
+    try:
+        TripService.update_location(vehicle.id, 19.0760, 72.8777)
+        TripService.update_location(vehicle.id, 19.0700, 72.8777)
+        assert sub.get(timeout=0) is None
+
+        write_behind.flush()
+        _, event, data = sub.get(timeout=0)
+        assert event == 'position' and data['path'] == [[19.076, 72.8777], [19.07, 72.8777]]
+        assert data['battery'] < 100
+
+        monkeypatch.setattr(write_behind, 'max_retries', 0)
+        monkeypatch.setattr(TripService, '_write_fixes', staticmethod(lambda fixes: 1 / 0))
+        app.config['TRACKING_DEAD_LETTER_PATH'] = os.devnull
+        TripService.update_location(vehicle.id, 19.0650, 72.8777)
+        write_behind.flush()
+        assert sub.get(timeout=0) is None
+    finally:
+        broker.unsubscribe(sub)
+
+
+def test_full_queue_returns_503(app, auth_client, write_behind, vehicle):
+    write_behind.maxsize = 1
+    payload = {"vehicle_id": vehicle.id, "lat": 19.07, "lng": 72.87}
+
+    assert auth_client.post('/api/update_location', json=payload).status_code == 200
+    response = auth_client.post('/api/update_location', json=payload)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '60'
+    write_behind.flush()
+
+
+def test_failed_batch_is_retried_before_later_items(app):
+    batches, failures = [], [RuntimeError('database gone')] * 2
+
+    def handler(batch):
+        if failures:
+            raise failures.pop()
+        batches.append(batch)
+
+    writer = WriteBehindQueue(handler, key=lambda item: item, maxsize=10, flush_size=2,
+                              flush_interval=60, max_retries=3, retry_delay=60)
+    writer.init_app(app, enabled=True)
+    writer.submit(1)
+    writer.submit(2)
+    writer.submit(3)
+
+    writer.flush()  # retries without waiting for the backoff
+
+    assert batches == [[1, 2], [3]]
+    assert not writer.has_pending(1)
+    assert writer.stats()['retried'] == 4 and writer.stats()['failed'] == 0
+    writer.stop()
+
+
+def test_batch_is_dead_lettered_after_its_retries(app, write_behind, vehicle, campuses, tmp_path, monkeypatch):
+    trip_id = _start_trip(vehicle, campuses).id
+    path = tmp_path / 'dead.jsonl'
+    app.config['TRACKING_DEAD_LETTER_PATH'] = str(path)
+    monkeypatch.setattr(write_behind, 'max_retries', 1)
+    monkeypatch.setattr(TripService, '_write_fixes', staticmethod(lambda fixes: 1 / 0))
+
+    TripService.update_location(vehicle.id, 19.0760, 72.8777)
+    write_behind.flush()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line['vehicle_id'], line['trip_id'], line['lat']) for line in lines] == [(vehicle.id, trip_id, 19.0760)]
+    assert write_behind.stats()['failed'] == 1 and len(write_behind) == 0
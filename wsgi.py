@@ -2,27 +2,156 @@
 Production WSGI entry point.
 
 Usage:
-    python wsgi.py          # starts Waitress on 0.0.0.0:8080
+    python wsgi.py                  # starts Waitress on 0.0.0.0:8080
     python wsgi.py --port 5000
+    python wsgi.py --workers 4      # four processes sharing the port (Unix)
 
 For development, continue using `flask run` or `python run.py`.
 """
 import argparse
+import logging
+import os
+import signal
+import sys
+import tempfile
 from app import create_app
+from app.utils.startup import warm_up
+from config import Config
 
-app = create_app()
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='EV Tracking – Production Server')
-    parser.add_argument('--host', default='0.0.0.0', help='Bind address')
-    parser.add_argument('--port', type=int, default=8080, help='Bind port')
-    args = parser.parse_args()
+# Per-process caches that stay on with several workers. A change made through one
+# worker reaches the others when their copy expires; a TTL of 0 would mean never
+# for the LRU-backed ones, so those are turned off instead.
+EXPIRING_CACHES = (
+    ('ADMIN_STATS_TTL', None, 'admin dashboard stats'),
+    ('DISPATCH_INDEX_MAX_AGE', None, 'dispatch index of available vehicles'),
+    ('DEVICE_TOKEN_DENYLIST_TTL', None, 'device token revocations'),
+    ('IDENTITY_CACHE_TTL', 'IDENTITY_CACHE_SIZE', 'logged-in user snapshots'),
+    ('ANALYTICS_CACHE_TTL', 'ANALYTICS_CACHE_SIZE', 'analytics buckets'),
+)
+
+
+def worker_config(config_class, port, workers):
+    """
+    The config for one of `workers` worker processes.
+
+    State that must agree across requests is moved out of process memory or
+    turned off: the rate-limit counters go to a SQLite file shared by the
+    workers; the vehicle state cache, write-behind queue and live streams
+    (whose broker only sees its own worker's ingest) are disabled; the
+    per-vehicle token bucket gets 1/workers of the budget so the workers
+    together stay within it; the other caches must expire (EXPIRING_CACHES).
+    """
+    overrides = {}
+    if config_class.RATELIMIT_STORAGE_URI == 'memory://':
+        path = os.path.join(tempfile.gettempdir(), f'ev-tracking-ratelimit-{port}.db')
+        overrides['RATELIMIT_STORAGE_URI'] = f'sqlite:///{path}'
+    if config_class.TRACKING_WRITE_BEHIND:
+        print("[WARNING] TRACKING_WRITE_BEHIND is single-process only; writing synchronously.")
+        overrides['TRACKING_WRITE_BEHIND'] = False
+    if config_class.VEHICLE_STATE_CACHE_SIZE:
+        print("[WARNING] VEHICLE_STATE_CACHE_SIZE is per process; disabled with several workers.")
+        overrides['VEHICLE_STATE_CACHE_SIZE'] = 0
+    if config_class.LIVE_STREAM_MAX_SUBSCRIBERS:
+        print("[WARNING] Live streams only see their own worker's positions; disabled with several "
+              "workers (tracking pages poll for positions instead).")
+        overrides['LIVE_STREAM_MAX_SUBSCRIBERS'] = 0
+    # Requests spread over the workers, so each one's share keeps the sum at the configured rate
+    overrides['DEVICE_RATE_PER_SECOND'] = config_class.DEVICE_RATE_PER_SECOND / workers
+    overrides['DEVICE_RATE_BURST'] = max(1, config_class.DEVICE_RATE_BURST // workers)
+
+    for ttl_setting, size_setting, label in EXPIRING_CACHES:
+        ttl = getattr(config_class, ttl_setting)
+        if size_setting and not ttl and getattr(config_class, size_setting):
+            print(f"[WARNING] {ttl_setting}=0 never expires the {label}; cache disabled with several workers.")
+            overrides[size_setting] = 0
+        elif ttl:
+            print(f"[INFO] Cached per worker for up to {ttl:g} s ({ttl_setting}): {label}.")
+    return type('WorkerConfig', (config_class,), overrides)
+
+
+def serve_forked(args):
+    from app.utils.prefork import PreforkServer, Worker, bind_socket
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s')
+    config_class = worker_config(Config, args.port, args.workers) if args.workers > 1 else Config
+    sock = bind_socket(args.host, args.port)
+
+    def serve_worker(slot):
+        # Every worker builds its own app, engine and pool after the fork
+        jitter = int.from_bytes(os.urandom(2), 'big') % (args.max_requests_jitter + 1)
+        app = create_app(config_class)
+        if args.warm_up:
+            warm_up(app)  # before the worker starts accepting from the shared socket
+        worker = Worker(app, sock, threads=args.threads,
+                        max_requests=args.max_requests + jitter if args.max_requests else 0,
+                        graceful_timeout=args.graceful_timeout)
+        logging.getLogger(__name__).info("Worker %s ready", os.getpid())
+        worker.serve()
+
+    print(f"[PRODUCTION] Serving on http://{args.host}:{args.port} "
+          f"with {args.workers} workers x {args.threads} threads")
+    PreforkServer(serve_worker, args.workers, graceful_timeout=args.graceful_timeout).run()
+    sock.close()
+
+
+def serve_single(args):
+    app = create_app()
+    if args.warm_up:
+        warm_up(app)  # before the port is opened
+    # Exit through SystemExit on SIGTERM so atexit hooks run (e.g. the final
+    # flush of the tracking write-behind queue)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
     try:
         from waitress import serve
         print(f"[PRODUCTION] Serving on http://{args.host}:{args.port}")
-        serve(app, host=args.host, port=args.port, threads=4)
+        serve(app, host=args.host, port=args.port, threads=args.threads)
     except ImportError:
         print("[WARNING] waitress not installed – falling back to Flask dev server.")
         print("[WARNING] Do NOT use this in production.")
         app.run(host=args.host, port=args.port, debug=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EV Tracking – Production Server')
+    parser.add_argument('--host', default='0.0.0.0', help='Bind address')
+    parser.add_argument('--port', type=int, default=8080, help='Bind port')
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                        help='Worker processes sharing the port (default: SERVER_WORKERS, 1)')
+    # Each open live stream (SSE) pins a thread, so leave room for regular requests.
+    # The database pool is sized from the same setting (DB_POOL_SIZE).
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS,
+                        help='Threads per worker (default: SERVER_THREADS, 4 + LIVE_STREAM_MAX_SUBSCRIBERS)')
+    parser.add_argument('--max-requests', type=int, default=Config.SERVER_MAX_REQUESTS,
+                        help='Recycle a worker after this many requests (default: SERVER_MAX_REQUESTS, 0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=Config.SERVER_MAX_REQUESTS_JITTER,
+                        help='Up to this many extra requests per worker, so they do not recycle together')
+    parser.add_argument('--graceful-timeout', type=int, default=Config.SERVER_GRACEFUL_TIMEOUT,
+                        help='Seconds a stopping worker waits for in-flight requests')
+    parser.add_argument('--warm-up', action=argparse.BooleanOptionalAction, default=Config.SERVER_WARM_UP,
+                        help='Compile templates, open the DB pool and import deferred modules before serving '
+                             '(default: SERVER_WARM_UP)')
+    args = parser.parse_args()
+
+    if args.threads > Config.DB_POOL_SIZE + Config.DB_MAX_OVERFLOW:
+        print(f"[WARNING] {args.threads} threads share {Config.DB_POOL_SIZE} pooled connections "
+              f"(+{Config.DB_MAX_OVERFLOW} overflow); raise DB_POOL_SIZE to avoid checkout waits.")
+    if args.workers > 1:
+        print(f"[INFO] Up to {args.workers * (Config.DB_POOL_SIZE + Config.DB_MAX_OVERFLOW)} database "
+              f"connections across {args.workers} workers; check the server's max_connections.")
+
+    if (args.workers > 1 or args.max_requests) and not hasattr(os, 'fork'):
+        print("[WARNING] Worker processes need os.fork(); serving from a single process.")
+        args.workers, args.max_requests = 1, 0
+    if args.workers > 1 or args.max_requests:
+        serve_forked(args)
+    else:
+        serve_single(args)
+
+
+if __name__ == '__main__':
+    main()
+else:
+    # Imported by another WSGI server, e.g. `waitress-serve wsgi:app`
+    app = create_app()